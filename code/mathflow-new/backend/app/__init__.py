@@ -1 +1,2 @@
 # MathFlow Symbolic Math Backend
+__version__ = "2.0.0"
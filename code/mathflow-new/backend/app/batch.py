@@ -0,0 +1,138 @@
+"""
+Offline batch runner over the service layer, without HTTP.
+
+    python -m app.batch jobs.jsonl results.jsonl [--workers N] [--timeout S]
+
+Each input line is one job in the /api/stream format: ``op`` names the
+operation, ``id`` is optional and the remaining fields are the arguments of
+the matching endpoint. Jobs run on the same worker pool (budgets, crash
+recovery, caches) as the API, and every result is appended to the output as
+one JSON line with the job's ``index`` (0-based among non-empty input lines).
+
+The output file doubles as the checkpoint: each result line is flushed as
+soon as its job finishes, and a rerun with the same arguments skips every
+index already present, so an interrupted run resumes where it stopped.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from .config import settings
+from .executor import shutdown_pool
+from .streaming import run_jobs
+
+# 每处理多少个任务在 stderr 输出一次进度
+_PROGRESS_EVERY = 1000
+
+
+def completed_indices(output_path: str) -> Set[int]:
+    """
+    Indices of the jobs already recorded in ``output_path``.
+
+    A torn last line (the run was killed mid-write) is cut off so that the
+    resumed run appends to a clean file.
+    """
+    done: Set[int] = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "rb+") as f:
+        valid_end = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            valid_end += len(line)
+            try:
+                done.add(int(json.loads(line)["index"]))
+            except (ValueError, KeyError, TypeError):
+                continue
+        f.truncate(valid_end)
+    return done
+
+
+async def _pending_jobs(input_path: str, done: Set[int],
+                        max_line_bytes: int) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    with open(input_path, "rb") as f:
+        index = 0
+        for line in f:
+            if not line.strip():
+                continue
+            if index not in done:
+                yield index, (line if len(line) <= max_line_bytes else None)
+            index += 1
+
+
+async def run_batch(input_path: str, output_path: str, ordered: bool = False,
+                    window: Optional[int] = None) -> Dict[str, int]:
+    """
+    Run the jobs of ``input_path`` not yet in ``output_path`` and append their results.
+
+    Args:
+        input_path: JSONL job file
+        output_path: JSONL result file (created or resumed)
+        ordered: Append results in job order instead of completion order
+        window: Maximum number of jobs in flight (default: MATHFLOW_STREAM_WINDOW)
+
+    Returns:
+        Counters: "skipped" (already done), "ok" and "failed"
+    """
+    done = completed_indices(output_path)
+    counts = {"skipped": len(done), "ok": 0, "failed": 0}
+    jobs = _pending_jobs(input_path, done, settings.stream_max_line_bytes)
+    started = time.monotonic()
+    with open(output_path, "ab") as out:
+        async with aclosing(run_jobs(
+            jobs, ordered, window or settings.stream_window, settings.stream_max_line_bytes
+        )) as results:
+            async for item in results:
+                out.write(json.dumps(item, ensure_ascii=False).encode("utf-8") + b"\n")
+                out.flush()
+                counts["ok" if item["ok"] else "failed"] += 1
+                processed = counts["ok"] + counts["failed"]
+                if processed % _PROGRESS_EVERY == 0:
+                    rate = processed / max(time.monotonic() - started, 1e-9)
+                    print(f"已处理 {processed} 个任务 ({rate:.1f}/s)", file=sys.stderr)
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.batch",
+        description="离线批量运算：读取 JSONL 任务文件，在计算进程池上执行，结果写入 JSONL（支持断点续跑）",
+    )
+    parser.add_argument("input", help="任务文件（每行一个 JSON 任务，格式同 /api/stream）")
+    parser.add_argument("output", help="结果文件；已存在时跳过其中已完成的任务")
+    parser.add_argument("--workers", type=int, help="计算进程数（默认 MATHFLOW_WORKERS 或 CPU 核数）")
+    parser.add_argument("--timeout", type=float, help="单个任务的时间预算（秒），覆盖 MATHFLOW_TIMEOUT")
+    parser.add_argument("--window", type=int, help="同时执行的任务数上限（默认 MATHFLOW_STREAM_WINDOW）")
+    parser.add_argument("--ordered", action="store_true", help="按任务顺序写出结果（默认按完成顺序）")
+    args = parser.parse_args(argv)
+
+    if args.workers is not None:
+        settings.worker_count = max(1, args.workers)
+    if args.timeout is not None:
+        settings.default_timeout = args.timeout
+
+    started = time.monotonic()
+    try:
+        counts = asyncio.run(run_batch(args.input, args.output, args.ordered, args.window))
+    except KeyboardInterrupt:
+        print("已中断；使用相同参数重新运行即可从断点继续", file=sys.stderr)
+        return 130
+    finally:
+        shutdown_pool()
+
+    print(
+        f"完成: 成功 {counts['ok']}，失败 {counts['failed']}，"
+        f"跳过（已完成）{counts['skipped']}，耗时 {time.monotonic() - started:.1f} 秒",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
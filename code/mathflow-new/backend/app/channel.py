@@ -0,0 +1,93 @@
+"""
+WebSocket channel multiplexing many operation requests over one connection.
+
+Every client message is one job in the /api/stream format, tagged by ``id``:
+
+    {"id": "a1", "op": "factor", "latex": "x^2 - 4"}
+    {"op": "cancel", "id": "a1"}
+
+Jobs run concurrently and each result is sent as soon as it is ready, not in
+request order, carrying the job's ``id`` and ``index`` (the 0-based number of
+the message on this connection). Cancelling a tag answers that job with
+status 499 right away; closing the connection cancels everything in flight.
+"""
+import asyncio
+import json
+from typing import Any, Dict, Set, Tuple
+
+from starlette.websockets import WebSocket
+
+from .config import settings
+from .models import StreamItemResult
+from .streaming import decode_job, execute_job
+
+# 被取消的请求的状态码（沿用 "client closed request" 的约定）
+CANCELLED_STATUS = 499
+
+
+def _tag(job_id: Any) -> str:
+    # 任意 JSON 值都可以作为 id，按其规范 JSON 文本比较
+    return json.dumps(job_id, sort_keys=True)
+
+
+async def serve_channel(websocket: WebSocket) -> None:
+    """Accept a WebSocket and serve tagged jobs on it until the client disconnects."""
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+    in_flight: Set[asyncio.Task] = set()
+    tagged: Dict[str, Tuple[int, asyncio.Task]] = {}
+
+    async def send(index: int, job_id: Any, **fields) -> None:
+        item = StreamItemResult(index=index, id=job_id, **fields).model_dump()
+        async with send_lock:
+            await websocket.send_json(item)
+
+    async def run(index: int, job_id: Any, job: Dict[str, Any]) -> None:
+        await send(index, job_id, **await execute_job(job))
+
+    def start(index: int, job_id: Any, job: Dict[str, Any]) -> None:
+        task = asyncio.create_task(run(index, job_id, job))
+        in_flight.add(task)
+        tag = _tag(job_id) if job_id is not None else None
+        if tag is not None:
+            tagged[tag] = (index, task)
+
+        def finished(_):
+            in_flight.discard(task)
+            if tag is not None and tagged.get(tag, (None, None))[1] is task:
+                del tagged[tag]
+
+        task.add_done_callback(finished)
+
+    index = 0
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            message_index, index = index, index + 1
+            try:
+                job = decode_job(message.get("text") or message.get("bytes") or b"")
+            except ValueError as e:
+                await send(message_index, None, ok=False, status=400, error=str(e))
+                continue
+            job_id = job.pop("id", None)
+
+            if job.get("op") == "cancel":
+                entry = tagged.pop(_tag(job_id), None) if job_id is not None else None
+                if entry is None:
+                    await send(message_index, job_id, ok=False, status=404, error="没有该 id 的进行中请求")
+                    continue
+                job_index, task = entry
+                task.cancel()
+                await send(job_index, job_id, ok=False, status=CANCELLED_STATUS, error="已取消")
+            elif job_id is not None and _tag(job_id) in tagged:
+                await send(message_index, job_id, ok=False, status=409, error="该 id 的请求仍在进行中")
+            elif len(in_flight) >= settings.stream_window:
+                await send(message_index, job_id, ok=False, status=429,
+                           error=f"同时进行的请求不能超过 {settings.stream_window}")
+            else:
+                start(message_index, job_id, job)
+    finally:
+        for task in in_flight:
+            task.cancel()
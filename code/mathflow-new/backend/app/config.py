@@ -0,0 +1,187 @@
+"""
+Backend runtime configuration.
+
+All settings are read from environment variables (prefix ``MATHFLOW_``) once
+at import time. Tests may override individual attributes on ``settings``.
+"""
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+# 各端点的运算名称（用于超时预算等按运算配置的设置）
+OPERATIONS = (
+    "factor", "expand", "simplify", "verify",
+    "differentiate", "partial", "integrate", "definite_integral",
+    "limit", "limit_infinity", "sum", "product", "taylor",
+    "gradient", "divergence", "curl", "laplacian",
+    "double_integral", "triple_integral",
+    "solve_equation", "solve_inequality", "solve_system",
+    "pipeline",
+)
+
+# 表达式复杂度的默认上限（解析后检查，各度量的含义见 services/complexity.py）；
+# order 与 range 限制决定计算量的运算参数：Taylor 展开阶数、求和/求积的项数
+COMPLEXITY_LIMITS = {
+    "nodes": 2000,
+    "depth": 200,
+    "exponent": 1000,
+    "terms": 2000,
+    "digits": 1000,
+    "order": 100,
+    "range": 1000,
+}
+
+# 内置的按运算覆盖：求解的代价随多项式次数增长最快（次数 20 时已需数秒）
+OPERATION_LIMITS = {
+    "solve_equation": {"exponent": 20},
+    "solve_inequality": {"exponent": 20},
+    "solve_system": {"exponent": 20},
+}
+
+# 可选的 LaTeX 解析器后端（lark 需要额外安装 lark 包）
+PARSER_BACKENDS = ("antlr", "lark")
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"环境变量 {name} 必须是整数: {value!r}")
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"环境变量 {name} 必须是数字: {value!r}")
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_limits(name: str) -> Dict[str, int]:
+    """Parse limit overrides written as ``nodes=5000,exponent=200``."""
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return {}
+    limits = {}
+    for item in value.split(","):
+        key, _, number = item.partition("=")
+        key = key.strip().lower()
+        if key not in COMPLEXITY_LIMITS:
+            raise ValueError(f"环境变量 {name} 含未知的上限 {key!r}（可选: {', '.join(COMPLEXITY_LIMITS)}）")
+        try:
+            limits[key] = int(number)
+        except ValueError:
+            raise ValueError(f"环境变量 {name} 中 {key} 的上限必须是整数: {number!r}")
+    return limits
+
+
+def _env_str(name: str, default: Optional[str]) -> Optional[str]:
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip()
+
+
+@dataclass
+class Settings:
+    # 计算进程池大小，默认等于 CPU 核数
+    worker_count: int
+    # multiprocessing 启动方式 (fork / spawn / forkserver)，None 表示平台默认
+    start_method: Optional[str]
+    # app.server 启动的服务进程数（每个进程各有 worker_count 个计算进程）
+    server_processes: int = 1
+    # 默认单次运算的墙钟时间预算（秒），超时后终止计算进程
+    default_timeout: float = 10.0
+    # 按运算覆盖的时间预算，来自 MATHFLOW_TIMEOUT_<OPERATION>
+    timeouts: Dict[str, float] = field(default_factory=dict)
+    # 表达式复杂度上限：默认值（MATHFLOW_LIMITS）与按运算的覆盖（MATHFLOW_LIMITS_<OPERATION>）
+    complexity_limits: Dict[str, int] = field(default_factory=lambda: dict(COMPLEXITY_LIMITS))
+    operation_limits: Dict[str, Dict[str, int]] = field(
+        default_factory=lambda: {op: dict(limits) for op, limits in OPERATION_LIMITS.items()}
+    )
+    # /api/batch 单次请求允许的最大运算数
+    batch_max_items: int = 1000
+    # /api/stream 同时执行的任务数上限（读取请求体的背压窗口）与单行任务的最大字节数
+    stream_window: int = 64
+    stream_max_line_bytes: int = 1024 * 1024
+    # 合并同时到达的相同请求（同一运算与规范化输入），共享一次计算
+    coalesce_requests: bool = True
+    # 默认 LaTeX 解析器后端（PARSER_BACKENDS 之一），可由请求头 X-Parser-Backend 按请求覆盖
+    parser_backend: str = "antlr"
+    # LaTeX 解析缓存（规范化 LaTeX -> SymPy 表达式）的容量与有效期（秒）
+    parse_cache_size: int = 4096
+    parse_cache_ttl: float = 3600.0
+    # 运算结果缓存：条目数上限与字节预算（LRU 淘汰）
+    result_cache_size: int = 10000
+    result_cache_bytes: int = 64 * 1024 * 1024
+    # 表达式句柄（POST /api/expressions）存储的条目数上限与有效期（秒）
+    expression_store_size: int = 10000
+    expression_ttl: float = 3600.0
+    # 由运算耗时在线训练耗时预测模型（见 cost_model.py）
+    cost_model: bool = True
+    # 持久化结果缓存的 SQLite 文件路径（同一主机的所有进程共享），None 表示关闭
+    cache_db_path: Optional[str] = None
+    # 该文件的行数上限与行的有效期（秒，None 即 MATHFLOW_CACHE_DB_TTL=0 表示不过期），超出上限时删除最旧的行
+    cache_db_max_rows: int = 100000
+    cache_db_ttl: Optional[float] = 7 * 24 * 3600.0
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        default_timeout = _env_float("MATHFLOW_TIMEOUT", 10.0)
+        timeouts = {}
+        for op in OPERATIONS:
+            name = f"MATHFLOW_TIMEOUT_{op.upper()}"
+            if os.environ.get(name):
+                timeouts[op] = _env_float(name, default_timeout)
+        operation_limits = {op: dict(limits) for op, limits in OPERATION_LIMITS.items()}
+        for op in OPERATIONS:
+            overrides = _env_limits(f"MATHFLOW_LIMITS_{op.upper()}")
+            if overrides:
+                operation_limits[op] = {**operation_limits.get(op, {}), **overrides}
+        return cls(
+            worker_count=max(1, _env_int("MATHFLOW_WORKERS", os.cpu_count() or 1)),
+            start_method=_env_str("MATHFLOW_START_METHOD", None),
+            server_processes=max(1, _env_int("MATHFLOW_PROCESSES", 1)),
+            default_timeout=default_timeout,
+            timeouts=timeouts,
+            complexity_limits={**COMPLEXITY_LIMITS, **_env_limits("MATHFLOW_LIMITS")},
+            operation_limits=operation_limits,
+            batch_max_items=_env_int("MATHFLOW_BATCH_MAX_ITEMS", 1000),
+            stream_window=max(1, _env_int("MATHFLOW_STREAM_WINDOW", 64)),
+            stream_max_line_bytes=_env_int("MATHFLOW_STREAM_MAX_LINE_BYTES", 1024 * 1024),
+            coalesce_requests=_env_bool("MATHFLOW_COALESCE", True),
+            parser_backend=_env_str("MATHFLOW_PARSER", "antlr").lower(),
+            parse_cache_size=_env_int("MATHFLOW_PARSE_CACHE_SIZE", 4096),
+            parse_cache_ttl=_env_float("MATHFLOW_PARSE_CACHE_TTL", 3600.0),
+            result_cache_size=_env_int("MATHFLOW_RESULT_CACHE_SIZE", 10000),
+            result_cache_bytes=_env_int("MATHFLOW_RESULT_CACHE_BYTES", 64 * 1024 * 1024),
+            expression_store_size=_env_int("MATHFLOW_EXPRESSION_STORE_SIZE", 10000),
+            expression_ttl=_env_float("MATHFLOW_EXPRESSION_TTL", 3600.0),
+            cost_model=_env_bool("MATHFLOW_COST_MODEL", True),
+            cache_db_path=_env_str("MATHFLOW_CACHE_DB", None),
+            cache_db_max_rows=max(1, _env_int("MATHFLOW_CACHE_DB_MAX_ROWS", 100000)),
+            cache_db_ttl=_env_float("MATHFLOW_CACHE_DB_TTL", 7 * 24 * 3600.0) or None,
+        )
+
+    def timeout_for(self, operation: str) -> float:
+        """Wall-clock budget in seconds for one call of ``operation``."""
+        return self.timeouts.get(operation, self.default_timeout)
+
+    def limits_for(self, operation: Optional[str]) -> Dict[str, int]:
+        """Complexity limits for one call of ``operation`` (None: the defaults)."""
+        return {**self.complexity_limits, **self.operation_limits.get(operation, {})}
+
+
+settings = Settings.from_env()
@@ -0,0 +1,264 @@
+"""
+Online cost model: predicted latency of an operation before it runs.
+
+Features describe the parsed input of one call (size, degree, which kinds
+of functions appear, nested radicals) and the parameters that scale the
+work (Taylor order, number of terms of a sum or product, pipeline steps).
+The worker computes them first, before the call itself; the API process
+then predicts the call's time from them and, when the call finishes (or
+runs out of time), trains the model of that operation on the observed
+time. Each prediction is recorded next to the actual time.
+
+One ridge regression per operation on log(seconds), updated online from
+sufficient statistics with exponential forgetting, so the model follows
+changes in load, caches and hardware. Every API process trains its own.
+"""
+import collections
+import math
+import threading
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+import sympy
+from sympy.functions.elementary.hyperbolic import HyperbolicFunction
+from sympy.functions.elementary.trigonometric import (
+    InverseTrigonometricFunction,
+    TrigonometricFunction,
+)
+
+from .services.complexity import (
+    check_parameters,
+    measure,
+    poly_within_limits,
+    range_size,
+    use_operation,
+)
+from .services.polynomial import recognize
+from .services.sympy_service import parse_latex_safe
+
+# 特征名称（顺序即特征向量的顺序）；规模类特征取 log1p
+FEATURES = (
+    "bias", "nodes", "degree", "symbols",
+    "trig", "exp", "log", "nested_radicals",
+    "parameter", "unbounded",
+)
+
+_TRIG = (TrigonometricFunction, InverseTrigonometricFunction, HyperbolicFunction)
+
+# 遗忘因子（约等于只记住最近 1000 次调用）与除常数项外各系数的岭惩罚
+_DECAY = 0.999
+_RIDGE = 1.0
+# 记录的最短耗时（log 之前）与最长预测
+_MIN_SECONDS = 1e-4
+_MAX_SECONDS = 1e6
+# /api/stats 中保留的最近预测记录数
+_RECENT = 100
+
+
+def _expressions(value: Any) -> List[sympy.Basic]:
+    """Parsed form of one argument (LaTeX, stored handle or list of them)."""
+    if isinstance(value, (list, tuple)):
+        return [expr for item in value for expr in _expressions(item)]
+    if isinstance(value, str):
+        # 多项式快速通道能识别的输入不必经过完整解析器
+        recognized = recognize(value)
+        if recognized is not None:
+            sides = [p for p in (recognized.lhs, recognized.rhs) if p is not None]
+            if all(poly_within_limits(p) for p in sides):
+                return [p.as_expr() for p in sides]
+    return [parse_latex_safe(value)]
+
+
+def _nested_radicals(expr: sympy.Basic) -> int:
+    radicals = [p for p in expr.atoms(sympy.Pow) if p.exp.is_Rational and not p.exp.is_Integer]
+    return sum(
+        1 for p in radicals
+        if any(q.exp.is_Rational and not q.exp.is_Integer for q in p.base.atoms(sympy.Pow))
+    )
+
+
+def _parameter(operation: str, args: tuple) -> Tuple[float, bool]:
+    """(size of the work parameter, whether it is unbounded) of one call."""
+    if operation == "taylor":
+        check_parameters(order=args[3])
+        return float(args[3]), False
+    if operation in ("sum", "product"):
+        bounds = parse_latex_safe(args[2]), parse_latex_safe(args[3])
+        check_parameters(bounds=bounds)
+        size = range_size(*bounds)
+        if size is not None:
+            return float(size), False
+        # 无穷或符号上下限
+        return 0.0, True
+    if operation == "pipeline":
+        return float(len(args[1])), False
+    return 0.0, False
+
+
+def call_features(operation: str, args: tuple) -> Tuple[float, ...]:
+    """
+    Feature vector (see FEATURES) of ``operation`` called with ``args``.
+
+    ``args`` are the service function's positional arguments as built by the
+    operation registry. The expressions and work parameters are checked
+    against the limits of ``operation``.
+
+    Raises:
+        ValueError: An expression cannot be parsed or is too complex
+    """
+    with use_operation(operation):
+        values = args[:2] if operation == "verify" else args[:1]
+        exprs = [expr for value in values for expr in _expressions(value)]
+        parameter, unbounded = _parameter(operation, args)
+
+    measures = [measure(expr) for expr in exprs]
+    symbols = set().union(*(expr.free_symbols for expr in exprs))
+    functions = [f for expr in exprs for f in expr.atoms(sympy.Function)]
+    # 指数函数，或指数含变量的幂（parse_latex 把 e^{x} 读作符号 e 的幂）
+    has_exp = any(isinstance(f, sympy.exp) for f in functions) or any(
+        p.exp.free_symbols for expr in exprs for p in expr.atoms(sympy.Pow)
+    )
+    # 次数：最大的数值幂次，含变量的表达式至少为 1
+    degree = max(
+        (max(m.exponent, 1.0 if expr.free_symbols else 0.0) for m, expr in zip(measures, exprs)),
+        default=0.0,
+    )
+    return (
+        1.0,
+        math.log1p(sum(m.nodes for m in measures)),
+        math.log1p(degree),
+        math.log1p(len(symbols)),
+        float(any(isinstance(f, _TRIG) for f in functions)),
+        float(has_exp),
+        float(any(isinstance(f, sympy.log) for f in functions)),
+        math.log1p(sum(_nested_radicals(expr) for expr in exprs)),
+        math.log1p(parameter),
+        float(unbounded),
+    )
+
+
+def _solve(matrix: List[List[float]], vector: List[float]) -> List[float]:
+    """Solve a small dense system by Gaussian elimination with partial pivoting."""
+    n = len(vector)
+    rows = [row[:] + [value] for row, value in zip(matrix, vector)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        if abs(rows[col][col]) < 1e-12:
+            continue
+        for r in range(col + 1, n):
+            factor = rows[r][col] / rows[col][col]
+            if factor:
+                for c in range(col, n + 1):
+                    rows[r][c] -= factor * rows[col][c]
+    weights = [0.0] * n
+    for r in range(n - 1, -1, -1):
+        if abs(rows[r][r]) < 1e-12:
+            continue
+        weights[r] = (rows[r][n] - sum(rows[r][c] * weights[c] for c in range(r + 1, n))) / rows[r][r]
+    return weights
+
+
+class _OperationModel:
+    """Ridge regression of log(seconds) on the features of one operation."""
+
+    def __init__(self, size: int):
+        self.xtx = [[0.0] * size for _ in range(size)]
+        self.xty = [0.0] * size
+        self.samples = 0
+        # 有预测的样本数与 |log(预测/实际)| 之和
+        self.predicted = 0
+        self.log_error = 0.0
+        self._weights: Optional[List[float]] = None
+
+    def weights(self) -> List[float]:
+        if self._weights is None:
+            # 常数项不惩罚：少量样本时预测接近该运算的平均耗时
+            matrix = [
+                [value + (_RIDGE if i == j and i else 0.0) for j, value in enumerate(row)]
+                for i, row in enumerate(self.xtx)
+            ]
+            self._weights = _solve(matrix, self.xty)
+        return self._weights
+
+    def observe(self, features: Sequence[float], target: float) -> None:
+        for i, xi in enumerate(features):
+            row = self.xtx[i]
+            for j, xj in enumerate(features):
+                row[j] = _DECAY * row[j] + xi * xj
+            self.xty[i] = _DECAY * self.xty[i] + xi * target
+        self.samples += 1
+        self._weights = None
+
+
+class CostModel:
+    """Per-operation online latency models; safe to use from several threads."""
+
+    def __init__(self, recent: int = _RECENT):
+        self._models: Dict[str, _OperationModel] = {}
+        self._recent: Deque[Dict[str, Any]] = collections.deque(maxlen=recent)
+        self._lock = threading.Lock()
+
+    def predict(self, operation: str, features: Sequence[float]) -> Optional[float]:
+        """Predicted seconds for one call, None before the first observation."""
+        with self._lock:
+            model = self._models.get(operation)
+            if model is None or not model.samples:
+                return None
+            log_seconds = sum(w * x for w, x in zip(model.weights(), features))
+        return math.exp(min(log_seconds, math.log(_MAX_SECONDS)))
+
+    def samples(self, operation: str) -> int:
+        with self._lock:
+            model = self._models.get(operation)
+            return model.samples if model is not None else 0
+
+    def observe(self, operation: str, features: Sequence[float], seconds: float,
+                predicted: Optional[float] = None, timed_out: bool = False) -> None:
+        """
+        Train on one finished call and record its prediction next to the actual time.
+
+        Args:
+            seconds: Observed time; for a call that ran out of time, its budget
+                (a lower bound of the real cost)
+            predicted: What was predicted before the call ran, if anything
+            timed_out: The call was stopped by its budget
+        """
+        target = math.log(max(seconds, _MIN_SECONDS))
+        with self._lock:
+            model = self._models.get(operation)
+            if model is None:
+                model = self._models[operation] = _OperationModel(len(FEATURES))
+            if predicted is not None:
+                model.predicted += 1
+                model.log_error += abs(math.log(max(predicted, _MIN_SECONDS)) - target)
+            model.observe(features, target)
+            self._recent.append({
+                "operation": operation,
+                "predicted": None if predicted is None else round(predicted, 4),
+                "actual": round(seconds, 4),
+                "timed_out": timed_out,
+            })
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Samples per operation and the typical error factor of its predictions
+        (exp of the mean |log(predicted / actual)|; 1.5 means within about 1.5x),
+        plus the most recent predictions with their actual times.
+        """
+        with self._lock:
+            return {
+                "operations": {
+                    name: {
+                        "samples": model.samples,
+                        "error_factor": (
+                            round(math.exp(model.log_error / model.predicted), 3) if model.predicted else None
+                        ),
+                    }
+                    for name, model in sorted(self._models.items())
+                },
+                "recent": list(self._recent),
+            }
+
+
+# API 进程内的模型（由计算进程池在每次运算结束时训练）
+cost_model = CostModel()
@@ -0,0 +1,89 @@
+"""
+Cancel request handlers whose client has disconnected.
+
+Starlette keeps running an HTTP handler after its client went away (request
+aborted, tab closed), so the worker behind it would go on computing a result
+nobody reads. CancelOnDisconnectMiddleware watches the connection once the
+request body has been read and cancels the handler as soon as the client
+disconnects before the response is complete. The cancellation propagates
+through run_operation() to WorkerPool.run(), which kills a busy worker and
+respawns it.
+"""
+import asyncio
+from typing import Dict
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+_counters = {"requests_cancelled": 0}
+
+
+def disconnect_stats() -> Dict[str, int]:
+    """Number of requests cancelled because their client disconnected."""
+    return dict(_counters)
+
+
+class CancelOnDisconnectMiddleware:
+    """
+    ASGI middleware cancelling the handler task on client disconnect.
+
+    After the last body chunk the middleware is the only reader of
+    ``receive``; a later ``receive()`` from the application (e.g.
+    StreamingResponse listening for a disconnect) waits for the disconnect the
+    middleware has seen.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        body_read = asyncio.Event()
+        disconnected = asyncio.Event()
+        response_done = False
+        abandoned = False
+
+        async def app_receive() -> Message:
+            if body_read.is_set():
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+            elif not message.get("more_body", False):
+                body_read.set()
+            return message
+
+        async def app_send(message: Message) -> None:
+            nonlocal response_done
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_done = True
+            await send(message)
+
+        handler = asyncio.create_task(self.app(scope, app_receive, app_send))
+
+        async def watch() -> None:
+            nonlocal abandoned
+            await body_read.wait()
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    break
+            disconnected.set()
+            # Servers also report a disconnect once the response is complete
+            if not response_done and not handler.done():
+                abandoned = True
+                _counters["requests_cancelled"] += 1
+                handler.cancel()
+
+        watcher = asyncio.create_task(watch())
+        try:
+            await handler
+        except asyncio.CancelledError:
+            if not abandoned:
+                # Cancelled from outside (server shutdown), not by the watcher
+                raise
+        finally:
+            watcher.cancel()
@@ -0,0 +1,57 @@
+"""
+Server-Sent Events for progressive results of slow operations.
+
+A progressive service generator runs in a worker through WorkerPool.stream()
+and every stage it produces becomes one event as soon as the worker sends
+it, cheap provisional stages first:
+
+    event: provisional
+    data: {"stage": "numeric", "result": "0.2325810593", "elapsed": 0.18}
+
+    event: final
+    data: {"stage": "integrate", "result": "...", "elapsed": 5.67}
+
+A failure ends the stream with an ``error`` event carrying the status code
+the REST route would have answered with (400, 504 or 500); provisional
+results sent before it still stand. When the client goes away the worker
+computing the remaining stages is killed.
+"""
+import json
+import time
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Callable, Dict
+
+from starlette.responses import StreamingResponse
+
+from .config import settings
+from .executor import OperationTimeoutError, get_pool
+
+
+def _event(name: str, data: Dict[str, Any]) -> str:
+    return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def progressive_events(operation: str, func: Callable, *args) -> AsyncIterator[str]:
+    """Run a progressive generator under the budget of ``operation`` and yield SSE events."""
+    started = time.monotonic()
+    stages = get_pool().stream(func, *args, timeout=settings.timeout_for(operation), operation=operation)
+    try:
+        async with aclosing(stages):
+            async for stage in stages:
+                name = "final" if stage.pop("final", False) else "provisional"
+                yield _event(name, {**stage, "elapsed": round(time.monotonic() - started, 3)})
+    except OperationTimeoutError as e:
+        yield _event("error", {"status": 504, "error": str(e)})
+    except ValueError as e:
+        yield _event("error", {"status": 400, "error": str(e)})
+    except Exception as e:
+        yield _event("error", {"status": 500, "error": f"{type(e).__name__}: {e}"})
+
+
+def progressive_response(operation: str, func: Callable, *args) -> StreamingResponse:
+    return StreamingResponse(
+        progressive_events(operation, func, *args),
+        media_type="text/event-stream",
+        # 禁止代理缓冲，否则临时结果会被攒到最后才送达
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,604 @@
+"""
+Process pool execution layer.
+
+SymPy calls are CPU bound and block the interpreter, so the async handlers in
+main.py never run them on the event loop. Every service call is shipped to a
+dedicated worker process and awaited, which keeps the API responsive (e.g.
+/health) while heavy computations run and lets one uvicorn worker use every
+core.
+
+Each worker process is driven by exactly one dispatcher thread, so at most
+``worker_count`` calls run concurrently and the rest wait in FIFO order.
+
+Every call has a wall-clock budget (queueing included). When it runs out the
+worker process computing the call is killed and replaced, so a runaway
+integral cannot keep burning a CPU after the client has been answered.
+
+run_operation() additionally coalesces identical in-flight requests: callers
+asking for the same operation on the same normalized input while a
+computation is running share that computation instead of starting another.
+Its calls also train the cost model (cost_model.py): the worker sends the
+call's features before computing it, the prediction made from them is
+recorded with the observed time when the call finishes or runs out of time.
+"""
+import asyncio
+import heapq
+import inspect
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from .config import OPERATIONS, settings
+from .cost_model import call_features, cost_model
+from .operations import check_call, iter_calls
+from .services.cache import cache_stats
+from .services.complexity import use_operation
+from .services.sympy_service import latex_tokens, parser_backend, use_parser
+
+
+class WorkerCrashedError(RuntimeError):
+    """The worker process died before returning a result."""
+
+
+class OperationTimeoutError(Exception):
+    """The call exceeded its wall-clock budget and its worker was terminated."""
+
+    def __init__(self, operation: str, timeout: float):
+        self.operation = operation
+        self.timeout = timeout
+        super().__init__(f"计算超时: {operation} 超过 {timeout:g} 秒限制")
+
+
+class _CallAborted(Exception):
+    """Internal: the call was aborted by the awaiting side."""
+
+
+def _worker_main(conn) -> None:
+    """
+    Worker loop: receive (func, args, kwargs, parser, operation, observe), reply (status, payload, stats).
+
+    ``func`` runs with the caller's LaTeX parser backend, checking parsed
+    expressions against the complexity limits of ``operation``. With
+    ``observe`` the cost-model features of the call are sent first as
+    ("features", features, None). When ``func`` returns a generator, every
+    item it yields is sent right away as ("partial", item, None) before the
+    final reply.
+    """
+    # Ctrl-C is handled by the parent, which shuts the pool down explicitly
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+
+        func, args, kwargs, parser, operation, observe = task
+        try:
+            with use_parser(parser), use_operation(operation):
+                if observe:
+                    try:
+                        conn.send(("features", call_features(operation, args), None))
+                    except Exception:
+                        # The call itself reports invalid input
+                        pass
+                status, payload = "ok", func(*args, **kwargs)
+                if inspect.isgenerator(payload):
+                    for item in payload:
+                        conn.send(("partial", item, None))
+                    payload = None
+        except Exception as e:
+            status, payload = "error", e
+
+        # Cache counters ride along with every reply so the API process can
+        # report them without an extra round trip to each worker
+        stats = cache_stats()
+        try:
+            conn.send((status, payload, stats))
+        except Exception as e:
+            # Result or exception could not be pickled
+            conn.send(("error", RuntimeError(f"{type(e).__name__}: {e}"), stats))
+
+
+class _Worker:
+    """A single worker process and the parent end of its pipe."""
+
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def call(self, call: "_Call"):
+        self.conn.send((call.func, call.args, call.kwargs, call.parser, call.operation, call.observe))
+        while True:
+            reply = self.conn.recv()
+            if reply[0] == "features":
+                call.computing(reply[1])
+            elif reply[0] != "partial":
+                return reply
+            elif call.on_partial is not None:
+                call.on_partial(reply[1])
+
+    def kill(self) -> None:
+        self.terminate()
+        self.process.join()
+        self.conn.close()
+
+    def terminate(self) -> None:
+        """Kill the process; the dispatcher thread blocked in call() sees EOF."""
+        if self.process.is_alive():
+            self.process.kill()
+
+    def close(self) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class _Call:
+    """One dispatched call; lets the awaiting side abort it from another thread."""
+
+    def __init__(self, func: Callable, args: tuple, kwargs: dict, operation: Optional[str] = None,
+                 on_partial: Optional[Callable[[Any], None]] = None, observe: bool = False):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        # Operation whose complexity limits apply in the worker
+        self.operation = operation
+        self.on_partial = on_partial
+        # Cost model: features sent by the worker, the prediction made from
+        # them, and when the worker took the call / how long it computed
+        self.observe = observe
+        self.features: Optional[Tuple[float, ...]] = None
+        self.predicted: Optional[float] = None
+        self.started: Optional[float] = None
+        self.seconds: Optional[float] = None
+        # Parser backend of the submitting request, applied in the worker
+        self.parser = parser_backend()
+        self.worker: Optional[_Worker] = None
+        self.aborted = False
+        self.lock = threading.Lock()
+
+    def computing(self, features: Tuple[float, ...]) -> None:
+        """The worker measured the input and starts computing."""
+        self.features = features
+        self.predicted = cost_model.predict(self.operation, features)
+
+    def record(self, seconds: float, timed_out: bool = False) -> None:
+        """Train the cost model on this call (when its features are known)."""
+        if self.observe and self.features is not None:
+            cost_model.observe(self.operation, self.features, seconds, self.predicted, timed_out)
+
+    def abort(self) -> None:
+        with self.lock:
+            self.aborted = True
+            worker = self.worker
+        if worker is not None:
+            worker.terminate()
+
+
+# 所有进程池共用：同一时刻只有一个计算进程在 fork
+_spawn_lock = threading.Lock()
+
+
+class WorkerPool:
+    """
+    Fixed-size pool of worker processes.
+
+    Args:
+        size: Number of worker processes
+        start_method: multiprocessing start method, None for the platform default
+    """
+
+    def __init__(self, size: int, start_method: Optional[str] = None):
+        self.size = size
+        self._ctx = multiprocessing.get_context(start_method)
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._workers = set()
+        self._worker_stats: Dict[_Worker, dict] = {}
+        # timeouts: 超时的调用；cancelled: 调用方放弃（客户端断开等）的调用；
+        # workers_killed: 因超时或取消而终止的忙碌计算进程
+        self._counters = {"timeouts": 0, "cancelled": 0, "workers_killed": 0}
+        for _ in range(size):
+            self._release(self._spawn())
+        self._threads = ThreadPoolExecutor(max_workers=size, thread_name_prefix="mathflow-dispatch")
+
+    def _spawn(self) -> _Worker:
+        # Spawning under a process-wide lock keeps a concurrently forked worker
+        # (of this pool or another one) from inheriting another worker's child
+        # pipe end, which would hide EOF
+        with _spawn_lock:
+            worker = _Worker(self._ctx)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _release(self, worker: _Worker) -> None:
+        self._idle.put(worker)
+
+    def _replace(self, worker: _Worker) -> None:
+        with self._lock:
+            self._workers.discard(worker)
+            self._worker_stats.pop(worker, None)
+        worker.kill()
+        if not self._closed:
+            self._release(self._spawn())
+
+    def _call_blocking(self, call: _Call):
+        worker = self._idle.get()
+        with call.lock:
+            if call.aborted:
+                self._release(worker)
+                raise _CallAborted()
+            call.worker = worker
+
+        call.started = time.perf_counter()
+        try:
+            status, payload, stats = worker.call(call)
+            call.seconds = time.perf_counter() - call.started
+            failure = None
+        except (EOFError, OSError) as e:
+            failure = e
+
+        with call.lock:
+            call.worker = None
+            aborted = call.aborted
+        if failure is not None or aborted:
+            if aborted:
+                self._count("workers_killed")
+            self._replace(worker)
+            if aborted:
+                raise _CallAborted()
+            raise WorkerCrashedError(f"计算进程异常退出: {failure}") from failure
+        with self._lock:
+            self._worker_stats[worker] = stats
+        self._release(worker)
+
+        if status == "error":
+            raise payload
+        return payload
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None,
+                  operation: Optional[str] = None, observe: bool = False, **kwargs) -> Any:
+        """
+        Run ``func(*args, **kwargs)`` in a worker process and await its result.
+
+        Args:
+            func: Picklable module-level callable
+            timeout: Wall-clock budget in seconds, None for no limit
+            operation: Operation name used in the timeout error and for the
+                complexity limits applied in the worker
+            observe: Train the cost model of ``operation`` on this call
+
+        Raises:
+            OperationTimeoutError: The budget ran out; the worker was killed
+        """
+        if self._closed:
+            raise RuntimeError("计算进程池已关闭")
+        loop = asyncio.get_running_loop()
+        call = _Call(func, args, kwargs, operation, observe=observe)
+        future = loop.run_in_executor(self._threads, self._call_blocking, call)
+        try:
+            result = await asyncio.wait_for(future, timeout)
+            call.record(call.seconds)
+            return result
+        except asyncio.TimeoutError:
+            call.abort()
+            if call.started is not None:
+                # Lower bound of the real cost: the time it had before being stopped
+                call.record(time.perf_counter() - call.started, timed_out=True)
+            self._count("timeouts")
+            raise OperationTimeoutError(operation or getattr(func, "__name__", "task"), timeout)
+        except asyncio.CancelledError:
+            # The caller went away (client disconnected, request cancelled):
+            # kill the worker instead of finishing work nobody will read
+            call.abort()
+            self._count("cancelled")
+            raise
+
+    async def stream(self, func: Callable, *args, timeout: Optional[float] = None,
+                     operation: Optional[str] = None, item_timeouts: Optional[List[float]] = None,
+                     **kwargs) -> AsyncIterator[Any]:
+        """
+        Run the generator function ``func`` in a worker and yield its items as they arrive.
+
+        The budget covers the whole generator. When it runs out, or when the
+        consumer stops iterating early, the worker is killed.
+
+        Args:
+            item_timeouts: Budget of each successive item, counted from the
+                previous one (or from the start); the worker is killed when
+                one runs out, like for the overall budget
+
+        Raises:
+            OperationTimeoutError: A budget ran out (items yielded so far stand)
+        """
+        if self._closed:
+            raise RuntimeError("计算进程池已关闭")
+        loop = asyncio.get_running_loop()
+        items: "asyncio.Queue[Any]" = asyncio.Queue()
+        call = _Call(func, args, kwargs, operation, on_partial=lambda item: loop.call_soon_threadsafe(items.put_nowait, item))
+        future = loop.run_in_executor(self._threads, self._call_blocking, call)
+        deadline = None if timeout is None else loop.time() + timeout
+        budgets = iter(item_timeouts or ())
+        item_budget = next(budgets, None)
+        item_deadline = None if item_budget is None else loop.time() + item_budget
+        try:
+            while True:
+                getter = asyncio.ensure_future(items.get())
+                limits = [d for d in (deadline, item_deadline) if d is not None]
+                remaining = max(min(limits) - loop.time(), 0) if limits else None
+                done, _ = await asyncio.wait({getter, future}, timeout=remaining,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    yield getter.result()
+                    item_budget = next(budgets, None)
+                    item_deadline = None if item_budget is None else loop.time() + item_budget
+                    continue
+                getter.cancel()
+                if future in done:
+                    # Items are queued before the final reply completes the future
+                    while not items.empty():
+                        yield items.get_nowait()
+                    future.result()
+                    return
+                call.abort()
+                future.cancel()
+                self._count("timeouts")
+                if item_deadline is not None and (deadline is None or item_deadline < deadline):
+                    timeout = item_budget
+                raise OperationTimeoutError(operation or getattr(func, "__name__", "task"), timeout)
+        finally:
+            if not future.done():
+                # Consumer stopped early (client gone)
+                call.abort()
+                future.cancel()
+                self._count("cancelled")
+
+    def stats(self) -> Dict[str, Any]:
+        """Call counters, and cache counters summed over the workers' latest snapshots."""
+        with self._lock:
+            snapshots = list(self._worker_stats.values())
+            calls = dict(self._counters)
+        caches: Dict[str, Dict[str, Any]] = {}
+        for snapshot in snapshots:
+            for name, counters in snapshot.items():
+                total = caches.setdefault(name, {})
+                for key, value in counters.items():
+                    total[key] = total.get(key, 0) + value
+        for total in caches.values():
+            lookups = total.get("hits", 0) + total.get("misses", 0)
+            total["hit_rate"] = total["hits"] / lookups if lookups else 0.0
+        return {"workers": self.size, "calls": calls, "caches": caches}
+
+    def shutdown(self) -> None:
+        self._closed = True
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        # Busy workers are killed, which unblocks their dispatcher threads
+        for worker in workers:
+            worker.close()
+        self._threads.shutdown(wait=True, cancel_futures=True)
+
+
+_pool: Optional[WorkerPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> WorkerPool:
+    """Return the process-wide pool, creating it on first use (and after fork)."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = WorkerPool(settings.worker_count, settings.start_method)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown()
+        _pool = None
+        _pool_pid = None
+
+
+async def run_in_pool(func: Callable, *args, **kwargs) -> Any:
+    """Dispatch a service call to the process pool and await the result."""
+    return await get_pool().run(func, *args, **kwargs)
+
+
+class _Flight:
+    """A shared in-flight computation and the number of callers awaiting it."""
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+# (event loop, flight key) -> in-flight computation
+_flights: Dict[tuple, _Flight] = {}
+_dispatch_counters = {"dispatched": 0, "coalesced": 0}
+
+
+def _flight_key(value):
+    """Hashable form of the call arguments with LaTeX spelling normalized."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_flight_key(v) for v in value)
+    if isinstance(value, str):
+        return latex_tokens(value)
+    return value
+
+
+def _end_flight(key: tuple, flight: _Flight) -> None:
+    if _flights.get(key) is flight:
+        del _flights[key]
+
+
+def dispatch_stats() -> Dict[str, int]:
+    """Counters of dispatched and coalesced operations in this process."""
+    return {**_dispatch_counters, "in_flight": len(_flights)}
+
+
+async def run_operation(operation: str, func: Callable, *args) -> Any:
+    """
+    Dispatch a service call under the configured budget for ``operation``.
+
+    Parameters that scale the work (Taylor order, sum/product range) are
+    checked before dispatch (see check_call()). Identical concurrent calls share one computation. The shared computation
+    owns the budget: when it runs out, pool.run() stops the worker, counts the
+    timeout and trains the cost model, and every caller gets the same
+    OperationTimeoutError. A caller that goes away (cancelled request) only
+    detaches itself; the shared computation is cancelled once nobody is
+    waiting for it anymore.
+    """
+    check_call(operation, args)
+    timeout = settings.timeout_for(operation)
+    observe = settings.cost_model and operation in OPERATIONS
+    pool = get_pool()
+    if not settings.coalesce_requests:
+        _dispatch_counters["dispatched"] += 1
+        return await pool.run(func, *args, timeout=timeout, operation=operation, observe=observe)
+
+    loop = asyncio.get_running_loop()
+    key = (loop, operation, parser_backend(), func.__module__, func.__qualname__, _flight_key(args))
+    flight = _flights.get(key)
+    if flight is None:
+        _dispatch_counters["dispatched"] += 1
+        task = loop.create_task(pool.run(func, *args, timeout=timeout, operation=operation, observe=observe))
+        flight = _flights[key] = _Flight(task)
+        task.add_done_callback(lambda _: _end_flight(key, flight))
+    else:
+        _dispatch_counters["coalesced"] += 1
+
+    flight.waiters += 1
+    try:
+        # 不另设超时：若调用方先于共享计算超时，取消会被当作 cancelled 统计
+        return await asyncio.shield(flight.task)
+    finally:
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.task.done():
+            # Nobody is waiting anymore; late arrivals start a fresh flight
+            _end_flight(key, flight)
+            flight.task.cancel()
+
+
+async def run_grouped(calls: List[Tuple[str, Callable, tuple]]) -> List[Tuple[str, Any]]:
+    """
+    Run many (operation, func, args) calls in parallel on the pool.
+
+    Calls are split into one chunk per worker; calls whose first argument
+    normalizes to the same input always land in the same chunk, so the worker
+    parses a repeated expression only once. Every call runs under its own
+    budget: when one runs out, only that call times out, its worker is
+    replaced and the rest of the chunk continues in another worker; outcomes
+    already computed are kept. Calls rejected by check_call() are not
+    dispatched.
+
+    Returns:
+        One (status, payload) per call, in input order. Status is "ok",
+        "invalid" (ValueError), "timeout" or "error".
+    """
+    if not calls:
+        return []
+    pool = get_pool()
+
+    outcomes: List[Tuple[str, Any]] = [("error", "")] * len(calls)
+    groups: Dict[Any, List[int]] = {}
+    for index, (operation, _, args) in enumerate(calls):
+        try:
+            check_call(operation, args)
+        except ValueError as e:
+            outcomes[index] = ("invalid", str(e))
+            continue
+        except Exception as e:
+            # 单项的预检失败只影响该项
+            outcomes[index] = ("error", f"{type(e).__name__}: {e}")
+            continue
+        key = _flight_key(args[0]) if args else None
+        groups.setdefault(key, []).append(index)
+    if not groups:
+        return outcomes
+
+    # Largest groups first, each onto the least loaded chunk
+    chunk_count = min(pool.size, len(groups))
+    chunks: List[List[int]] = [[] for _ in range(chunk_count)]
+    loads = [(0, i) for i in range(chunk_count)]
+    for indices in sorted(groups.values(), key=len, reverse=True):
+        load, i = heapq.heappop(loads)
+        chunks[i].extend(indices)
+        heapq.heappush(loads, (load + len(indices), i))
+
+    async def run_chunk(indices: List[int]) -> None:
+        pending = list(indices)
+        while pending:
+            budgets = [settings.timeout_for(calls[i][0]) for i in pending]
+            try:
+                async for outcome in pool.stream(iter_calls, [calls[i] for i in pending],
+                                                 operation="batch", item_timeouts=budgets):
+                    outcomes[pending.pop(0)] = outcome
+                return
+            except OperationTimeoutError as e:
+                # 只有当前一项超时；其余项在新的计算进程中继续
+                index = pending.pop(0)
+                outcomes[index] = ("timeout", str(OperationTimeoutError(calls[index][0], e.timeout)))
+            except Exception as e:
+                outcomes[pending.pop(0)] = ("error", f"{type(e).__name__}: {e}")
+
+    await asyncio.gather(*[run_chunk(indices) for indices in chunks])
+    return outcomes
+
+
+async def run_chunked(operation: str, func: Callable, head: tuple, items: list,
+                      cost: Optional[Callable[[Any], int]] = None) -> list:
+    """
+    Run ``func(*head, chunk)`` over contiguous chunks of ``items`` in parallel.
+
+    ``func`` must return one result per item of its chunk; the results are
+    concatenated in input order. Each chunk runs under the budget of
+    ``operation`` times its number of items, or times the summed ``cost`` of
+    its items when an item stands for several calls (e.g. a bucket of answers).
+
+    Raises:
+        OperationTimeoutError: A chunk exceeded its budget
+    """
+    if not items:
+        return []
+    pool = get_pool()
+    chunk_count = min(pool.size, len(items))
+    size, extra = divmod(len(items), chunk_count)
+    chunks, start = [], 0
+    for i in range(chunk_count):
+        end = start + size + (1 if i < extra else 0)
+        chunks.append(items[start:end])
+        start = end
+
+    budget = settings.timeout_for(operation)
+    results = await asyncio.gather(*[
+        pool.run(func, *head, chunk, operation=operation,
+                 timeout=budget * (sum(map(cost, chunk)) if cost is not None else len(chunk)))
+        for chunk in chunks
+    ])
+    return [result for chunk_results in results for result in chunk_results]
@@ -0,0 +1,199 @@
+"""
+Expression handles: parse once, operate many times.
+
+POST /api/expressions parses a LaTeX expression in a worker and stores the
+SymPy object here, in the API process, under a content address (hash of its
+srepr, so every spelling of the same parsed expression gets the same id).
+Operation requests may then pass ``expression_id`` instead of ``latex``; the
+stored object is shipped to the worker as is and never re-parsed.
+
+The store is a bounded LRU with a time to live; an expired or evicted id is
+rejected like any other invalid request field. Several API processes
+(``python -m app.server --processes N``) each have their own LRU, so they
+share handles through the SQLite file of the persistent result cache
+(MATHFLOW_CACHE_DB, required by the launcher for N > 1): a handle created by
+one process is found there by the others.
+
+The SQLite file is only touched off the event loop: handles named in a
+request body are loaded into the LRU before the body is validated (see
+ExpressionRoute and prefetch_expressions()), and request validation itself
+only reads the LRU. Shared rows hold the srepr of the expression, rebuilt
+by calling SymPy constructors only (see expression_from_srepr()), never by
+unpickling or eval.
+"""
+import ast
+import asyncio
+import functools
+import json
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Set
+
+import sympy
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import Response
+
+from . import __version__
+from .config import settings
+from .services.cache import LRUCache, SQLiteStore
+
+_store = LRUCache("expressions", settings.expression_store_size, settings.expression_ttl)
+# 各服务进程共享的句柄：表达式的 srepr 与存储时间，按 SymPy 与应用版本隔离
+_shared_store = (
+    SQLiteStore("expressions_shared", settings.cache_db_path, f"sympy-{sympy.__version__}/app-{__version__}",
+                settings.cache_db_max_rows, settings.cache_db_ttl)
+    if settings.cache_db_path
+    else None
+)
+
+
+class UnknownExpressionError(ValueError):
+    """The expression id was never stored, has expired or was evicted."""
+
+
+@functools.lru_cache(maxsize=None)
+def _basic_classes() -> Dict[str, type]:
+    """SymPy classes by name, including those not exported by the package (ExprCondPair, ...)."""
+    classes: Dict[str, type] = {}
+    stack = [sympy.Basic]
+    while stack:
+        cls = stack.pop()
+        if (cls.__module__ or "").startswith("sympy."):
+            classes.setdefault(cls.__name__, cls)
+        stack.extend(cls.__subclasses__())
+    return classes
+
+
+def _sympy_name(name: str) -> Any:
+    value = getattr(sympy, name, None)
+    if isinstance(value, sympy.Basic) or (isinstance(value, type) and issubclass(value, sympy.Basic)):
+        return value
+    return _basic_classes().get(name)
+
+
+def expression_from_srepr(text: str) -> sympy.Basic:
+    """
+    Rebuild an expression from its srepr without eval.
+
+    Only literals, tuples/lists and calls of SymPy classes (or of what they
+    return, e.g. ``Function('f')(x)``) are accepted; names must be SymPy
+    classes or SymPy singletons such as ``pi``.
+
+    Raises:
+        ValueError: The text is not the srepr of a SymPy expression
+    """
+    def build(node: ast.AST) -> Any:
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str, bool, type(None))):
+            return node.value
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            value = build(node.operand)
+            if isinstance(value, (int, float)):
+                return -value
+        elif isinstance(node, (ast.Tuple, ast.List)):
+            items = [build(item) for item in node.elts]
+            return tuple(items) if isinstance(node, ast.Tuple) else items
+        elif isinstance(node, ast.Name):
+            value = _sympy_name(node.id)
+            if value is not None:
+                return value
+        elif isinstance(node, ast.Call):
+            func = build(node.func)
+            if isinstance(func, type) and issubclass(func, sympy.Basic):
+                return func(*[build(arg) for arg in node.args],
+                            **{kw.arg: build(kw.value) for kw in node.keywords if kw.arg is not None})
+        raise ValueError(f"不是 SymPy 表达式的 srepr: {ast.dump(node)[:80]}")
+
+    try:
+        expr = build(ast.parse(text, mode="eval").body)
+    except (SyntaxError, TypeError, RecursionError) as e:
+        raise ValueError(f"不是 SymPy 表达式的 srepr: {e}")
+    if not isinstance(expr, sympy.Basic):
+        raise ValueError("不是 SymPy 表达式的 srepr")
+    return expr
+
+
+def _share(expression_id: str, expr: sympy.Basic) -> None:
+    _shared_store.set(("expression", expression_id), {"srepr": sympy.srepr(expr), "stored": time.time()})
+
+
+def _load_shared(expression_ids: List[str]) -> None:
+    """Copy the live shared handles among ``expression_ids`` into the local LRU (blocking)."""
+    for expression_id in expression_ids:
+        entry = _shared_store.get(("expression", expression_id))
+        if not isinstance(entry, dict) or time.time() - entry.get("stored", 0) > settings.expression_ttl:
+            continue
+        try:
+            expr = expression_from_srepr(entry["srepr"])
+        except (KeyError, ValueError):
+            # 损坏或旧格式的行按不存在处理
+            continue
+        _store.set(expression_id, expr)
+
+
+async def store_expression(expression_id: str, expr: sympy.Basic) -> None:
+    """Store (or refresh the time to live of) a parsed expression."""
+    _store.set(expression_id, expr)
+    if _shared_store is not None:
+        await asyncio.to_thread(_share, expression_id, expr)
+
+
+def expression_ids(payload: Any) -> Set[str]:
+    """
+    Every handle in a decoded JSON payload (at any depth): the values of the
+    ``*expression_id`` fields and the items of the ``*expression_ids`` lists.
+    """
+    found: Set[str] = set()
+    stack = [payload]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if str(key).endswith("expression_id") and isinstance(item, str):
+                    found.add(item)
+                elif str(key).endswith("expression_ids") and isinstance(item, list):
+                    found.update(i for i in item if isinstance(i, str))
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return found
+
+
+async def prefetch_expressions(payload: Any) -> None:
+    """Load the handles named in ``payload`` that this process lacks from the shared store."""
+    if _shared_store is None:
+        return
+    missing = [i for i in expression_ids(payload) if i not in _store]
+    if missing:
+        await asyncio.to_thread(_load_shared, missing)
+
+
+def get_expression(expression_id: str) -> sympy.Basic:
+    """The stored expression; handles of other processes must be prefetched first."""
+    expr = _store.get(expression_id)
+    if expr is None:
+        raise UnknownExpressionError(f"表达式不存在或已过期: {expression_id}")
+    return expr
+
+
+class ExpressionRoute(APIRoute):
+    """Route that prefetches the handles named in its JSON body before validating it."""
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        if self.body_field is None:
+            return handler
+
+        async def route_handler(request: Request) -> Response:
+            if _shared_store is not None:
+                # 请求体被缓存在 request 上，随后的校验不会再读一次
+                body = await request.body()
+                if b"expression_id" in body:
+                    try:
+                        payload = json.loads(body)
+                    except ValueError:
+                        # 由 FastAPI 报告格式错误
+                        payload = None
+                    await prefetch_expressions(payload)
+            return await handler(request)
+
+        return route_handler
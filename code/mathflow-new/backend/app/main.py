@@ -1,7 +1,9 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, WebSocket
+from pydantic import ValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
+from . import __version__
 from .models import (
     FactorizationRequest,
     FactorizationResponse,
@@ -11,6 +13,14 @@ from .models import (
     SimplifyResponse,
     VerifyRequest,
     VerifyResponse,
+    BulkVerifyRequest,
+    BulkVerifyResponse,
+    ClusterRequest,
+    EquivalenceClass,
+    ClusterResponse,
+    # 表达式句柄模型
+    ExpressionCreateRequest,
+    ExpressionHandle,
     # 微积分模型
     CalculusRequest,
     CalculusResponse,
@@ -30,12 +40,29 @@ from .models import (
     SolveInequalityResponse,
     SolveSystemRequest,
     SolveSystemResponse,
+    # 运算流水线模型
+    PipelineRequest,
+    PipelineResponse,
+    # 批量模型
+    BatchRequest,
+    BatchItemResult,
+    BatchResponse,
+    PredictRequest,
+    PredictResponse,
 )
 from .services.sympy_service import (
     factor_expression,
+    factor_expression_verified,
     expand_expression,
+    expand_expression_verified,
     simplify_expression,
-    verify_equivalence,
+    simplify_expression_verified,
+    verify_equivalence_detailed,
+    verify_candidates,
+    fingerprint_expressions,
+    group_fingerprints,
+    cluster_buckets,
+    parse_expression,
     # 微积分函数
     differentiate_expr,
     partial_derivative,
@@ -48,6 +75,13 @@ from .services.sympy_service import (
     taylor_series,
     compute_double_integral,
     compute_triple_integral,
+    run_pipeline,
+    # 渐进式结果（SSE）
+    integrate_progressive,
+    integrate_definite_progressive,
+    limit_progressive,
+    simplify_progressive,
+    available_parser_backends,
 )
 from .services.vector_calculus import (
     compute_gradient,
@@ -60,6 +94,24 @@ from .services.solve_service import (
     solve_inequality_with_steps,
     solve_system_with_steps,
 )
+from .config import settings
+from .cost_model import FEATURES, call_features, cost_model
+from .executor import (
+    OperationTimeoutError,
+    dispatch_stats,
+    get_pool,
+    run_chunked,
+    run_grouped,
+    run_operation,
+    shutdown_pool,
+)
+from .channel import serve_channel
+from .disconnect import CancelOnDisconnectMiddleware, disconnect_stats
+from .events import progressive_response
+from .expressions import ExpressionRoute, store_expression
+from .operations import UnknownOperationError, prepare_call
+from .parsers import ParserBackendMiddleware
+from .streaming import NDJSONStreamingResponse, stream_jobs
 
 
 @asynccontextmanager
@@ -69,14 +121,21 @@ async def lifespan(app: FastAPI):
     yield
     # 关闭时
     print("MathFlow Symbolic Math API shutting down...")
+    shutdown_pool()
 
 
 app = FastAPI(
     title="MathFlow Symbolic Math API",
     description="基于 SymPy 的符号数学计算服务，支持代数运算和微积分",
-    version="2.0.0",
+    version=__version__,
     lifespan=lifespan,
 )
+# 其他服务进程创建的表达式句柄在请求体校验之前、事件循环之外载入
+app.router.route_class = ExpressionRoute
+
+# 后注册的中间件在外层：CORS 包住解析器选择，使其错误响应也带 CORS 头
+# 按请求头 X-Parser-Backend 选择 LaTeX 解析器后端
+app.add_middleware(ParserBackendMiddleware)
 
 # CORS 配置
 app.add_middleware(
@@ -87,18 +146,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 客户端断开时取消请求及其后台计算
+app.add_middleware(CancelOnDisconnectMiddleware)
+
 
 @app.get("/")
 async def root():
     return {
         "message": "MathFlow Symbolic Math API",
-        "version": "2.0.0",
+        "version": __version__,
+        "parsers": {"default": settings.parser_backend, "available": available_parser_backends()},
         "endpoints": {
+            "表达式句柄": {
+                "expressions": "/api/expressions - 解析并存储表达式，返回可代替 latex 的 expression_id",
+            },
             "代数运算": {
                 "factor": "/api/factor - 因式分解",
                 "expand": "/api/expand - 展开",
                 "simplify": "/api/simplify - 化简",
                 "verify": "/api/verify - 验证等价性",
+                "verify-bulk": "/api/verify/bulk - 一个参考答案批量判定多个候选答案",
+                "verify-cluster": "/api/verify/cluster - 将多个答案分组为等价类",
             },
             "基础微积分": {
                 "differentiate": "/api/calculus/differentiate - 求导",
@@ -128,7 +196,23 @@ async def root():
                 "inequality": "/api/solve/inequality - 求解不等式",
                 "system": "/api/solve/system - 求解方程组",
             },
+            "渐进式结果 (SSE)": {
+                "simplify": "/api/simplify/stream - 化简（先给出部分化简）",
+                "integrate": "/api/calculus/integrate/stream - 不定积分（先给出最便宜策略的结果）",
+                "definite": "/api/calculus/definite-integral/stream - 定积分（先给出数值结果）",
+                "limit": "/api/calculus/limit/stream - 极限（先给出数值估计）",
+            },
+            "流水线": {
+                "pipeline": "/api/pipeline - 在服务端依次执行多个运算（中间结果不经 LaTeX 往返）",
+            },
+            "批量": {
+                "batch": "/api/batch - 批量运算（并行执行，按顺序返回）",
+                "stream": "/api/stream - NDJSON 流式批量运算（边读边算边返回）",
+                "ws": "/ws - WebSocket 多路复用通道（带 id 的请求、按完成顺序返回、可按 id 取消）",
+            },
+            "predict": "/api/predict - 预测运算耗时（不执行运算）",
             "health": "/health - 健康检查",
+            "stats": "/api/stats - 计算进程与缓存统计",
         }
     }
 
@@ -138,6 +222,50 @@ async def health():
     return {"status": "healthy"}
 
 
+@app.get("/api/stats")
+async def stats():
+    """计算进程池与缓存命中统计（各计算进程汇总）"""
+    return {
+        **get_pool().stats(),
+        "dispatch": dispatch_stats(),
+        "disconnects": disconnect_stats(),
+        # 耗时预测模型：各运算的样本数与预测误差，以及最近的预测值与实际耗时
+        "cost_model": cost_model.stats(),
+        # 由 app.server 启动时记录的导入与预热耗时
+        "startup": getattr(app.state, "startup", None),
+    }
+
+
+# ==================== 表达式句柄端点 ====================
+
+@app.post("/api/expressions", response_model=ExpressionHandle)
+async def create_expression_endpoint(request: ExpressionCreateRequest):
+    """
+    解析并存储表达式，返回句柄（解析结果的内容地址）
+
+    之后对同一表达式的各运算请求可传 expression_id 代替 latex，
+    服务端直接使用已解析的 SymPy 对象，不再重复解析。
+
+    示例:
+    - 输入: {"latex": "x^3 - x"}
+    - 输出: {"id": "3f2a...", "latex": "x^{3} - x", "expires_in": 3600.0}
+    - 之后: POST /api/calculus/differentiate {"expression_id": "3f2a...", "variable": "x"}
+
+    验证端点用 input_expression_id / output_expression_id；散度、旋度与方程组端点用
+    expression_ids 列表代替 components / equations。
+    """
+    try:
+        parsed = await run_operation("parse", parse_expression, request.latex)
+        await store_expression(parsed["id"], parsed["expression"])
+        return ExpressionHandle(id=parsed["id"], latex=parsed["latex"], expires_in=settings.expression_ttl)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"表达式存储失败: {str(e)}")
+
+
 # ==================== 代数运算端点 ====================
 
 @app.post("/api/factor", response_model=FactorizationResponse)
@@ -150,8 +278,13 @@ async def factor_endpoint(request: FactorizationRequest):
     - 输出: "(x - 2)(x - 3)"
     """
     try:
-        result = factor_expression(request.latex)
+        if request.verify:
+            data = await run_operation("factor", factor_expression_verified, request.expression)
+            return FactorizationResponse(**data)
+        result = await run_operation("factor", factor_expression, request.expression)
         return FactorizationResponse(result=result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -168,8 +301,13 @@ async def expand_endpoint(request: ExpandRequest):
     - 输出: "x^{2} + 2 x + 1"
     """
     try:
-        result = expand_expression(request.latex)
+        if request.verify:
+            data = await run_operation("expand", expand_expression_verified, request.expression)
+            return ExpandResponse(**data)
+        result = await run_operation("expand", expand_expression, request.expression)
         return ExpandResponse(result=result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -186,8 +324,13 @@ async def simplify_endpoint(request: SimplifyRequest):
     - 输出: "x^{2} + 3 x - 3"
     """
     try:
-        result = simplify_expression(request.latex)
+        if request.verify:
+            data = await run_operation("simplify", simplify_expression_verified, request.expression)
+            return SimplifyResponse(**data)
+        result = await run_operation("simplify", simplify_expression, request.expression)
         return SimplifyResponse(result=result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -201,11 +344,15 @@ async def verify_endpoint(request: VerifyRequest):
 
     示例:
     - 输入: {"input_latex": "x^2 - 4", "output_latex": "(x-2)(x+2)"}
-    - 输出: {"is_equivalent": true}
+    - 输出: {"is_equivalent": true, "method": "polynomial"}
     """
     try:
-        is_equiv = verify_equivalence(request.input_latex, request.output_latex)
-        return VerifyResponse(is_equivalent=is_equiv)
+        is_equiv, method = await run_operation(
+            "verify", verify_equivalence_detailed, request.input_expression, request.output_expression
+        )
+        return VerifyResponse(is_equivalent=is_equiv, method=method)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception:
@@ -213,6 +360,86 @@ async def verify_endpoint(request: VerifyRequest):
         return VerifyResponse(is_equivalent=False)
 
 
+@app.post("/api/verify/bulk", response_model=BulkVerifyResponse)
+async def bulk_verify_endpoint(request: BulkVerifyRequest):
+    """
+    用一个参考答案批量判定多个候选答案是否等价（自动批改）
+
+    参考答案在每个计算进程中只解析、预处理一次，候选答案分块并行判定。
+
+    示例:
+    - 输入: {"reference": "(x+1)^2", "candidates": ["x^2+2x+1", "x^2+1"]}
+    - 输出: {"results": [{"is_equivalent": true, "method": "polynomial"},
+                         {"is_equivalent": false, "method": "polynomial"}]}
+    """
+    if len(request.candidates) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"候选答案数量不能超过 {settings.batch_max_items}",
+        )
+    try:
+        results = await run_chunked("verify", verify_candidates, (request.reference,), request.candidates)
+        return BulkVerifyResponse(results=[
+            VerifyResponse(is_equivalent=is_equiv, method=method) for is_equiv, method in results
+        ])
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"批量验证失败: {str(e)}")
+
+
+@app.post("/api/verify/cluster", response_model=ClusterResponse)
+async def cluster_endpoint(request: ClusterRequest):
+    """
+    将一组答案（如全班提交的答案）分组为等价类
+
+    先并行计算每个表达式的数值指纹（固定随机点上的取值），把在容差内相符的指纹分为一桶，
+    只在同一桶内做符号验证，因此工作量近似线性而不是两两比较。
+
+    示例:
+    - 输入: {"expressions": ["(x+1)^2", "x^2+1", "x^2+2x+1"]}
+    - 输出: {"classes": [{"representative": "(x+1)^2", "members": [0, 2]},
+                         {"representative": "x^2+1", "members": [1]}],
+             "invalid": []}
+    """
+    expressions = request.expressions
+    if len(expressions) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"表达式数量不能超过 {settings.batch_max_items}",
+        )
+    try:
+        fingerprints = await run_chunked("verify", fingerprint_expressions, (), expressions)
+        invalid = [index for index, fingerprint in enumerate(fingerprints) if fingerprint is None]
+        buckets = group_fingerprints(fingerprints)
+
+        # 只有一个成员的桶本身就是一个等价类，无需验证；其余每个成员各有一份验证预算
+        classes = [indices for indices in buckets if len(indices) == 1]
+        shared = [indices for indices in buckets if len(indices) > 1]
+        bucket_classes = await run_chunked(
+            "verify", cluster_buckets, (), [[expressions[i] for i in indices] for indices in shared], cost=len
+        )
+        for indices, local_classes in zip(shared, bucket_classes):
+            classes.extend([indices[i] for i in members] for members in local_classes)
+
+        classes.sort(key=lambda members: members[0])
+        return ClusterResponse(
+            classes=[
+                EquivalenceClass(representative=expressions[members[0]], members=members)
+                for members in classes
+            ],
+            invalid=invalid,
+        )
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"等价类分组失败: {str(e)}")
+
+
 # ==================== 基础微积分端点 ====================
 
 @app.post("/api/calculus/differentiate", response_model=CalculusResponse)
@@ -225,8 +452,10 @@ async def differentiate_endpoint(request: CalculusRequest):
     - 输出: {"result": "3 x^{2}"}
     """
     try:
-        result = differentiate_expr(request.latex, request.variable)
+        result = await run_operation("differentiate", differentiate_expr, request.expression, request.variable)
         return CalculusResponse(result=result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -243,8 +472,10 @@ async def partial_derivative_endpoint(request: CalculusRequest):
     - 输出: {"result": "2 x"}
     """
     try:
-        result = partial_derivative(request.latex, request.variable)
+        result = await run_operation("partial", partial_derivative, request.expression, request.variable)
         return CalculusResponse(result=result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -261,8 +492,10 @@ async def integrate_endpoint(request: CalculusRequest):
     - 输出: {"result": "\\frac{x^{3}}{3}"}
     """
     try:
-        result = integrate_indefinite(request.latex, request.variable)
+        result = await run_operation("integrate", integrate_indefinite, request.expression, request.variable)
         return CalculusResponse(result=result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -279,13 +512,17 @@ async def definite_integral_endpoint(request: DefiniteIntegralRequest):
     - 输出: {"result": "\\frac{1}{3}"}
     """
     try:
-        result = integrate_definite(
-            request.latex,
+        result = await run_operation(
+            "definite_integral",
+            integrate_definite,
+            request.expression,
             request.variable,
             request.lower_limit,
             request.upper_limit
         )
         return CalculusResponse(result=result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -302,8 +539,10 @@ async def limit_endpoint(request: LimitRequest):
     - 输出: {"result": "1"}
     """
     try:
-        result = compute_limit(request.latex, request.variable, request.point)
+        result = await run_operation("limit", compute_limit, request.expression, request.variable, request.point)
         return CalculusResponse(result=result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -320,8 +559,10 @@ async def limit_infinity_endpoint(request: CalculusRequest):
     - 输出: {"result": "0"}
     """
     try:
-        result = limit_at_infinity(request.latex, request.variable)
+        result = await run_operation("limit_infinity", limit_at_infinity, request.expression, request.variable)
         return CalculusResponse(result=result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -338,13 +579,17 @@ async def summation_endpoint(request: SummationRequest):
     - 输出: {"result": "55"}
     """
     try:
-        result = compute_summation(
-            request.latex,
+        result = await run_operation(
+            "sum",
+            compute_summation,
+            request.expression,
             request.variable,
             request.start,
             request.end
         )
         return CalculusResponse(result=result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -361,13 +606,17 @@ async def product_endpoint(request: ProductRequest):
     - 输出: {"result": "32"}
     """
     try:
-        result = compute_product(
-            request.latex,
+        result = await run_operation(
+            "product",
+            compute_product,
+            request.expression,
             request.variable,
             request.start,
             request.end
         )
         return CalculusResponse(result=result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -384,13 +633,17 @@ async def taylor_endpoint(request: TaylorRequest):
     - 输出: {"result": "x - \\frac{x^{3}}{6} + \\frac{x^{5}}{120}"}
     """
     try:
-        result = taylor_series(
-            request.latex,
+        result = await run_operation(
+            "taylor",
+            taylor_series,
+            request.expression,
             request.variable,
             request.point,
             request.order
         )
         return CalculusResponse(result=result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -409,8 +662,10 @@ async def gradient_endpoint(request: VectorCalculusRequest):
     - 输出: {"result": "\\langle 2 x, 2 y \\rangle"}
     """
     try:
-        result = compute_gradient(request.latex, request.variables)
+        result = await run_operation("gradient", compute_gradient, request.expression, request.variables)
         return CalculusResponse(result=result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -427,8 +682,10 @@ async def divergence_endpoint(request: VectorFieldRequest):
     - 输出: {"result": "3"}
     """
     try:
-        result = compute_divergence(request.components, request.variables)
+        result = await run_operation("divergence", compute_divergence, request.expressions, request.variables)
         return CalculusResponse(result=result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -445,8 +702,10 @@ async def curl_endpoint(request: VectorFieldRequest):
     - 输出: {"result": "\\langle 0, 0, 2 \\rangle"}
     """
     try:
-        result = compute_curl(request.components, request.variables)
+        result = await run_operation("curl", compute_curl, request.expressions, request.variables)
         return CalculusResponse(result=result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -463,8 +722,10 @@ async def laplacian_endpoint(request: VectorCalculusRequest):
     - 输出: {"result": "6"}
     """
     try:
-        result = compute_laplacian(request.latex, request.variables)
+        result = await run_operation("laplacian", compute_laplacian, request.expression, request.variables)
         return CalculusResponse(result=result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -483,12 +744,16 @@ async def double_integral_endpoint(request: DoubleIntegralRequest):
     - 输出: {"result": "1"}
     """
     try:
-        result = compute_double_integral(
-            request.latex,
+        result = await run_operation(
+            "double_integral",
+            compute_double_integral,
+            request.expression,
             request.variables,
             request.limits
         )
         return CalculusResponse(result=result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -505,12 +770,16 @@ async def triple_integral_endpoint(request: TripleIntegralRequest):
     - 输出: {"result": "1"}
     """
     try:
-        result = compute_triple_integral(
-            request.latex,
+        result = await run_operation(
+            "triple_integral",
+            compute_triple_integral,
+            request.expression,
             request.variables,
             request.limits
         )
         return CalculusResponse(result=result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -523,8 +792,10 @@ async def triple_integral_endpoint(request: TripleIntegralRequest):
 async def solve_equation_endpoint(request: SolveEquationRequest):
     """求解方程（一元一次、一元二次、分式方程）"""
     try:
-        result = solve_equation_with_steps(request.latex)
+        result = await run_operation("solve_equation", solve_equation_with_steps, request.expression)
         return SolveEquationResponse(**result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -535,8 +806,10 @@ async def solve_equation_endpoint(request: SolveEquationRequest):
 async def solve_inequality_endpoint(request: SolveInequalityRequest):
     """求解不等式（一元一次、一元二次）"""
     try:
-        result = solve_inequality_with_steps(request.latex)
+        result = await run_operation("solve_inequality", solve_inequality_with_steps, request.expression)
         return SolveInequalityResponse(**result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -547,9 +820,218 @@ async def solve_inequality_endpoint(request: SolveInequalityRequest):
 async def solve_system_endpoint(request: SolveSystemRequest):
     """求解方程组"""
     try:
-        result = solve_system_with_steps(request.equations, request.variables)
+        result = await run_operation("solve_system", solve_system_with_steps, request.expressions, request.variables)
         return SolveSystemResponse(**result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"求解失败: {str(e)}")
+
+
+# ==================== 运算流水线端点 ====================
+
+@app.post("/api/pipeline", response_model=PipelineResponse)
+async def pipeline_endpoint(request: PipelineRequest):
+    """
+    对一个表达式依次执行多个运算，步骤间直接传递 SymPy 对象
+
+    可用步骤: expand, factor, simplify, cancel, together, apart,
+    collect, differentiate, integrate（后四个使用 variable，默认 x）。
+    只返回最终结果与标记了 output 的步骤的中间结果。
+
+    示例:
+    - 输入: {"latex": "(x+1)^2 (x-1)", "steps": [{"op": "expand", "output": true},
+                                                 {"op": "differentiate"}, {"op": "factor"}]}
+    - 输出: {"result": "\\left(x + 1\\right) \\left(3 x - 1\\right)",
+             "steps": [{"index": 0, "op": "expand", "result": "x^{3} + x^{2} - x - 1"}]}
+    """
+    try:
+        steps = [(step.op, step.variable, step.output) for step in request.steps]
+        result = await run_operation("pipeline", run_pipeline, request.expression, steps)
+        return PipelineResponse(**result)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"流水线执行失败: {str(e)}")
+
+
+# ==================== 渐进式结果端点 (SSE) ====================
+# 请求体与对应的 REST 端点相同；响应为 text/event-stream：若干 provisional 事件，
+# 最后一个 final 事件（失败时为 error 事件，带对应的 HTTP 状态码）。
+
+@app.post("/api/simplify/stream")
+async def simplify_stream_endpoint(request: SimplifyRequest):
+    """
+    化简表达式，以 SSE 渐进返回：先给出部分化简（together + cancel），再给出 simplify() 的结果
+
+    示例:
+    - 输入: {"latex": "\\frac{x^2-1}{x-1} + \\sin^2(x) + \\cos^2(x)"}
+    - 输出: event: provisional  data: {"stage": "cancel", "result": "x + \\sin^{2}{...} + \\cos^{2}{...} + 1", ...}
+            event: final        data: {"stage": "simplify", "result": "x + 2", ...}
+    """
+    return progressive_response("simplify", simplify_progressive, request.expression)
+
+
+@app.post("/api/calculus/integrate/stream")
+async def integrate_stream_endpoint(request: CalculusRequest):
+    """不定积分，以 SSE 渐进返回：先给出手工积分策略的结果，再给出完整 integrate() 的结果"""
+    return progressive_response("integrate", integrate_progressive, request.expression, request.variable)
+
+
+@app.post("/api/calculus/definite-integral/stream")
+async def definite_integral_stream_endpoint(request: DefiniteIntegralRequest):
+    """
+    定积分，以 SSE 渐进返回：先给出数值积分，再给出精确结果
+
+    示例:
+    - 输入: {"latex": "\\frac{\\sin(x)}{x}", "variable": "x", "lower_limit": "1", "upper_limit": "2"}
+    - 输出: event: provisional  data: {"stage": "numeric", "result": "0.6593299064", ...}
+            event: final        data: {"stage": "integrate", "result": "- \\operatorname{Si}{...} + ...", ...}
+    """
+    return progressive_response(
+        "definite_integral",
+        integrate_definite_progressive,
+        request.expression,
+        request.variable,
+        request.lower_limit,
+        request.upper_limit,
+    )
+
+
+@app.post("/api/calculus/limit/stream")
+async def limit_stream_endpoint(request: LimitRequest):
+    """极限，以 SSE 渐进返回：先给出趋近点附近取样的数值估计，再给出 limit() 的精确结果"""
+    return progressive_response("limit", limit_progressive, request.expression, request.variable, request.point)
+
+
+# ==================== 耗时预测端点 ====================
+
+@app.post("/api/predict", response_model=PredictResponse)
+async def predict_endpoint(request: PredictRequest):
+    """
+    预测一次运算的计算耗时，不执行运算本身
+
+    请求体与 /api/batch 的单项相同。只解析输入并提取特征（规模、次数、三角/指数/对数函数、
+    嵌套根式、泰勒阶数与求和项数等），由按运算在线学习的模型给出预测；
+    输入超出复杂度上限时与运算本身一样返回 400。
+
+    示例:
+    - 输入: {"op": "integrate", "latex": "e^{x} \\sin(x)", "variable": "x"}
+    - 输出: {"operation": "integrate", "predicted_seconds": 0.42, "samples": 318,
+             "timeout": 10.0, "features": {...}}
+    """
+    try:
+        operation, _, args = prepare_call(request.op, request.model_extra or {})
+    except UnknownOperationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    try:
+        features = await run_operation("predict", call_features, operation.name, args)
+    except OperationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"耗时预测失败: {str(e)}")
+
+    return PredictResponse(
+        operation=operation.name,
+        predicted_seconds=cost_model.predict(operation.name, features),
+        samples=cost_model.samples(operation.name),
+        timeout=settings.timeout_for(operation.name),
+        features=dict(zip(FEATURES, features)),
+    )
+
+
+# ==================== 批量端点 ====================
+
+# run_grouped() 状态 -> HTTP 状态码
+_BATCH_STATUS = {"ok": 200, "invalid": 400, "timeout": 504, "error": 500}
+
+
+@app.post("/api/batch", response_model=BatchResponse)
+async def batch_endpoint(request: BatchRequest):
+    """
+    批量执行多个运算，在计算进程池上并行计算，结果按请求顺序返回
+
+    每一项的字段与对应端点的请求体相同，另加 op 指定运算名；
+    单项失败不影响其他项。批内重复的表达式只解析一次。
+
+    示例:
+    - 输入: {"operations": [{"op": "factor", "latex": "x^2 - 4"},
+                            {"op": "differentiate", "latex": "x^3", "variable": "x"}]}
+    - 输出: {"results": [{"ok": true, "status": 200, "result": {"result": "..."}}, ...]}
+    """
+    if len(request.operations) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"批量运算数量不能超过 {settings.batch_max_items}",
+        )
+
+    results = [None] * len(request.operations)
+    calls = []
+    pending = []
+    for index, item in enumerate(request.operations):
+        try:
+            operation, func, args = prepare_call(item.op, item.model_extra or {})
+        except UnknownOperationError as e:
+            results[index] = BatchItemResult(ok=False, status=400, error=str(e))
+        except ValidationError as e:
+            results[index] = BatchItemResult(ok=False, status=422, error=str(e))
+        else:
+            calls.append((operation.name, func, args))
+            pending.append((index, operation))
+
+    outcomes = await run_grouped(calls)
+    for (index, operation), (status, payload) in zip(pending, outcomes):
+        if status == "ok":
+            results[index] = BatchItemResult(ok=True, status=200, result=operation.respond(payload))
+        else:
+            results[index] = BatchItemResult(ok=False, status=_BATCH_STATUS[status], error=payload)
+
+    return BatchResponse(results=results)
+
+
+@app.post("/api/stream")
+async def stream_endpoint(request: Request, ordered: bool = True):
+    """
+    NDJSON 流式批量运算，适合十万级任务的离线重算
+
+    请求体每行一个任务：op 指定运算名，id 可选（原样返回），其余字段与对应端点的请求体相同。
+    响应每行一个结果，字段与 /api/batch 的单项结果相同，另加 index 与 id。
+    服务端最多同时执行 MATHFLOW_STREAM_WINDOW 个任务，窗口满时暂停读取请求体（背压），
+    因此不会把整个任务集读入内存。ordered=false 时结果按完成顺序返回。
+
+    示例:
+    - 输入: {"id": "a", "op": "factor", "latex": "x^2 - 4"}
+            {"id": "b", "op": "differentiate", "latex": "x^3"}
+    - 输出: {"ok": true, "status": 200, "result": {"result": "..."}, "error": null, "index": 0, "id": "a"}
+            {"ok": true, "status": 200, "result": {"result": "3 x^{2}"}, "error": null, "index": 1, "id": "b"}
+    """
+    return NDJSONStreamingResponse(stream_jobs(
+        request.stream(),
+        ordered=ordered,
+        window=settings.stream_window,
+        max_line_bytes=settings.stream_max_line_bytes,
+    ))
+
+
+@app.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket):
+    """
+    WebSocket 多路复用通道：一个连接承载多个带 id 的运算请求
+
+    每条消息为一个任务，格式同 /api/stream；结果按完成顺序返回（带 id 与 index），
+    字段与 /api/batch 的单项结果相同。发送 {"op": "cancel", "id": ...} 取消进行中的请求。
+
+    示例:
+    - 发送: {"id": "a1", "op": "factor", "latex": "x^2 - 4"}
+    - 接收: {"ok": true, "status": 200, "result": {"result": "..."}, "error": null, "index": 0, "id": "a1"}
+    """
+    await serve_channel(websocket)
@@ -1,44 +1,133 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, model_validator
+from typing import Any, Dict, List, Literal, Optional
 
+from .expressions import get_expression
 
-class FactorizationRequest(BaseModel):
-    latex: str = Field(..., description="LaTeX 表达式，例如: x^2 - 5x + 6")
+
+def _resolve(value: Any, handle: Any, value_field: str, handle_field: str) -> Any:
+    """LaTeX 与句柄二选一：返回 LaTeX 原值，或句柄对应的已存储 SymPy 对象（列表逐项对应）"""
+    if (value is None) == (handle is None):
+        raise ValueError(f"{value_field} 与 {handle_field} 必须且只能提供一个")
+    if handle is None:
+        return value
+    if isinstance(handle, list):
+        return [get_expression(h) for h in handle]
+    return get_expression(handle)
+
+
+class ExpressionRequest(BaseModel):
+    """
+    带单个表达式输入的请求基类：latex 与 expression_id 二选一
+
+    expression_id 为 POST /api/expressions 返回的句柄，校验时即解析为已存储的 SymPy 对象，
+    未知或已过期的句柄与其他非法字段一样返回 422。
+    """
+    latex: Optional[str] = Field(None, description="LaTeX 表达式")
+    expression_id: Optional[str] = Field(None, description="POST /api/expressions 返回的表达式句柄，可代替 latex")
+
+    _expression: Any = PrivateAttr(None)
+
+    @model_validator(mode="after")
+    def _resolve_expression(self):
+        self._expression = _resolve(self.latex, self.expression_id, "latex", "expression_id")
+        return self
+
+    @property
+    def expression(self) -> Any:
+        """交给服务函数的表达式：LaTeX 字符串或已存储的 SymPy 对象"""
+        return self._expression
+
+
+class FactorizationRequest(ExpressionRequest):
+    latex: Optional[str] = Field(None, description="LaTeX 表达式，例如: x^2 - 5x + 6")
+    verify: bool = Field(default=False, description="是否在同一请求中验证结果与输入等价")
 
 
 class FactorizationResponse(BaseModel):
     result: str = Field(..., description="因式分解后的 LaTeX 表达式")
+    verified: Optional[bool] = Field(None, description="结果是否与输入等价（仅当请求 verify=true 时返回）")
 
 
-class ExpandRequest(BaseModel):
-    latex: str = Field(..., description="LaTeX 表达式")
+class ExpandRequest(ExpressionRequest):
+    latex: Optional[str] = Field(None, description="LaTeX 表达式")
+    verify: bool = Field(default=False, description="是否在同一请求中验证结果与输入等价")
 
 
 class ExpandResponse(BaseModel):
     result: str = Field(..., description="展开后的 LaTeX 表达式")
+    verified: Optional[bool] = Field(None, description="结果是否与输入等价（仅当请求 verify=true 时返回）")
 
 
-class SimplifyRequest(BaseModel):
-    latex: str = Field(..., description="LaTeX 表达式")
+class SimplifyRequest(ExpressionRequest):
+    latex: Optional[str] = Field(None, description="LaTeX 表达式")
+    verify: bool = Field(default=False, description="是否在同一请求中验证结果与输入等价")
 
 
 class SimplifyResponse(BaseModel):
     result: str = Field(..., description="化简后的 LaTeX 表达式")
+    verified: Optional[bool] = Field(None, description="结果是否与输入等价（仅当请求 verify=true 时返回）")
 
 
 class VerifyRequest(BaseModel):
-    input_latex: str = Field(..., description="原始表达式的 LaTeX")
-    output_latex: str = Field(..., description="操作结果表达式的 LaTeX")
+    """两个表达式各自以 LaTeX 或表达式句柄给出"""
+    input_latex: Optional[str] = Field(None, description="原始表达式的 LaTeX")
+    output_latex: Optional[str] = Field(None, description="操作结果表达式的 LaTeX")
+    input_expression_id: Optional[str] = Field(None, description="原始表达式的句柄，可代替 input_latex")
+    output_expression_id: Optional[str] = Field(None, description="结果表达式的句柄，可代替 output_latex")
+
+    _input: Any = PrivateAttr(None)
+    _output: Any = PrivateAttr(None)
+
+    @model_validator(mode="after")
+    def _resolve_expressions(self):
+        self._input = _resolve(self.input_latex, self.input_expression_id, "input_latex", "input_expression_id")
+        self._output = _resolve(self.output_latex, self.output_expression_id, "output_latex", "output_expression_id")
+        return self
+
+    @property
+    def input_expression(self) -> Any:
+        return self._input
+
+    @property
+    def output_expression(self) -> Any:
+        return self._output
 
 
 class VerifyResponse(BaseModel):
     is_equivalent: bool = Field(..., description="两个表达式是否数学等价")
+    method: Optional[str] = Field(
+        None,
+        description="判定所用的检查层级: structural / polynomial / numeric / equals / simplify / error；批量验证中超过复杂度上限的候选答案为 too_complex",
+    )
+
+
+class BulkVerifyRequest(BaseModel):
+    reference: str = Field(..., description="参考答案的 LaTeX")
+    candidates: List[str] = Field(..., description="待判定的候选答案 LaTeX 列表")
+
+
+class BulkVerifyResponse(BaseModel):
+    results: List[VerifyResponse] = Field(..., description="与候选答案顺序一致的判定结果")
+
+
+class ClusterRequest(BaseModel):
+    expressions: List[str] = Field(..., description="待分组的 LaTeX 表达式列表（如全班提交的答案）")
+
+
+class EquivalenceClass(BaseModel):
+    representative: str = Field(..., description="代表表达式（该类中第一个成员）")
+    members: List[int] = Field(..., description="该类成员在输入列表中的下标")
+
+
+class ClusterResponse(BaseModel):
+    classes: List[EquivalenceClass] = Field(..., description="等价类，按第一个成员的下标排序")
+    invalid: List[int] = Field(default_factory=list, description="无法解析的表达式下标")
 
 
 # ==================== 微积分模型 ====================
 
-class CalculusRequest(BaseModel):
-    latex: str = Field(..., description="LaTeX 表达式")
+class CalculusRequest(ExpressionRequest):
+    latex: Optional[str] = Field(None, description="LaTeX 表达式")
     variable: str = Field(default="x", description="变量名，默认为 x")
 
 
@@ -46,58 +135,71 @@ class CalculusResponse(BaseModel):
     result: str = Field(..., description="计算结果的 LaTeX 表示")
 
 
-class DefiniteIntegralRequest(BaseModel):
-    latex: str = Field(..., description="LaTeX 表达式")
+class DefiniteIntegralRequest(ExpressionRequest):
+    latex: Optional[str] = Field(None, description="LaTeX 表达式")
     variable: str = Field(default="x", description="积分变量")
     lower_limit: str = Field(..., description="积分下限，可解析为数字或符号")
     upper_limit: str = Field(..., description="积分上限，可解析为数字或符号")
 
 
-class LimitRequest(BaseModel):
-    latex: str = Field(..., description="LaTeX 表达式")
+class LimitRequest(ExpressionRequest):
+    latex: Optional[str] = Field(None, description="LaTeX 表达式")
     variable: str = Field(default="x", description="变量名")
     point: str = Field(..., description="趋近值，例如: 0, 1, oo")
 
 
-class SummationRequest(BaseModel):
-    latex: str = Field(..., description="LaTeX 表达式")
+class SummationRequest(ExpressionRequest):
+    latex: Optional[str] = Field(None, description="LaTeX 表达式")
     variable: str = Field(default="i", description="求和指标变量")
     start: str = Field(..., description="起始值")
     end: str = Field(..., description="结束值")
 
 
-class ProductRequest(BaseModel):
-    latex: str = Field(..., description="LaTeX 表达式")
+class ProductRequest(ExpressionRequest):
+    latex: Optional[str] = Field(None, description="LaTeX 表达式")
     variable: str = Field(default="i", description="求积指标变量")
     start: str = Field(..., description="起始值")
     end: str = Field(..., description="结束值")
 
 
-class TaylorRequest(BaseModel):
-    latex: str = Field(..., description="LaTeX 表达式")
+class TaylorRequest(ExpressionRequest):
+    latex: Optional[str] = Field(None, description="LaTeX 表达式")
     variable: str = Field(default="x", description="变量名")
     point: str = Field(default="0", description="展开点，默认为0（Maclaurin级数）")
     order: int = Field(default=10, description="展开阶数，默认10项")
 
 
-class VectorCalculusRequest(BaseModel):
-    latex: str = Field(..., description="标量场的 LaTeX 表达式（用于 gradient, laplacian）")
+class VectorCalculusRequest(ExpressionRequest):
+    latex: Optional[str] = Field(None, description="标量场的 LaTeX 表达式（用于 gradient, laplacian）")
     variables: List[str] = Field(default=["x", "y", "z"], description="坐标变量列表")
 
 
 class VectorFieldRequest(BaseModel):
-    components: List[str] = Field(..., description="向量场的分量 [Fx, Fy, Fz]（用于 divergence, curl）")
+    components: Optional[List[str]] = Field(None, description="向量场的分量 [Fx, Fy, Fz]（用于 divergence, curl）")
+    expression_ids: Optional[List[str]] = Field(None, description="各分量的表达式句柄，可代替 components")
     variables: List[str] = Field(default=["x", "y", "z"], description="坐标变量列表")
 
+    _components: Any = PrivateAttr(None)
 
-class DoubleIntegralRequest(BaseModel):
-    latex: str = Field(..., description="LaTeX 表达式")
+    @model_validator(mode="after")
+    def _resolve_components(self):
+        self._components = _resolve(self.components, self.expression_ids, "components", "expression_ids")
+        return self
+
+    @property
+    def expressions(self) -> List[Any]:
+        """交给服务函数的各分量：LaTeX 字符串或已存储的 SymPy 对象"""
+        return self._components
+
+
+class DoubleIntegralRequest(ExpressionRequest):
+    latex: Optional[str] = Field(None, description="LaTeX 表达式")
     variables: List[str] = Field(default=["x", "y"], description="积分变量")
     limits: List[List[str]] = Field(..., description="积分限 [[x_lower, x_upper], [y_lower, y_upper]]")
 
 
-class TripleIntegralRequest(BaseModel):
-    latex: str = Field(..., description="LaTeX 表达式")
+class TripleIntegralRequest(ExpressionRequest):
+    latex: Optional[str] = Field(None, description="LaTeX 表达式")
     variables: List[str] = Field(default=["x", "y", "z"], description="积分变量")
     limits: List[List[str]] = Field(..., description="三组积分限")
 
@@ -109,8 +211,8 @@ class SolveStep(BaseModel):
     latex: str = Field(..., description="中间结果 LaTeX")
 
 
-class SolveEquationRequest(BaseModel):
-    latex: str = Field(..., description="方程的 LaTeX 表达式，如 2x + 3 = 7")
+class SolveEquationRequest(ExpressionRequest):
+    latex: Optional[str] = Field(None, description="方程的 LaTeX 表达式，如 2x + 3 = 7")
 
 
 class SolveEquationResponse(BaseModel):
@@ -119,8 +221,8 @@ class SolveEquationResponse(BaseModel):
     verified: bool = Field(default=False, description="结果是否经过验证")
 
 
-class SolveInequalityRequest(BaseModel):
-    latex: str = Field(..., description="不等式的 LaTeX 表达式，如 2x + 3 > 7")
+class SolveInequalityRequest(ExpressionRequest):
+    latex: Optional[str] = Field(None, description="不等式的 LaTeX 表达式，如 2x + 3 > 7")
 
 
 class IntervalData(BaseModel):
@@ -138,11 +240,108 @@ class SolveInequalityResponse(BaseModel):
 
 
 class SolveSystemRequest(BaseModel):
-    equations: List[str] = Field(..., description="方程列表，每个元素是一个方程的 LaTeX")
+    equations: Optional[List[str]] = Field(None, description="方程列表，每个元素是一个方程的 LaTeX")
+    expression_ids: Optional[List[str]] = Field(None, description="各方程的表达式句柄，可代替 equations")
     variables: List[str] = Field(..., description="变量名列表，如 ['x', 'y']")
 
+    _equations: Any = PrivateAttr(None)
+
+    @model_validator(mode="after")
+    def _resolve_equations(self):
+        self._equations = _resolve(self.equations, self.expression_ids, "equations", "expression_ids")
+        return self
+
+    @property
+    def expressions(self) -> List[Any]:
+        """交给服务函数的各方程：LaTeX 字符串或已存储的 SymPy 对象"""
+        return self._equations
+
 
 class SolveSystemResponse(BaseModel):
     result: str = Field(..., description="最终解的 LaTeX")
     steps: List[SolveStep] = Field(..., description="求解步骤列表")
     verified: bool = Field(default=False, description="结果是否经过验证")
+
+
+# ==================== 表达式句柄模型 ====================
+
+class ExpressionCreateRequest(BaseModel):
+    latex: str = Field(..., description="要解析并存储的 LaTeX 表达式")
+
+
+class ExpressionHandle(BaseModel):
+    id: str = Field(..., description="表达式句柄（解析结果的内容地址），可作为各运算端点的 expression_id")
+    latex: str = Field(..., description="解析后表达式的规范 LaTeX")
+    expires_in: float = Field(..., description="句柄自最近一次存储起的有效期（秒）")
+
+
+# ==================== 运算流水线模型 ====================
+
+class PipelineStep(BaseModel):
+    op: Literal[
+        "expand", "factor", "simplify", "cancel", "together", "apart",
+        "collect", "differentiate", "integrate",
+    ] = Field(..., description="步骤名")
+    variable: str = Field(default="x", description="collect / differentiate / integrate / apart 使用的变量")
+    output: bool = Field(default=False, description="是否在响应中返回该步的中间结果")
+
+
+class PipelineRequest(ExpressionRequest):
+    steps: List[PipelineStep] = Field(..., min_length=1, max_length=32, description="按顺序执行的步骤")
+
+
+class PipelineStepResult(BaseModel):
+    index: int = Field(..., description="步骤序号（从 0 开始）")
+    op: str = Field(..., description="步骤名")
+    result: str = Field(..., description="该步结果的 LaTeX")
+
+
+class PipelineResponse(BaseModel):
+    result: str = Field(..., description="最终结果的 LaTeX")
+    steps: List[PipelineStepResult] = Field(default_factory=list, description="标记了 output 的步骤的中间结果")
+
+
+# ==================== 批量模型 ====================
+
+class BatchOperation(BaseModel):
+    """单个批量运算：op 为运算名，其余字段与对应端点的请求体相同"""
+    model_config = ConfigDict(extra="allow")
+
+    op: str = Field(..., description="运算名，如 factor、differentiate、solve_equation")
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., description="运算列表，结果按相同顺序返回")
+
+
+class BatchItemResult(BaseModel):
+    ok: bool = Field(..., description="该运算是否成功")
+    status: int = Field(..., description="与单独调用对应端点时相同的 HTTP 状态码")
+    result: Optional[Dict[str, Any]] = Field(None, description="成功时为对应端点的响应体")
+    error: Optional[str] = Field(None, description="失败原因")
+
+
+class BatchResponse(BaseModel):
+    results: List[BatchItemResult] = Field(..., description="与请求顺序一致的结果列表")
+
+
+class StreamItemResult(BatchItemResult):
+    """/api/stream 输出的一行结果"""
+    index: int = Field(..., description="任务在输入中的序号（从 0 开始，忽略空行）")
+    id: Optional[Any] = Field(None, description="任务行中提供的 id，原样返回")
+
+
+# ==================== 耗时预测模型 ====================
+
+class PredictRequest(BatchOperation):
+    """待预测的运算：字段与 /api/batch 的单项相同（op 加上对应端点的请求体）"""
+
+
+class PredictResponse(BaseModel):
+    operation: str = Field(..., description="运算名")
+    predicted_seconds: Optional[float] = Field(
+        None, description="预测的计算耗时（秒）；该运算尚无观测数据时为 null"
+    )
+    samples: int = Field(..., description="该运算的模型已学习的调用次数")
+    timeout: float = Field(..., description="该运算的时间预算（秒）")
+    features: Dict[str, float] = Field(..., description="预测使用的输入特征")
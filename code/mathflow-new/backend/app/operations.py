@@ -0,0 +1,249 @@
+"""
+Registry of the operations exposed by the API.
+
+Maps an operation name (the same names used for timeout budgets in
+config.py) to its request model, the service call it performs and the shape
+of its response. Multi-operation entry points (batch, streaming, ...) use it
+to validate and dispatch exactly like the single-operation REST routes.
+"""
+import math
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type
+
+import sympy
+from pydantic import BaseModel
+
+from .models import (
+    FactorizationRequest,
+    ExpandRequest,
+    SimplifyRequest,
+    VerifyRequest,
+    CalculusRequest,
+    DefiniteIntegralRequest,
+    LimitRequest,
+    SummationRequest,
+    ProductRequest,
+    TaylorRequest,
+    VectorCalculusRequest,
+    VectorFieldRequest,
+    DoubleIntegralRequest,
+    TripleIntegralRequest,
+    SolveEquationRequest,
+    SolveInequalityRequest,
+    SolveSystemRequest,
+    PipelineRequest,
+)
+from .services.complexity import check_parameters, use_operation
+from .services.sympy_service import (
+    factor_expression,
+    factor_expression_verified,
+    expand_expression,
+    expand_expression_verified,
+    simplify_expression,
+    simplify_expression_verified,
+    verify_equivalence_detailed,
+    differentiate_expr,
+    partial_derivative,
+    integrate_indefinite,
+    integrate_definite,
+    compute_limit,
+    limit_at_infinity,
+    compute_summation,
+    compute_product,
+    taylor_series,
+    compute_double_integral,
+    compute_triple_integral,
+    run_pipeline,
+    latex_tokens,
+)
+from .services.vector_calculus import (
+    compute_gradient,
+    compute_divergence,
+    compute_curl,
+    compute_laplacian,
+)
+from .services.solve_service import (
+    solve_equation_with_steps,
+    solve_inequality_with_steps,
+    solve_system_with_steps,
+)
+
+
+class UnknownOperationError(ValueError):
+    """The requested operation name is not registered."""
+
+
+def _result_response(result: Any) -> Dict[str, Any]:
+    # Service functions return either a LaTeX string or a response dict
+    return result if isinstance(result, dict) else {"result": result}
+
+
+def _verify_response(result: Tuple[bool, str]) -> Dict[str, Any]:
+    is_equivalent, method = result
+    return {"is_equivalent": is_equivalent, "method": method}
+
+
+@dataclass(frozen=True)
+class Operation:
+    name: str
+    request_model: Type[BaseModel]
+    # request -> (service function, positional arguments)
+    call: Callable[[Any], Tuple[Callable, tuple]]
+    respond: Callable[[Any], Dict[str, Any]] = _result_response
+
+
+OPERATIONS: Dict[str, Operation] = {op.name: op for op in [
+    # 代数运算
+    Operation("factor", FactorizationRequest, lambda r: (
+        factor_expression_verified if r.verify else factor_expression, (r.expression,))),
+    Operation("expand", ExpandRequest, lambda r: (
+        expand_expression_verified if r.verify else expand_expression, (r.expression,))),
+    Operation("simplify", SimplifyRequest, lambda r: (
+        simplify_expression_verified if r.verify else simplify_expression, (r.expression,))),
+    Operation("verify", VerifyRequest, lambda r: (
+        verify_equivalence_detailed, (r.input_expression, r.output_expression)), _verify_response),
+    # 基础微积分
+    Operation("differentiate", CalculusRequest, lambda r: (
+        differentiate_expr, (r.expression, r.variable))),
+    Operation("partial", CalculusRequest, lambda r: (
+        partial_derivative, (r.expression, r.variable))),
+    Operation("integrate", CalculusRequest, lambda r: (
+        integrate_indefinite, (r.expression, r.variable))),
+    Operation("definite_integral", DefiniteIntegralRequest, lambda r: (
+        integrate_definite, (r.expression, r.variable, r.lower_limit, r.upper_limit))),
+    Operation("limit", LimitRequest, lambda r: (
+        compute_limit, (r.expression, r.variable, r.point))),
+    Operation("limit_infinity", CalculusRequest, lambda r: (
+        limit_at_infinity, (r.expression, r.variable))),
+    Operation("sum", SummationRequest, lambda r: (
+        compute_summation, (r.expression, r.variable, r.start, r.end))),
+    Operation("product", ProductRequest, lambda r: (
+        compute_product, (r.expression, r.variable, r.start, r.end))),
+    Operation("taylor", TaylorRequest, lambda r: (
+        taylor_series, (r.expression, r.variable, r.point, r.order))),
+    # 向量微积分
+    Operation("gradient", VectorCalculusRequest, lambda r: (
+        compute_gradient, (r.expression, r.variables))),
+    Operation("divergence", VectorFieldRequest, lambda r: (
+        compute_divergence, (r.expressions, r.variables))),
+    Operation("curl", VectorFieldRequest, lambda r: (
+        compute_curl, (r.expressions, r.variables))),
+    Operation("laplacian", VectorCalculusRequest, lambda r: (
+        compute_laplacian, (r.expression, r.variables))),
+    # 多重积分
+    Operation("double_integral", DoubleIntegralRequest, lambda r: (
+        compute_double_integral, (r.expression, r.variables, r.limits))),
+    Operation("triple_integral", TripleIntegralRequest, lambda r: (
+        compute_triple_integral, (r.expression, r.variables, r.limits))),
+    # 求解
+    Operation("solve_equation", SolveEquationRequest, lambda r: (
+        solve_equation_with_steps, (r.expression,))),
+    Operation("solve_inequality", SolveInequalityRequest, lambda r: (
+        solve_inequality_with_steps, (r.expression,))),
+    Operation("solve_system", SolveSystemRequest, lambda r: (
+        solve_system_with_steps, (r.expressions, r.variables))),
+    # 运算流水线
+    Operation("pipeline", PipelineRequest, lambda r: (
+        run_pipeline, (r.expression, [(s.op, s.variable, s.output) for s in r.steps]))),
+]}
+
+
+def get_operation(name: str) -> Operation:
+    try:
+        return OPERATIONS[name]
+    except KeyError:
+        raise UnknownOperationError(f"未知运算: {name}")
+
+
+def prepare_call(name: str, arguments: Dict[str, Any]) -> Tuple[Operation, Callable, tuple]:
+    """
+    Validate ``arguments`` against the operation's request model.
+
+    Raises:
+        UnknownOperationError: ``name`` is not registered
+        pydantic.ValidationError: The arguments do not match the request model
+    """
+    operation = get_operation(name)
+    request = operation.request_model.model_validate(arguments)
+    func, args = operation.call(request)
+    return operation, func, args
+
+
+# 预检中整数上下限的最大十进制位数；更大的写法交给计算进程中的复杂度检查
+_BOUND_DIGITS = 4000
+
+
+def _integer_bound(latex: Any) -> Optional[sympy.Integer]:
+    """
+    Value of a sum/product bound written as an integer or a power of integers.
+
+    Reads the token stream only (``1000``, ``-5``, ``10^{6}``), without the
+    LaTeX parser, so it is cheap enough for the event loop. Returns None for
+    any other bound (infinity, symbols, expressions).
+    """
+    tokens = list(latex_tokens(latex)) if isinstance(latex, str) else []
+    sign = 1
+    while tokens and tokens[0] in ("+", "-"):
+        if tokens.pop(0) == "-":
+            sign = -sign
+    if tokens[2:3] == ["{"] and tokens[-1:] == ["}"]:
+        tokens = tokens[:2] + tokens[3:-1]
+    if not tokens or not all(t.isdigit() for t in tokens[::2]):
+        return None
+    if len(tokens) == 1:
+        return sympy.Integer(sign * int(tokens[0]))
+    if len(tokens) != 3 or tokens[1] != "^":
+        return None
+    base, exponent = int(tokens[0]), int(tokens[2])
+    if base > 1 and exponent * math.log10(base) > _BOUND_DIGITS:
+        return None
+    return sympy.Integer(sign * base ** exponent)
+
+
+def check_call(operation: str, args: tuple) -> None:
+    """
+    Reject a call whose parameters scale its work beyond the limits of ``operation``.
+
+    Runs on the event loop before dispatch, so a Taylor order or a sum range
+    that is too large never occupies a worker. Only integer bounds are read
+    here (see _integer_bound()); the services check every parameter again.
+
+    Raises:
+        ValueError: The parameters are invalid or too large (ExpressionTooComplexError)
+    """
+    with use_operation(operation):
+        if operation == "taylor":
+            check_parameters(order=args[3])
+        elif operation in ("sum", "product"):
+            bounds = _integer_bound(args[2]), _integer_bound(args[3])
+            if None not in bounds:
+                check_parameters(bounds=bounds)
+
+
+def iter_calls(calls: List[Tuple[str, Callable, tuple]]) -> Iterator[Tuple[str, Any]]:
+    """
+    Run several (operation, func, args) service calls in one worker, yielding each outcome.
+
+    Runs inside a worker process. Consecutive calls share that worker's parse
+    and result caches, so an expression repeated within the list is parsed
+    only once. Each call is checked against the complexity limits of its own
+    operation. One failing call never affects the others.
+
+    Yields:
+        One (status, payload) per call, as soon as it finishes: ("ok", result),
+        ("invalid", message) for ValueError, or ("error", message) for anything else.
+    """
+    for operation, func, args in calls:
+        try:
+            with use_operation(operation):
+                outcome = ("ok", func(*args))
+        except ValueError as e:
+            outcome = ("invalid", str(e))
+        except Exception as e:
+            outcome = ("error", f"{type(e).__name__}: {e}")
+        yield outcome
+
+
+def run_calls(calls: List[Tuple[str, Callable, tuple]]) -> List[Tuple[str, Any]]:
+    """All outcomes of iter_calls() as a list."""
+    return list(iter_calls(calls))
@@ -0,0 +1,42 @@
+"""
+Per-request LaTeX parser backend selection.
+
+Clients pick a backend for one request (or one WebSocket connection) with
+the ``X-Parser-Backend`` header; without it MATHFLOW_PARSER applies. The
+choice is held in a context variable for the duration of the request, and
+the worker pool hands it to the worker process computing each call.
+"""
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from starlette.websockets import WebSocketClose
+
+from .services.sympy_service import available_parser_backends, use_parser
+
+PARSER_HEADER = b"x-parser-backend"
+
+
+class ParserBackendMiddleware:
+    """ASGI middleware applying the ``X-Parser-Backend`` request header."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        backend = None
+        for name, value in scope.get("headers", ()):
+            if name == PARSER_HEADER:
+                backend = value.decode("latin-1").strip().lower() or None
+        if backend is not None and backend not in available_parser_backends():
+            error = f"不支持的 LaTeX 解析器: {backend}（可用: {', '.join(available_parser_backends())}）"
+            if scope["type"] == "http":
+                await JSONResponse({"detail": error}, status_code=400)(scope, receive, send)
+            else:
+                await WebSocketClose(code=1008, reason=error)(scope, receive, send)
+            return
+
+        with use_parser(backend):
+            await self.app(scope, receive, send)
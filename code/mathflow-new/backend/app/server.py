@@ -0,0 +1,191 @@
+"""
+Production launcher: a warmed parent process forking the API processes.
+
+    python -m app.server [--host 0.0.0.0] [--port 8001] [--processes N]
+
+The parent imports the application, runs representative parse, factor,
+integrate and solve calls (loading the LaTeX grammar and filling SymPy's
+internal caches), freezes the GC and binds the listening socket. It then
+forks N uvicorn processes sharing that socket. Each of them starts its
+compute pool right away with the ``fork`` start method, so both the API
+processes and their compute workers share the warmed pages copy-on-write
+and the first request runs at steady-state latency.
+
+The parent restarts API processes that die and forwards SIGTERM/SIGINT to
+them on shutdown.
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .config import settings
+
+# 服务进程启动后很快退出时，重新启动前的等待时间（秒），避免快速循环重启
+_RESTART_BACKOFF = 1.0
+
+
+def _warmup_calls() -> List[Tuple[str, Callable[[], object]]]:
+    """Representative (name, call) pairs exercising the parser and the main services."""
+    from .services.solve_service import solve_equation_with_steps
+    from .services.sympy_service import (
+        factor_expression,
+        integrate_indefinite,
+        parse_latex_safe,
+        simplify_expression,
+        verify_equivalence,
+    )
+
+    return [
+        ("parse", lambda: parse_latex_safe(r"\frac{\sqrt{x^2 + 1}}{\sin(x)} + e^{2x} \cdot \ln(x)")),
+        ("factor", lambda: factor_expression("x^3 - 6x^2 + 11x - 6")),
+        ("simplify", lambda: simplify_expression(r"\frac{x^2 - 1}{x + 1}")),
+        ("integrate", lambda: integrate_indefinite(r"x \cos(x) + \frac{1}{x^2 + 1}", "x")),
+        ("solve", lambda: solve_equation_with_steps("x^2 - 5x + 6 = 0")),
+        ("verify", lambda: verify_equivalence("(x+1)^2", "x^2 + 2x + 1")),
+    ]
+
+
+def warm_up() -> Dict[str, float]:
+    """
+    Run the representative calls in this process.
+
+    Returns:
+        Seconds spent per call, by name
+    """
+    timings = {}
+    for name, call in _warmup_calls():
+        started = time.perf_counter()
+        call()
+        timings[name] = round(time.perf_counter() - started, 3)
+    return timings
+
+
+def _serve(config, sock) -> None:
+    """Body of one forked API process."""
+    import uvicorn
+
+    from .executor import get_pool
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, signal.SIG_DFL)
+    # Compute workers are forked from this (warm) process before any request
+    get_pool()
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _fork(config, sock) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _serve(config, sock)
+        except BaseException:
+            code = 1
+            import traceback
+            traceback.print_exc()
+        finally:
+            os._exit(code)
+    return pid
+
+
+def run(host: str, port: int, processes: int, log_level: str = "info") -> int:
+    """
+    Warm up, fork ``processes`` API processes on one socket and supervise them.
+
+    Several processes need MATHFLOW_CACHE_DB, through which they share the
+    expression handles (see expressions.py).
+
+    Returns:
+        Exit status once every API process has stopped (2 if not started)
+    """
+    if processes > 1 and not settings.cache_db_path:
+        print(
+            "启动多个服务进程需要设置 MATHFLOW_CACHE_DB：表达式句柄（expression_id）通过它在进程间共享",
+            file=sys.stderr, flush=True,
+        )
+        return 2
+
+    started = time.perf_counter()
+    import uvicorn
+
+    from .main import app
+    import_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    calls = warm_up()
+    warmup_seconds = time.perf_counter() - started
+
+    if settings.start_method is None and "fork" in multiprocessing.get_all_start_methods():
+        settings.start_method = "fork"
+    app.state.startup = {
+        "import_seconds": round(import_seconds, 3),
+        "warmup_seconds": round(warmup_seconds, 3),
+        "warmup_calls": calls,
+        "processes": processes,
+    }
+    print(
+        f"MathFlow 启动: 导入 {import_seconds:.2f} 秒，预热 {warmup_seconds:.2f} 秒，"
+        f"启动 {processes} 个服务进程（每个 {settings.worker_count} 个计算进程）",
+        file=sys.stderr, flush=True,
+    )
+
+    config = uvicorn.Config(app, host=host, port=port, log_level=log_level)
+    sock = config.bind_socket()
+    # Objects created so far stay out of GC passes, whose reference count
+    # updates would otherwise copy the shared pages into every child
+    gc.freeze()
+
+    children = {_fork(config, sock): time.monotonic() for _ in range(processes)}
+    stopping = False
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while children:
+        try:
+            pid, wait_status = os.wait()
+        except ChildProcessError:
+            break
+        # Compute workers are children of the API processes, not of this one
+        forked_at = children.pop(pid, None)
+        if stopping or forked_at is None:
+            continue
+        code = os.waitstatus_to_exitcode(wait_status)
+        print(f"服务进程 {pid} 已退出 (状态 {code})，重新启动", file=sys.stderr, flush=True)
+        if time.monotonic() - forked_at < _RESTART_BACKOFF:
+            time.sleep(_RESTART_BACKOFF)
+        children[_fork(config, sock)] = time.monotonic()
+    sock.close()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.server",
+        description="生产启动器：在预热后的父进程中 fork 多个共享监听端口的服务进程",
+    )
+    parser.add_argument("--host", default="0.0.0.0", help="监听地址（默认 0.0.0.0）")
+    parser.add_argument("--port", type=int, default=8001, help="监听端口（默认 8001）")
+    parser.add_argument("--processes", type=int, default=settings.server_processes,
+                        help="服务进程数（默认 MATHFLOW_PROCESSES 或 1）")
+    parser.add_argument("--log-level", default="info", help="uvicorn 日志级别")
+    args = parser.parse_args(argv)
+    return run(args.host, args.port, max(1, args.processes), args.log_level)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
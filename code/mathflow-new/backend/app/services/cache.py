@@ -0,0 +1,250 @@
+"""
+Caches shared by the service modules.
+
+``LRUCache`` lives inside one process; ``SQLiteStore`` is an optional
+persistent backend that every process on a host can read and write.
+
+Every cache registers itself by name so that ``cache_stats()`` can report
+hit/miss counters for all of them (the worker pool forwards these snapshots
+to the API process).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+_registry: Dict[str, Any] = {}
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with an optional per-entry time to live and an
+    optional byte budget.
+
+    Args:
+        name: Registry name reported by cache_stats()
+        max_size: Maximum number of entries (0 disables the cache)
+        ttl: Seconds an entry stays valid, None for no expiry
+        max_bytes: Budget for the summed entry sizes, None for no budget
+        sizeof: Estimates the size in bytes of a (key, value) pair
+        clock: Monotonic time source (injectable for tests)
+    """
+
+    def __init__(self, name: str, max_size: int, ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None,
+                 sizeof: Callable[[Hashable, Any], int] = lambda key, value: 0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        _registry[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at, _ = entry
+                if expires_at is None or expires_at > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        size = self._sizeof(key, value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        expires_at = self._clock() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, expires_at, size)
+            self.bytes += size
+            while len(self._data) > self.max_size or (
+                self.max_bytes is not None and self.bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, size = self._data.pop(key)
+        self.bytes -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Whether ``key`` holds a live entry (not counted as a lookup, recency unchanged)."""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and (entry[1] is None or entry[1] > self._clock())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class SQLiteStore:
+    """
+    Persistent key-value store for JSON-serializable results.
+
+    Uses SQLite in WAL mode so that concurrent readers in several worker
+    processes never block each other. Every row carries a version string
+    (e.g. SymPy and app version); rows written under another version are
+    never served and are purged when the store is opened.
+
+    The file is bounded: rows older than ``ttl`` are never served, and every
+    ``max_rows // 100`` writes the expired rows and the oldest rows beyond
+    ``max_rows`` are deleted. The bound applies to the whole file, i.e. to
+    the rows of every store (and process) sharing it.
+
+    Storage errors are counted and otherwise ignored: the store is a cache,
+    a failing disk must not fail the request.
+
+    Args:
+        name: Registry name reported by cache_stats()
+        path: SQLite database file
+        version: Version tag for the rows written and read by this process
+        max_rows: Maximum number of rows kept in the file, None for no limit
+        ttl: Seconds a row stays valid, None for no expiry
+        clock: Wall-clock time source (injectable for tests)
+    """
+
+    def __init__(self, name: str, path: str, version: str,
+                 max_rows: Optional[int] = None, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.time):
+        self.name = name
+        self.path = path
+        self.version = version
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self._clock = clock
+        # 清理按写入次数分摊：每 max_rows 的 1% 次写入清理一次
+        self._prune_every = max(1, max_rows // 100) if max_rows else 100
+        self._unpruned = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+        _registry[name] = self
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross fork(), so each process opens its own
+        if self._conn is None or self._conn_pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, version TEXT NOT NULL, "
+                "value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created)")
+            conn.execute("DELETE FROM results WHERE version != ?", (self.version,))
+            conn.commit()
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def _digest(key: Hashable) -> str:
+        return hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            with self._lock:
+                row = self._connection().execute(
+                    "SELECT value FROM results WHERE key = ? AND version = ? AND created >= ?",
+                    (self._digest(key), self.version, self._oldest()),
+                ).fetchone()
+        except sqlite3.Error:
+            self.errors += 1
+            return default
+        if row is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: Hashable, value: Any) -> None:
+        try:
+            payload = json.dumps(value)
+        except (TypeError, ValueError):
+            return
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (key, version, value, created) "
+                    "VALUES (?, ?, ?, ?)",
+                    (self._digest(key), self.version, payload, self._clock()),
+                )
+                self._unpruned += 1
+                if (self.max_rows is not None or self.ttl is not None) and self._unpruned >= self._prune_every:
+                    self._prune(conn)
+                conn.commit()
+            self.writes += 1
+        except sqlite3.Error:
+            self.errors += 1
+
+    def _oldest(self) -> float:
+        """Creation time of the oldest row still valid (-inf without a TTL)."""
+        return self._clock() - self.ttl if self.ttl is not None else float("-inf")
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        # 删除过期的行与超出 max_rows 的最旧的行（其他进程写入的行同样计入）
+        deleted = conn.execute("DELETE FROM results WHERE created < ?", (self._oldest(),)).rowcount
+        if self.max_rows is not None:
+            deleted += conn.execute(
+                "DELETE FROM results WHERE key IN ("
+                "SELECT key FROM results ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,),
+            ).rowcount
+        self.evictions += max(0, deleted)
+        self._unpruned = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Snapshot of the counters of every registered cache."""
+    return {name: cache.stats() for name, cache in _registry.items()}
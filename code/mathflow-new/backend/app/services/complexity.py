@@ -0,0 +1,248 @@
+"""
+表达式复杂度检查
+
+输入长度几乎不反映计算量：``(x+1)^{100000}`` 只有 14 个字符，展开它却会耗尽
+计算进程的 CPU 与内存。每个表达式解析之后、进入运算之前都按当前运算的上限
+检查一次（见 parse_latex_safe()），超出任一上限即以 ExpressionTooComplexError
+（ValueError，API 返回 400）拒绝。度量：
+
+- nodes: 表达式树的节点数
+- depth: 表达式树的深度
+- exponent: 最大的数值幂次（指数是数值表达式时按其取值的上界计）
+- terms: 完全展开后的估计项数
+- digits: 数值（字面量及其乘方、展开后的系数）的估计十进制位数
+
+决定计算量的运算参数另行检查（见 check_parameters()）：
+
+- order: Taylor 展开的阶数
+- range: 上下限均为有限数值时求和/求积的项数
+
+上限在 config.py 中按运算配置；当前运算由计算进程池随每次调用传入
+（见 use_operation()），不在运算中的调用（测试、脚本）使用默认上限。
+"""
+import contextlib
+import contextvars
+import functools
+import math
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import sympy
+
+from ..config import settings
+
+_operation: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("operation", default=None)
+
+# 各度量在错误信息中的名称
+_LABELS = {
+    "nodes": "节点数",
+    "depth": "嵌套深度",
+    "exponent": "幂次",
+    "terms": "展开后的项数",
+    "digits": "数值位数",
+    "order": "展开阶数",
+    "range": "项数",
+}
+
+
+class ExpressionTooComplexError(ValueError):
+    """The parsed expression exceeds a complexity limit of the current operation."""
+
+
+class Complexity(NamedTuple):
+    """Static cost measures of one parsed expression (see the module docstring)."""
+
+    nodes: int
+    depth: int
+    exponent: float
+    terms: float
+    digits: float
+
+
+def current_operation() -> Optional[str]:
+    """Name of the operation being computed, None outside of one."""
+    return _operation.get()
+
+
+@contextlib.contextmanager
+def use_operation(operation: Optional[str]) -> Iterator[None]:
+    """Check expressions against the limits of ``operation`` inside the block."""
+    token = _operation.set(operation)
+    try:
+        yield
+    finally:
+        _operation.reset(token)
+
+
+def _magnitude(number: sympy.Basic) -> float:
+    """log10 of the largest integer written in a rational literal (0 for others)."""
+    if number.is_Rational:
+        largest = max(abs(int(number.p)), int(number.q))
+        return math.log10(largest) if largest > 1 else 0.0
+    return 0.0
+
+
+def _exponent_bound(magnitude: float) -> float:
+    """Upper bound of a numeric exponent from its log10 magnitude."""
+    return math.inf if magnitude > 300 else 10 ** magnitude
+
+
+def _expanded_terms(base_terms: float, exponent: float) -> float:
+    """Monomials of (t-term sum)^n: C(t+n-1, n), estimated in log space."""
+    if base_terms <= 1 or exponent < 2:
+        return base_terms
+    if math.isinf(exponent) or math.isinf(base_terms):
+        return math.inf
+    log_terms = math.lgamma(base_terms + exponent) - math.lgamma(exponent + 1) - math.lgamma(base_terms)
+    return math.inf if log_terms > 700 else math.exp(log_terms)
+
+
+@functools.lru_cache(maxsize=4096)
+def measure(expr: sympy.Basic) -> Complexity:
+    """
+    Measure ``expr`` in one pass over its tree (iterative: no recursion limit).
+
+    Every node yields an estimate of its expanded term count and the log10
+    magnitude of its coefficients (symbols count as 1), combined bottom-up:
+    sums add terms, products multiply them, and an integer power n of a
+    t-term sum has C(t+n-1, n) terms and n times the base's magnitude.
+    """
+    nodes = depth = 0
+    exponent = terms = digits = 0.0
+    # (节点, 深度, 子节点是否已处理)；results 按后序保存各子树的 (项数, 量级)
+    stack: List[Tuple[sympy.Basic, int, bool]] = [(expr, 1, False)]
+    results: List[Tuple[float, float]] = []
+    while stack:
+        node, level, done = stack.pop()
+        if not done:
+            nodes += 1
+            depth = max(depth, level)
+            if node.args:
+                stack.append((node, level, True))
+                stack.extend((arg, level + 1, False) for arg in reversed(node.args))
+            else:
+                magnitude = _magnitude(node)
+                digits = max(digits, magnitude)
+                results.append((1.0, magnitude))
+            continue
+
+        count = len(node.args)
+        children = results[-count:]
+        del results[-count:]
+        if isinstance(node, sympy.Add):
+            node_terms = sum(t for t, _ in children)
+            node_magnitude = max(m for _, m in children) + math.log10(count)
+        elif isinstance(node, sympy.Mul):
+            node_terms = math.prod(t for t, _ in children)
+            node_magnitude = sum(m for _, m in children)
+        elif isinstance(node, sympy.Pow) and not node.exp.free_symbols:
+            (base_terms, base_magnitude), (_, exp_magnitude) = children
+            if node.exp.is_Rational:
+                power = float(-(-abs(int(node.exp.p)) // int(node.exp.q)))
+            else:
+                power = _exponent_bound(exp_magnitude)
+            exponent = max(exponent, power)
+            node_terms = _expanded_terms(base_terms, power)
+            node_magnitude = base_magnitude * power if base_magnitude else 0.0
+        else:
+            # 函数、关系式、符号指数的幂等：各参数分别计算，自身视为一项
+            node_terms = 1.0
+            node_magnitude = max(m for _, m in children)
+        terms = max(terms, node_terms)
+        digits = max(digits, node_magnitude)
+        results.append((node_terms, node_magnitude))
+
+    return Complexity(nodes, depth, exponent, max(terms, 1.0), digits if math.isinf(digits) else math.floor(digits) + 1)
+
+
+def limits_for(operation: Optional[str] = None) -> Dict[str, int]:
+    """Limits of ``operation`` (default: the current one), defaults filled in."""
+    return settings.limits_for(operation if operation is not None else current_operation())
+
+
+def _format(value: float) -> str:
+    if value < 1e15:
+        return str(int(value))
+    if isinstance(value, int):
+        # 超大整数（如求和的项数）不能转成浮点数：按十进制位数写成 3 位有效数字的科学计数法
+        exponent = int((value.bit_length() - 1) * math.log10(2))
+        if 10 ** (exponent + 1) <= value:
+            exponent += 1
+        return f"{value // 10 ** (exponent - 2) / 100:.3g}e+{exponent}"
+    return f"{value:.3g}"
+
+
+def check_complexity(expr: sympy.Basic, operation: Optional[str] = None) -> Complexity:
+    """
+    Reject ``expr`` if it exceeds a limit of ``operation`` (default: the current one).
+
+    Returns:
+        The measures of ``expr``
+
+    Raises:
+        ExpressionTooComplexError: A measure exceeds its limit
+    """
+    operation = operation if operation is not None else current_operation()
+    complexity = measure(expr)
+    limits = limits_for(operation)
+    for name in Complexity._fields:
+        value = getattr(complexity, name)
+        if value > limits[name]:
+            _reject(name, f"约为 {_format(value)}", limits[name], operation)
+    return complexity
+
+
+def _reject(name: str, value: str, limit: int, operation: Optional[str]) -> None:
+    scope = f" {operation} 运算" if operation else "默认"
+    raise ExpressionTooComplexError(f"表达式过于复杂: {_LABELS[name]}{value}，超过{scope}的上限 {limit}")
+
+
+def range_size(start: sympy.Basic, end: sympy.Basic) -> Optional[int]:
+    """Number of terms of a sum or product from ``start`` to ``end``, None if unbounded or symbolic."""
+    span = end - start
+    if not span.is_number or not span.is_finite:
+        return None
+    return max(int(sympy.floor(span)) + 1, 0)
+
+
+def check_parameters(operation: Optional[str] = None, order: Optional[int] = None,
+                     bounds: Optional[Tuple[sympy.Basic, sympy.Basic]] = None) -> None:
+    """
+    Reject the parameters that scale the work of ``operation`` (default: the current one).
+
+    Args:
+        order: Taylor expansion order
+        bounds: Parsed (start, end) of a sum or product
+
+    Raises:
+        ValueError: The order is not a positive integer
+        ExpressionTooComplexError: A parameter exceeds its limit
+    """
+    operation = operation if operation is not None else current_operation()
+    limits = limits_for(operation)
+    if order is not None:
+        if order < 1:
+            raise ValueError("展开阶数必须是正整数")
+        if order > limits["order"]:
+            _reject("order", f"为 {order}", limits["order"], operation)
+    if bounds is not None:
+        size = range_size(*bounds)
+        if size is not None and size > limits["range"]:
+            _reject("range", f"为 {_format(size)}", limits["range"], operation)
+
+
+def poly_within_limits(poly: sympy.Poly, operation: Optional[str] = None) -> bool:
+    """
+    Whether a polynomial read by the fast path (polynomial.py) is within limits.
+
+    Checks what the polynomial already states exactly: its degree, number of
+    terms and coefficient size. Inputs outside the limits go to the full
+    parser, whose check reports the error.
+    """
+    limits = limits_for(operation)
+    terms = poly.terms()
+    if len(terms) > limits["terms"]:
+        return False
+    if max(max(monom, default=0) for monom, _ in terms) > limits["exponent"]:
+        return False
+    magnitude = max(_magnitude(sympy.Rational(coeff)) for _, coeff in terms)
+    return math.floor(magnitude) + 1 <= limits["digits"]
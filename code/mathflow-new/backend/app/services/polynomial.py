@@ -0,0 +1,346 @@
+"""
+多项式快速通道
+
+/api/factor、/api/expand、/api/solve/equation 的大部分输入是 ``3x^2-5x+2=0``
+这样的普通多项式。这里直接识别 LaTeX 的多项式子集（整数与 \\frac{..}{..}
+有理系数、单字母变量、^ 整数次幂、隐式乘法、括号），在一次扫描中算出稀疏
+系数并构造 Poly，跳过 ANTLR 解析与通用表达式树。子集之外的输入（函数、
+分式变量、下标、小数等）以及超出当前运算复杂度上限的多项式返回 None，由调用方
+回退到 parse_latex_safe()（由它报告超限错误）。
+
+识别结果与 parse_latex 的语义一致：ANTLR 会特殊处理的写法（``x(...)`` 被当作
+函数调用、``dx`` 是微分符号、被空格隔开的数字会拼接、隐式乘法比 / 结合得更紧
+（``1/2x`` 是 1/(2x)）、``x^-1`` 等）一律回退。
+"""
+import functools
+from fractions import Fraction
+from typing import Dict, Hashable, NamedTuple, Optional, Tuple
+
+import sympy
+
+from .complexity import poly_within_limits
+
+# 单项式：按变量名排序的 (变量, 次数) 元组；稀疏多项式：单项式 -> 有理系数
+_Monomial = Tuple[Tuple[str, int], ...]
+_Sparse = Dict[_Monomial, Fraction]
+
+# 超出这些规模的输入交给通用路径（及其超时与复杂度限制）处理
+_MAX_EXPONENT = 1000
+_MAX_TERMS = 10000
+_MAX_PRODUCT_WORK = 1000000
+
+
+class _NotPolynomial(Exception):
+    """The input is outside the recognized polynomial subset."""
+
+
+class PolynomialInput(NamedTuple):
+    """A recognized input: one polynomial, or both sides of an equation."""
+
+    lhs: sympy.Poly
+    # 方程右边；不是方程时为 None
+    rhs: Optional[sympy.Poly]
+    # 各边都写成互不同类、系数在前的单项式之和（没有括号、*、/ 与零项），
+    # 由多项式重建的表达式与 parse_latex 的结果打印相同
+    flat: bool
+
+
+def _add(a: _Sparse, b: _Sparse, sign: int = 1) -> _Sparse:
+    result = dict(a)
+    for mono, coeff in b.items():
+        value = result.get(mono, 0) + sign * coeff
+        if value:
+            result[mono] = value
+        else:
+            result.pop(mono, None)
+    return result
+
+
+def _scale(a: _Sparse, factor: Fraction) -> _Sparse:
+    return {mono: coeff * factor for mono, coeff in a.items()} if factor else {}
+
+
+def _mul(a: _Sparse, b: _Sparse) -> _Sparse:
+    if len(a) * len(b) > _MAX_PRODUCT_WORK:
+        raise _NotPolynomial()
+    result: _Sparse = {}
+    for mono_a, coeff_a in a.items():
+        for mono_b, coeff_b in b.items():
+            exponents = dict(mono_a)
+            for var, exp in mono_b:
+                exponents[var] = exponents.get(var, 0) + exp
+            mono = tuple(sorted(exponents.items()))
+            value = result.get(mono, 0) + coeff_a * coeff_b
+            if value:
+                result[mono] = value
+            else:
+                result.pop(mono, None)
+    if len(result) > _MAX_TERMS:
+        raise _NotPolynomial()
+    return result
+
+
+def _pow(base: _Sparse, exponent: int) -> _Sparse:
+    result: _Sparse = {(): Fraction(1)}
+    while exponent:
+        if exponent & 1:
+            result = _mul(result, base)
+        exponent >>= 1
+        if exponent:
+            base = _mul(base, base)
+    return result
+
+
+def _constant(a: _Sparse) -> Optional[Fraction]:
+    if not a:
+        return Fraction(0)
+    if len(a) == 1 and () in a:
+        return a[()]
+    return None
+
+
+class _Parser:
+    """Recursive descent over normalized LaTeX; raises _NotPolynomial outside the subset."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+        self.flat = True
+        # 最近读到的因子：数字/分数 "number"、变量名或括号 "group"
+        self.kind = ""
+
+    def peek(self) -> str:
+        while self.pos < len(self.text) and self.text[self.pos].isspace():
+            self.pos += 1
+        return self.text[self.pos] if self.pos < len(self.text) else ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise _NotPolynomial()
+        self.pos += 1
+
+    def signs(self) -> int:
+        sign = 1
+        while self.peek() in ("+", "-"):
+            if self.text[self.pos] == "-":
+                sign = -sign
+            self.pos += 1
+        return sign
+
+    def expression(self) -> _Sparse:
+        # 开头的一元正负号作用于第一项
+        result: _Sparse = {}
+        terms = 0
+        zero = False
+        while True:
+            sign = self.signs()
+            term = self.term()
+            terms += 1
+            zero = zero or not term
+            if len(term) > 1 or any(mono in result for mono in term):
+                self.flat = False
+            result = _add(result, term, sign)
+            if self.peek() not in ("+", "-"):
+                if zero and terms > 1:
+                    # 合并了同类项或含零项：parse_latex 保留的写法与规范形式不同
+                    self.flat = False
+                return result
+
+    def term(self) -> _Sparse:
+        result = self.power()
+        kinds = [self.kind]
+        while True:
+            char = self.peek()
+            if char == "*":
+                self.pos += 1
+                self.flat = False
+                sign = self.signs()
+                result = _scale(_mul(result, self.power()), Fraction(sign))
+            elif char == "/":
+                self.pos += 1
+                self.flat = False
+                divisor = _constant(self.power())
+                if not divisor or self.implicit():
+                    # parse_latex 中隐式乘法比 / 结合得更紧：1/2x 是 1/(2x)
+                    raise _NotPolynomial()
+                result = _scale(result, 1 / divisor)
+            elif self.implicit():
+                # 隐式乘法；数字紧跟数字时 parse_latex 会把它们拼接，不在此处理
+                result = _mul(result, self.power())
+                kinds.append(self.kind)
+            else:
+                break
+        letters = kinds[1:] if kinds[0] == "number" else kinds
+        if "number" in letters or len(set(letters)) != len(letters):
+            # 规范单项式：至多一个写在最前的系数，随后是互不相同的变量
+            self.flat = False
+        return result
+
+    def implicit(self) -> bool:
+        """Whether the next factor follows by implicit multiplication."""
+        char = self.peek()
+        return char.isalpha() or char == "(" or self.text.startswith("\\frac", self.pos)
+
+    def power(self) -> _Sparse:
+        base = self.atom()
+        powers = 0
+        while self.peek() == "^":
+            self.pos += 1
+            base = _pow(base, self.exponent())
+            powers += 1
+        if powers and (self.kind == "number" or powers > 1):
+            self.flat = False
+        return base
+
+    def digits(self) -> str:
+        start = self.pos
+        while self.pos < len(self.text) and self.text[self.pos].isdigit():
+            self.pos += 1
+        digits = self.text[start:self.pos]
+        if not digits or (len(digits) > 1 and digits[0] == "0"):
+            raise _NotPolynomial()
+        if self.peek().isdigit() or self.peek() == ".":
+            # "2 3" 被 parse_latex 拼接成 23；小数不在子集内
+            raise _NotPolynomial()
+        return digits
+
+    def exponent(self) -> int:
+        if self.peek() == "{":
+            self.pos += 1
+            self.peek()
+            value = int(self.digits())
+            self.expect("}")
+        elif self.peek().isdigit():
+            value = int(self.digits())
+        else:
+            raise _NotPolynomial()
+        if value > _MAX_EXPONENT:
+            raise _NotPolynomial()
+        return value
+
+    def atom(self) -> _Sparse:
+        char = self.peek()
+        if char.isdigit():
+            self.kind = "number"
+            value = int(self.digits())
+            return {(): Fraction(value)} if value else {}
+        if char.isalpha() and char.isascii():
+            self.pos += 1
+            following = self.text[self.pos:self.pos + 1]
+            if following == "(" or following in ("_", "'") or (char == "d" and following.isalpha()):
+                # 函数调用、下标、导数记号与微分符号 dx
+                raise _NotPolynomial()
+            self.kind = char
+            return {((char, 1),): Fraction(1)}
+        if char == "(":
+            self.pos += 1
+            self.flat = False
+            inner = self.expression()
+            self.expect(")")
+            self.kind = "group"
+            return inner
+        if self.text.startswith("\\frac", self.pos):
+            self.pos += len("\\frac")
+            self.expect("{")
+            numerator = self.expression()
+            self.expect("}")
+            self.expect("{")
+            denominator = _constant(self.expression())
+            self.expect("}")
+            if not denominator:
+                raise _NotPolynomial()
+            if _constant(numerator) is None:
+                self.flat = False
+            self.kind = "number"
+            return _scale(numerator, 1 / denominator)
+        raise _NotPolynomial()
+
+
+def _to_poly(sparse: _Sparse, gens: Tuple[sympy.Symbol, ...]) -> sympy.Poly:
+    names = [g.name for g in gens]
+    terms = {}
+    for mono, coeff in sparse.items():
+        exponents = dict(mono)
+        terms[tuple(exponents.get(name, 0) for name in names)] = sympy.Rational(coeff.numerator, coeff.denominator)
+    domain = "ZZ" if all(c.denominator == 1 for c in sparse.values()) else "QQ"
+    return sympy.Poly.from_dict(terms, *gens, domain=domain)
+
+
+@functools.lru_cache(maxsize=4096)
+def recognize(latex_str: str) -> Optional[PolynomialInput]:
+    """
+    Recognize a polynomial (or polynomial equation) written in LaTeX.
+
+    Returns:
+        The polynomial(s) over the sorted variables of the input, or None when
+        the input is outside the subset or has no variable
+    """
+    # sympy_service 在模块级导入本模块
+    from .sympy_service import normalize_latex
+
+    parser = _Parser(normalize_latex(latex_str))
+    try:
+        lhs = parser.expression()
+        rhs = None
+        if parser.peek() == "=":
+            parser.pos += 1
+            rhs = parser.expression()
+        if parser.peek():
+            raise _NotPolynomial()
+    except (_NotPolynomial, RecursionError):
+        return None
+
+    names = sorted({var for side in (lhs, rhs or {}) for mono in side for var, _ in mono})
+    if not names:
+        return None
+    gens = tuple(sympy.Symbol(name) for name in names)
+    return PolynomialInput(_to_poly(lhs, gens), None if rhs is None else _to_poly(rhs, gens), parser.flat)
+
+
+def parse_polynomial(latex_str) -> Optional[sympy.Poly]:
+    """The polynomial written in ``latex_str``, or None to use the full parser."""
+    if not isinstance(latex_str, str):
+        return None
+    recognized = recognize(latex_str)
+    if recognized is None or recognized.rhs is not None or not poly_within_limits(recognized.lhs):
+        return None
+    return recognized.lhs
+
+
+def parse_polynomial_equation(latex_str) -> Optional[Tuple[sympy.Poly, sympy.Poly]]:
+    """
+    Both sides of a flat single-variable polynomial equation.
+
+    A bare polynomial means ``= 0``. Only inputs written as sums of monomials
+    qualify, so that the equation rebuilt from the polynomials reads like the
+    input; sides differing by a constant are left to the full parser, which
+    evaluates such an equation to true or false.
+    """
+    if not isinstance(latex_str, str):
+        return None
+    recognized = recognize(latex_str)
+    if recognized is None or not recognized.flat or len(recognized.lhs.gens) != 1:
+        return None
+    if recognized.rhs is not None and (recognized.lhs - recognized.rhs).is_ground:
+        return None
+    if not all(poly_within_limits(p) for p in (recognized.lhs, recognized.rhs) if p is not None):
+        return None
+    rhs = recognized.rhs if recognized.rhs is not None else recognized.lhs.mul_ground(0)
+    return recognized.lhs, rhs
+
+
+def _poly_key(poly: sympy.Poly) -> tuple:
+    # 系数转成字符串：持久缓存按 repr 计算键，不应依赖系数域的实现类型
+    return tuple(g.name for g in poly.gens), tuple((monom, str(coeff)) for monom, coeff in sorted(poly.terms()))
+
+
+def polynomial_key(latex_str) -> Optional[Hashable]:
+    """Cache-key form of a recognized polynomial (None when not recognized)."""
+    poly = parse_polynomial(latex_str)
+    return None if poly is None else ("poly",) + _poly_key(poly)
+
+
+def equation_key(latex_str) -> Optional[Hashable]:
+    """Cache-key form of a recognized polynomial equation (None when not recognized)."""
+    sides = parse_polynomial_equation(latex_str)
+    return None if sides is None else ("poly=",) + tuple(_poly_key(p) for p in sides)
@@ -8,13 +8,14 @@ SymPy computes the answers; we build pedagogical steps on top.
 import sympy
 from sympy import (
     Symbol, Eq, latex, solve, reduce_inequalities, linsolve,
-    Poly, Rational, simplify,
+    Poly, Rational, simplify, roots, default_sort_key,
     StrictLessThan, LessThan, StrictGreaterThan, GreaterThan,
     And, Or, S, oo, symbols,
 )
 from typing import Optional
 
-from .sympy_service import parse_latex_safe
+from .polynomial import equation_key, parse_polynomial_equation
+from .sympy_service import cached_operation, parse_latex_safe
 
 
 def _find_variable(expr) -> Symbol:
@@ -85,20 +86,30 @@ def _format_number(val) -> str:
         return str(val)
 
 
+@cached_operation("solve_equation", fast_key=equation_key)
 def solve_equation_with_steps(latex_str: str) -> dict:
     """
     Solve an equation and return result with step-by-step process.
 
     Handles linear, quadratic, and fractional equations.
+    Single-variable polynomial equations written as sums of monomials are
+    read straight into Poly coefficients (see polynomial.py), skipping the
+    LaTeX parser and simplify().
     Returns dict with keys: result, steps, verified.
     """
-    if not latex_str or not latex_str.strip():
-        raise ValueError("LaTeX 表达式不能为空")
+    # 已存储的表达式（expression_id）在存储时已经解析过
+    if isinstance(latex_str, str):
+        if not latex_str.strip():
+            raise ValueError("LaTeX 表达式不能为空")
 
-    if len(latex_str) > 500:
-        raise ValueError("表达式过长，请简化后重试")
+        if len(latex_str) > 500:
+            raise ValueError("表达式过长，请简化后重试")
 
-    parsed = parse_latex_safe(latex_str)
+    sides = parse_polynomial_equation(latex_str)
+    if sides is not None:
+        parsed = Eq(sides[0].as_expr(), sides[1].as_expr(), evaluate=False)
+    else:
+        parsed = parse_latex_safe(latex_str)
     var = _find_variable(parsed)
 
     steps = []
@@ -109,16 +120,21 @@ def solve_equation_with_steps(latex_str: str) -> dict:
         parsed = Eq(parsed, 0)
         steps[0]["latex"] = latex(parsed)
 
-    # Rearrange to lhs - rhs = 0
-    rearranged = simplify(parsed.lhs - parsed.rhs)
-
-    # Try to detect polynomial
-    try:
-        poly = Poly(rearranged, var)
+    if sides is not None:
+        # Already polynomials in var: rearranging is coefficient subtraction
+        poly = sides[0] - sides[1]
         degree = poly.degree()
-    except (sympy.PolynomialError, Exception):
-        poly = None
-        degree = None
+    else:
+        # Rearrange to lhs - rhs = 0
+        rearranged = simplify(parsed.lhs - parsed.rhs)
+
+        # Try to detect polynomial
+        try:
+            poly = Poly(rearranged, var)
+            degree = poly.degree()
+        except (sympy.PolynomialError, Exception):
+            poly = None
+            degree = None
 
     if degree == 1:
         # Linear equation: a*x + c = 0 where c = constant from rearranged
@@ -182,8 +198,11 @@ def solve_equation_with_steps(latex_str: str) -> dict:
             "latex": latex(Eq(Symbol('\\Delta'), delta_val))
         })
 
-        # Solve using SymPy
-        solutions = solve(parsed, var)
+        # Solve using SymPy (same roots, in the order solve() returns them)
+        if sides is not None:
+            solutions = sorted(roots(poly), key=default_sort_key)
+        else:
+            solutions = solve(parsed, var)
         solutions = [simplify(s) for s in solutions]
 
         # Check for no real roots
@@ -410,6 +429,7 @@ def _format_inequality_result(result, var: Symbol) -> str:
     return latex(result)
 
 
+@cached_operation("solve_inequality")
 def solve_inequality_with_steps(latex_str: str) -> dict:
     """
     Solve an inequality and return result with step-by-step process.
@@ -417,13 +437,18 @@ def solve_inequality_with_steps(latex_str: str) -> dict:
     Handles linear and quadratic inequalities.
     Returns dict with keys: result, steps, intervals, verified.
     """
-    if not latex_str or not latex_str.strip():
-        raise ValueError("LaTeX 表达式不能为空")
+    # 已存储的表达式（expression_id）在存储时已经解析过
+    if isinstance(latex_str, str):
+        if not latex_str.strip():
+            raise ValueError("LaTeX 表达式不能为空")
 
-    if len(latex_str) > 500:
-        raise ValueError("表达式过长，请简化后重试")
+        if len(latex_str) > 500:
+            raise ValueError("表达式过长，请简化后重试")
 
     parsed = parse_latex_safe(latex_str)
+    # 已存储的句柄可能指向任意表达式
+    if not isinstance(parsed, (StrictLessThan, LessThan, StrictGreaterThan, GreaterThan)):
+        raise ValueError(f"无法识别的不等式类型: {type(parsed).__name__}")
     var = _find_variable(parsed)
 
     steps = []
@@ -470,6 +495,7 @@ def solve_inequality_with_steps(latex_str: str) -> dict:
     }
 
 
+@cached_operation("solve_system", expressions=("equations",))
 def solve_system_with_steps(equations: list, variables: list) -> dict:
     """
     Solve a system of linear equations and return result with steps.
@@ -487,6 +513,9 @@ def solve_system_with_steps(equations: list, variables: list) -> dict:
         raise ValueError(f"方程数量（{len(equations)}）不能少于变量数量（{len(variables)}）")
 
     for eq_str in equations:
+        # 已存储的表达式（expression_id）在存储时已经解析过
+        if not isinstance(eq_str, str):
+            continue
         if not eq_str or not eq_str.strip():
             raise ValueError("方程不能为空")
         if len(eq_str) > 500:
@@ -504,7 +533,7 @@ def solve_system_with_steps(equations: list, variables: list) -> dict:
         exprs.append(expr)
         steps.append({
             "description": f"方程 {i + 1}",
-            "latex": eq_latex
+            "latex": eq_latex if isinstance(eq_latex, str) else latex(parsed)
         })
 
     # Use linsolve for linear systems
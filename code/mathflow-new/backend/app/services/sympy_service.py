@@ -1,8 +1,123 @@
+import contextlib
+import contextvars
+import copy
+import functools
+import hashlib
+import importlib.util
+import inspect
 import re
+import zlib
 import sympy
-from sympy.parsing.latex import parse_latex
 from sympy import latex, Symbol
-from typing import Optional
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .. import __version__
+from ..config import PARSER_BACKENDS, settings
+from .cache import LRUCache, SQLiteStore
+from .complexity import ExpressionTooComplexError, check_complexity, check_parameters
+from .polynomial import parse_polynomial, polynomial_key
+
+# 当前请求选择的 LaTeX 解析器后端；None 表示使用 settings.parser_backend
+_parser_backend: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("parser_backend", default=None)
+
+# (解析器后端, LaTeX 规范记号序列) -> 解析结果；SymPy 表达式不可变，可安全共享
+_parse_cache = LRUCache("parse", settings.parse_cache_size, settings.parse_cache_ttl)
+
+# (运算名, 规范化输入, 参数) -> 运算结果
+_result_cache = LRUCache(
+    "result",
+    settings.result_cache_size,
+    max_bytes=settings.result_cache_bytes,
+    sizeof=lambda key, value: len(repr(key)) + len(repr(value)),
+)
+
+# 可选的持久化结果缓存（同一主机所有进程共享），按 SymPy 与应用版本隔离
+_persistent_store = (
+    SQLiteStore("persistent", settings.cache_db_path, f"sympy-{sympy.__version__}/app-{__version__}",
+                settings.cache_db_max_rows, settings.cache_db_ttl)
+    if settings.cache_db_path
+    else None
+)
+_MISSING = object()
+
+
+# LaTeX 记号：两侧空白并入乘除号；\left/\right 只认规范化会替换的定界符
+_LATEX_TOKEN = re.compile(r"""
+    \s*(?:\\times|\\cdot|\*)\s*
+  | \s*(?:\\div|/)\s*
+  | \\left(?:\(|\[|\\\{)
+  | \\right(?:\)|\]|\\\})
+  | \s+
+  | \\(?:[A-Za-z]+|.)
+  | \d+(?:\.\d+)?
+  | [A-Za-z]+
+  | .
+""", re.VERBOSE | re.DOTALL)
+
+# 同一记号的不同写法 -> 交给解析器的写法
+_LATEX_SPELLINGS = {
+    r"\times": "*",
+    r"\cdot": "*",
+    "*": "*",
+    r"\div": "/",
+    "/": "/",
+    r"\left(": "(",
+    r"\right)": ")",
+    r"\left[": "[",
+    r"\right]": "]",
+    r"\left\{": "{",
+    r"\right\}": "}",
+}
+
+
+# 这些记号两侧的空白会改变解析结果（Lark 的下标、ANTLR 的 \left| 等），在记号序列中保留为 " "
+_SPACE_SENSITIVE = frozenset({"_", r"\left", r"\right"})
+
+
+def _drop_redundant_braces(tokens: List[str]) -> List[str]:
+    """``x^{2}`` -> ``x^2`` when the braced token is one character and no digit or letter follows."""
+    result: List[str] = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if (
+            token in ("^", "_")
+            and tokens[i + 1:i + 2] == ["{"]
+            and tokens[i + 3:i + 4] == ["}"]
+            and len(tokens[i + 2]) == 1
+            and tokens[i + 2].isalnum()
+            and not (i + 4 < len(tokens) and tokens[i + 4][0].isalnum())
+        ):
+            # x^{2}3 是 3x^2，而 x^2 3 会被解析成 x^23，后面紧跟数字或字母时保留括号
+            result += [token, tokens[i + 2]]
+            i += 4
+            continue
+        result.append(token)
+        i += 1
+    return result
+
+
+@functools.lru_cache(maxsize=4096)
+def _scan_latex(latex_str: str) -> Tuple[str, Tuple[str, ...]]:
+    """One scan of ``latex_str``: (normalized string, canonical token stream)."""
+    normalized: List[str] = []
+    tokens: List[str] = []
+    space = False
+    for text in _LATEX_TOKEN.findall(latex_str):
+        spelling = _LATEX_SPELLINGS.get(text.strip() if text[0].isspace() or text[-1].isspace() else text)
+        if spelling is None and text.isspace():
+            normalized.append(text)
+            space = True
+            continue
+        token = text if spelling is None else spelling
+        if space and tokens and (tokens[-1] in _SPACE_SENSITIVE or token in _SPACE_SENSITIVE):
+            tokens.append(" ")
+        space = False
+        normalized.append(token)
+        tokens.append(token)
+    if "}" in tokens:
+        tokens = _drop_redundant_braces(tokens)
+    return "".join(normalized), tuple(tokens)
 
 
 def normalize_latex(latex_str: str) -> str:
@@ -11,7 +126,9 @@ def normalize_latex(latex_str: str) -> str:
 
     Most LaTeX constructs (\\cdot, \\times, \\left/\\right, \\div, \\sin, etc.)
     are already handled natively by SymPy's parse_latex. This function serves as
-    a safety net for edge cases and ensures consistent handling.
+    a safety net for edge cases and ensures consistent handling: \\times and
+    \\cdot become *, \\div becomes /, \\left( \\right) and the other bracket
+    pairs become plain brackets, and spaces around * and / are removed.
 
     Key principle: Do NOT strip backslashes from function commands (\\sin -> sin)
     because parse_latex recognizes \\sin but treats bare 'sin' as s*i*n.
@@ -24,114 +141,812 @@ def normalize_latex(latex_str: str) -> str:
     """
     if not latex_str:
         return latex_str
+    return _scan_latex(latex_str)[0]
 
-    normalized = latex_str
 
-    # Step 1: LaTeX multiplication operators -> standard * for safety
-    # parse_latex handles these, but explicit replacement ensures consistency
-    normalized = normalized.replace(r'\times', '*')
-    normalized = normalized.replace(r'\cdot', '*')
+def latex_tokens(latex_str: str) -> Tuple[str, ...]:
+    """
+    Canonical token stream of a LaTeX string, usable as a cache key.
+
+    Produced by the same scan as normalize_latex(): whitespace is dropped,
+    operator and \\left/\\right spellings are unified and braces around a
+    single-character exponent or subscript are removed, so ``x^{2} \\cdot y``
+    and ``x^2*y`` give the same tokens. Token boundaries follow the parser's
+    (a letter or digit run is one token), so inputs with equal tokens parse
+    to the same expression.
 
-    # Step 2: Delimiters -> plain brackets for safety
-    normalized = normalized.replace(r'\left(', '(')
-    normalized = normalized.replace(r'\right)', ')')
-    normalized = normalized.replace(r'\left[', '[')
-    normalized = normalized.replace(r'\right]', ']')
-    normalized = normalized.replace(r'\left\{', '{')
-    normalized = normalized.replace(r'\right\}', '}')
+    Args:
+        latex_str: Raw LaTeX string from user input
 
-    # Step 3: Division operator
-    normalized = normalized.replace(r'\div', '/')
+    Returns:
+        Tuple of token strings
+    """
+    if not latex_str:
+        return ()
+    return _scan_latex(latex_str)[1]
 
-    # Step 4: Clean up extra spaces around operators for cleaner input
-    normalized = re.sub(r'\s*\*\s*', '*', normalized)
-    normalized = re.sub(r'\s*/\s*', '/', normalized)
 
-    return normalized
+# 数值探测：右半平面内的随机复数点（远离 log/sqrt 的主值割线），固定种子保证结果可复现。
+# 每个符号名有自己固定的一组取值，因此不同表达式的探测值可以逐点直接比较。
+_PROBE_POINTS = 16
+_PROBE_SEED = 20240601
+_PROBE_RTOL = 1e-8
 
 
-def verify_equivalence(input_latex: str, output_latex: str) -> bool:
+def _sorted_symbols(*exprs) -> list:
+    symbols = set()
+    for expr in exprs:
+        symbols |= expr.free_symbols
+    return sorted(symbols, key=lambda s: s.name)
+
+
+@functools.lru_cache(maxsize=None)
+def _numpy():
+    """NumPy, imported on the first numeric probe; None when it is not installed."""
+    try:
+        import numpy
+    except ImportError:  # 没有 NumPy 时跳过数值探测层级
+        return None
+    return numpy
+
+
+@functools.lru_cache(maxsize=1024)
+def _probe_points(symbol_name: str):
+    np = _numpy()
+    rng = np.random.default_rng([_PROBE_SEED, zlib.crc32(symbol_name.encode("utf-8"))])
+    return rng.uniform(0.5, 2.0, _PROBE_POINTS) + 1j * rng.uniform(-0.5, 0.5, _PROBE_POINTS)
+
+
+def _probe_values(expr):
+    """Vectorized values of ``expr`` at the probe points; None if not evaluable."""
+    np = _numpy()
+    if np is None:
+        return None
+    symbols = _sorted_symbols(expr)
+    try:
+        func = sympy.lambdify(symbols, expr, modules="numpy")
+        with np.errstate(all="ignore"):
+            values = func(*[_probe_points(s.name) for s in symbols])
+            return np.broadcast_to(np.asarray(values, dtype=complex), (_PROBE_POINTS,))
+    except Exception:
+        return None
+
+
+def _compare_probes(values_a, values_b) -> Optional[bool]:
+    """False when the probe values disagree at most comparable points, else None."""
+    if values_a is None or values_b is None:
+        return None
+    np = _numpy()
+    comparable = np.isfinite(values_a) & np.isfinite(values_b)
+    if comparable.sum() < 3:
+        return None
+    a, b = values_a[comparable], values_b[comparable]
+    mismatch = np.abs(a - b) > _PROBE_RTOL * (1 + np.abs(a) + np.abs(b))
+    if mismatch.sum() * 2 > len(a):
+        return False
+    return None
+
+
+def _polynomial_tier(expr_input, expr_output) -> Optional[bool]:
+    """Decide equivalence via canonical Poly form; None if not polynomial."""
+    symbols = _sorted_symbols(expr_input, expr_output)
+    if not symbols:
+        return None
+    if not (expr_input.is_polynomial(*symbols) and expr_output.is_polynomial(*symbols)):
+        return None
+    try:
+        return sympy.Poly(expr_input - expr_output, *symbols).is_zero
+    except sympy.PolynomialError:
+        return None
+
+
+def _numeric_tier(expr_input, expr_output) -> Optional[bool]:
     """
-    Verify if two LaTeX expressions are mathematically equivalent.
+    Reject non-equivalent pairs by evaluating both sides at random complex points.
+
+    Returns False when the values disagree at most probe points, None when the
+    probe is inconclusive (agreement is only evidence, never proof).
+    """
+    return _compare_probes(_probe_values(expr_input), _probe_values(expr_output))
+
+
+def _symbolic_tier(expr_input, expr_output) -> Tuple[bool, str]:
+    """The expensive checks: equals(), then simplify(input - output) == 0."""
+    try:
+        if expr_input.equals(expr_output):
+            return True, "equals"
+    except Exception:
+        pass
+
+    try:
+        diff = sympy.simplify(expr_input - expr_output)
+        return diff == 0, "simplify"
+    except Exception:
+        pass
+
+    return False, "simplify"
 
-    Uses SymPy's equals() method first (more robust for trig identities),
-    with simplify(input - output) == 0 as fallback.
+
+def verify_equivalence_detailed(input_latex: str, output_latex: str) -> Tuple[bool, str]:
+    """
+    Verify equivalence with a cascade of increasingly expensive checks.
+
+    Tiers, in order (the first conclusive one decides):
+    1. structural: the parsed expressions are identical
+    2. polynomial: canonical Poly form of input - output is zero or not
+    3. numeric: vectorized NumPy evaluation at random complex points rejects
+       clearly different expressions (never accepts)
+    4. equals: SymPy's equals() (robust for trig identities)
+    5. simplify: simplify(input - output) == 0
 
     Args:
         input_latex: Original expression in LaTeX
         output_latex: Result expression in LaTeX
 
     Returns:
-        True if expressions are mathematically equivalent, False otherwise.
-        Returns False on any parsing/computation error (never crashes).
+        (is_equivalent, tier) where tier names the deciding check, or "error"
+        when parsing/computation failed (never crashes).
+
+    Raises:
+        ExpressionTooComplexError: An input exceeds the complexity limits
     """
     try:
-        if not input_latex or not output_latex:
-            return False
+        # 已存储的表达式（expression_id）是 SymPy 对象，不按真值判空（0 也是表达式）
+        if any(v is None or (isinstance(v, str) and not v) for v in (input_latex, output_latex)):
+            return False, "error"
 
         # Parse both to SymPy expressions (normalize inside parse_latex_safe)
         expr_input = parse_latex_safe(input_latex)
         expr_output = parse_latex_safe(output_latex)
+        return _verify_exprs(expr_input, expr_output)
+    except ExpressionTooComplexError:
+        # Rejected inputs are a client error, not an inconclusive check
+        raise
+    except Exception:
+        # On any error, return False (not a crash)
+        return False, "error"
+
+
+def _verify_exprs(expr_input, expr_output) -> Tuple[bool, str]:
+    """Run the verification cascade on already-parsed expressions."""
+    if expr_input == expr_output:
+        return True, "structural"
+
+    if isinstance(expr_input, sympy.Expr) and isinstance(expr_output, sympy.Expr):
+        decided = _polynomial_tier(expr_input, expr_output)
+        if decided is not None:
+            return decided, "polynomial"
+        if _numeric_tier(expr_input, expr_output) is False:
+            return False, "numeric"
+
+    # Expensive symbolic checks, only when the cheap tiers were inconclusive
+    return _symbolic_tier(expr_input, expr_output)
+
+
+# 计算候选答案时视为"无法判定"的异常（其余异常不应被吞掉）
+_EVALUATION_ERRORS = (
+    ArithmeticError, TypeError, ValueError, NotImplementedError, RecursionError, sympy.PolynomialError,
+)
+
+
+class _Reference:
+    """
+    A reference answer preprocessed once for grading many candidates.
+
+    Holds the parsed expression, its canonical Poly form (when polynomial)
+    and its precomputed numeric probe values.
+    """
+
+    def __init__(self, latex_str: str):
+        self.expr = parse_latex_safe(latex_str)
+        self.is_expr = isinstance(self.expr, sympy.Expr)
+        self.symbols = _sorted_symbols(self.expr)
+        self.poly = None
+        self.probe = None
+        if self.is_expr:
+            if self.symbols and self.expr.is_polynomial(*self.symbols):
+                try:
+                    self.poly = sympy.Poly(self.expr.doit(), *self.symbols)
+                except sympy.PolynomialError:
+                    pass
+            self.probe = _probe_values(self.expr)
+
+    def verify(self, candidate_latex: str) -> Tuple[bool, str]:
+        """
+        Run the verification cascade of one candidate against the reference.
+
+        A candidate that cannot be parsed or evaluated is reported as
+        (False, "error"), one over the complexity limits as (False, "too_complex").
+        """
+        if not candidate_latex:
+            return False, "error"
+        try:
+            candidate = parse_latex_safe(candidate_latex)
+        except ExpressionTooComplexError:
+            return False, "too_complex"
+        except ValueError:
+            return False, "error"
 
-        # Method 1: Try equals() first (more robust, handles trig identities)
         try:
-            if expr_input.equals(expr_output):
-                return True
+            if candidate == self.expr:
+                return True, "structural"
+
+            if self.is_expr and isinstance(candidate, sympy.Expr):
+                if (
+                    self.poly is not None
+                    and candidate.free_symbols <= set(self.symbols)
+                    and candidate.is_polynomial(*self.symbols)
+                ):
+                    # doit() flattens the unevaluated nested sums parse_latex produces
+                    candidate_poly = sympy.Poly(candidate.doit(), *self.symbols)
+                    return (self.poly - candidate_poly).is_zero, "polynomial"
+                if _compare_probes(self.probe, _probe_values(candidate)) is False:
+                    return False, "numeric"
+
+            return _symbolic_tier(self.expr, candidate)
+        except _EVALUATION_ERRORS:
+            return False, "error"
+
+
+# 参考答案的 srepr -> 预处理后的 _Reference
+_reference_cache = LRUCache("reference", 256, settings.parse_cache_ttl)
+
+
+def verify_candidates(reference_latex: str, candidates: List[str]) -> List[Tuple[bool, str]]:
+    """
+    Verify many candidate answers against one reference answer.
+
+    The reference is parsed and preprocessed (canonical Poly form, numeric
+    probe values) once per worker and reused for every candidate.
+
+    Args:
+        reference_latex: Reference answer in LaTeX
+        candidates: Candidate answers in LaTeX
+
+    Returns:
+        One (is_equivalent, tier) per candidate, as in verify_equivalence_detailed()
+
+    Raises:
+        ValueError: The reference cannot be parsed
+    """
+    key = sympy.srepr(parse_latex_safe(reference_latex))
+    reference = _reference_cache.get(key)
+    if reference is None:
+        reference = _Reference(reference_latex)
+        _reference_cache.set(key, reference)
+    return [reference.verify(candidate) for candidate in candidates]
+
+
+# 指纹使用的探测点数，以及两个指纹视为相等的容差（同 _compare_probes() 的形式）
+_FINGERPRINT_POINTS = 6
+_FINGERPRINT_TOLERANCE = 1e-6
+# 超过该绝对值的取值（由 evalf 求得）按 10 的幂缩放后记入指纹
+_FINGERPRINT_SCALE_LIMIT = 1e300
+
+
+def _evalf_values(expr) -> Optional[Tuple[int, list]]:
+    """
+    Values of ``expr`` at the first probe points via evalf, for what NumPy
+    cannot evaluate (factorials, binomials, integrals, numbers beyond the
+    float range).
+
+    Returns:
+        (scale, values) with the values divided by 10**scale (0 unless they
+        exceed the float range) and None at points without a finite value;
+        None if no point has one
+    """
+    symbols = _sorted_symbols(expr)
+    points = [_probe_points(s.name) for s in symbols]
+    parts = []
+    for i in range(_FINGERPRINT_POINTS):
+        subs = {s: sympy.Float(p[i].real) + sympy.I * sympy.Float(p[i].imag) for s, p in zip(symbols, points)}
+        try:
+            re, im = expr.evalf(15, subs=subs).as_real_imag()
         except Exception:
-            pass
+            re = im = None
+        # 未能求值（如无法数值积分）的结果不是数
+        finite = all(isinstance(v, sympy.Number) and v.is_finite for v in (re, im))
+        parts.append((re, im) if finite else None)
+    magnitudes = [max(abs(re), abs(im)) for re, im in filter(None, parts)]
+    if not magnitudes:
+        return None
+    largest = max(magnitudes)
+    scale = int(round(float(sympy.log(largest, 10).evalf()))) if largest > _FINGERPRINT_SCALE_LIMIT else 0
+    unit = sympy.Integer(10) ** scale
+    return scale, [complex(float(part[0] / unit), float(part[1] / unit)) if part else None for part in parts]
+
+
+def fingerprint_expressions(latex_list: List[str]) -> List[Optional[tuple]]:
+    """
+    Numeric fingerprints for equivalence clustering.
+
+    A fingerprint is the expression's values at the first probe points, as
+    (real, imag) pairs with None where the value is not finite. Equivalent
+    expressions get fingerprints that agree within a tolerance (see
+    group_fingerprints()). Values come from NumPy, else from evalf (see
+    _evalf_values()); the values are preceded by labels where needed: the
+    operator of a relation (whose values are those of lhs - rhs) and the
+    power of ten the values are scaled by. Expressions that cannot be
+    evaluated at all share the fingerprint ("opaque",) so that they are still
+    compared with each other.
+
+    Args:
+        latex_list: Expressions in LaTeX
 
-        # Method 2: Fallback to simplify(input - output) == 0
+    Returns:
+        One fingerprint per expression, None where the LaTeX cannot be parsed
+    """
+    np = _numpy()
+    fingerprints = []
+    for latex_str in latex_list:
         try:
-            diff = sympy.simplify(expr_input - expr_output)
-            return diff == 0
+            expr = parse_latex_safe(latex_str)
         except Exception:
-            pass
+            fingerprints.append(None)
+            continue
+        labels = ()
+        if isinstance(expr, sympy.core.relational.Relational):
+            # a > b 与 b < a 等价：统一为 < / <=，再比较 lhs - rhs 的取值
+            if isinstance(expr, (sympy.GreaterThan, sympy.StrictGreaterThan)):
+                expr = expr.reversed
+            labels = (expr.rel_op,)
+            try:
+                expr = expr.lhs - expr.rhs
+            except Exception:
+                fingerprints.append(("opaque",))
+                continue
+        values = _probe_values(expr) if isinstance(expr, sympy.Expr) else None
+        if values is not None and np.isfinite(values).any():
+            values = [complex(v) if np.isfinite(v) else None for v in values[:_FINGERPRINT_POINTS]]
+        else:
+            evaluated = _evalf_values(expr) if np is not None and isinstance(expr, sympy.Expr) else None
+            if evaluated is None:
+                fingerprints.append(("opaque",))
+                continue
+            scale, values = evaluated
+            if scale:
+                labels += (scale,)
+        if labels[:1] in (("==",), ("!=",)):
+            # a = b 与 b = a 等价：lhs - rhs 只相差符号，取第一个有限值为正的一侧
+            first = next((v for v in values if v is not None), 0j)
+            if (first.real, first.imag) < (0, 0):
+                values = [-v if v is not None else None for v in values]
+        fingerprints.append(labels + tuple(
+            (float(v.real), float(v.imag)) if v is not None else None for v in values
+        ))
+    return fingerprints
+
+
+def _fingerprint_parts(fingerprint: tuple) -> Tuple[tuple, tuple]:
+    """Split a fingerprint into its labels and its values."""
+    count = next(i for i, v in enumerate(fingerprint) if v is None or isinstance(v, tuple))
+    return fingerprint[:count], fingerprint[count:]
+
+
+def _fingerprints_agree(a: tuple, b: tuple) -> bool:
+    for u, v in zip(_fingerprint_parts(a)[1], _fingerprint_parts(b)[1]):
+        if u is None or v is None:
+            if u is not v:
+                return False
+        elif abs(complex(*u) - complex(*v)) > _FINGERPRINT_TOLERANCE * (1 + abs(complex(*u)) + abs(complex(*v))):
+            return False
+    return True
 
-        return False
-    except Exception:
-        # On any error, return False (not a crash)
-        return False
 
+def group_fingerprints(fingerprints: List[Optional[tuple]]) -> List[List[int]]:
+    """
+    Group the indices of fingerprints that agree within the tolerance.
+
+    Rounding the values to a fixed number of digits would split equivalent
+    expressions whose values straddle a rounding boundary. Instead, the
+    fingerprints (per labels and pattern of non-finite points) are sorted by
+    the sum of their values; agreeing fingerprints lie within a bounded
+    distance of each other in that order, so only neighbours in a run are
+    compared.
+
+    Args:
+        fingerprints: As returned by fingerprint_expressions(); None entries are skipped
+
+    Returns:
+        Groups of indices, each in input order, ordered by first member
+    """
+    patterns: Dict[tuple, list] = {}
+    for index, fingerprint in enumerate(fingerprints):
+        if fingerprint is None:
+            continue
+        if fingerprint == ("opaque",):
+            patterns.setdefault(fingerprint, []).append(index)
+            continue
+        labels, values = _fingerprint_parts(fingerprint)
+        finite = [complex(*v) for v in values if v is not None]
+        pattern = (labels, tuple(v is None for v in values))
+        patterns.setdefault(pattern, []).append(
+            (sum(v.real + v.imag for v in finite), sum(1 + abs(v) for v in finite), index)
+        )
+
+    groups: List[List[int]] = []
+    for pattern, members in patterns.items():
+        if pattern == ("opaque",):
+            groups.append(members)
+            continue
+        members.sort()
+        # 两个相符的指纹之和至多相差 4 * 容差 * 最大的 sum(1 + |v|)
+        gap = 4 * _FINGERPRINT_TOLERANCE * max(size for _, size, _ in members)
+        run = [members[0][2]]
+        for (previous, _, _), (total, _, index) in zip(members, members[1:]):
+            if total - previous > gap:
+                groups.extend(_split_run(fingerprints, run))
+                run = []
+            run.append(index)
+        groups.extend(_split_run(fingerprints, run))
+    for group in groups:
+        group.sort()
+    groups.sort(key=lambda group: group[0])
+    return groups
+
+
+def _split_run(fingerprints: List[Optional[tuple]], run: List[int]) -> List[List[int]]:
+    """Split a run of close sums into groups that agree with their first member."""
+    groups: List[List[int]] = []
+    for index in run:
+        for group in groups:
+            if _fingerprints_agree(fingerprints[group[0]], fingerprints[index]):
+                group.append(index)
+                break
+        else:
+            groups.append([index])
+    return groups
+
+
+def _cluster_bucket(latex_list: List[str]) -> List[List[int]]:
+    """
+    Split expressions with equal fingerprints into equivalence classes.
+
+    Each expression is compared with the representative (first member) of
+    every class found so far and joins the first equivalent one. Structurally
+    identical expressions are grouped without any check.
+    """
+    classes: List[List[int]] = []
+    representatives = []
+    by_structure = {}
+    for index, latex_str in enumerate(latex_list):
+        expr = parse_latex_safe(latex_str)
+        key = sympy.srepr(expr)
+        if key in by_structure:
+            classes[by_structure[key]].append(index)
+            continue
+        for class_index, representative in enumerate(representatives):
+            # Fingerprints already agree, so skip the numeric tier
+            decided = None
+            if isinstance(expr, sympy.Expr) and isinstance(representative, sympy.Expr):
+                decided = _polynomial_tier(representative, expr)
+            if decided is None:
+                try:
+                    decided = _symbolic_tier(representative, expr)[0]
+                except Exception:
+                    decided = False
+            if decided:
+                classes[class_index].append(index)
+                break
+        else:
+            class_index = len(classes)
+            classes.append([index])
+            representatives.append(expr)
+        by_structure[key] = class_index
+    return classes
+
+
+def cluster_buckets(buckets: List[List[str]]) -> List[List[List[int]]]:
+    """
+    Confirm equivalence symbolically inside each bucket of equal fingerprints.
+
+    Args:
+        buckets: Groups of parseable LaTeX expressions sharing one fingerprint
+
+    Returns:
+        Per bucket, its classes as lists of indices into the bucket, in order
+        of first member
+    """
+    return [_cluster_bucket(bucket) for bucket in buckets]
+
+
+def verify_equivalence(input_latex: str, output_latex: str) -> bool:
+    """
+    Verify if two LaTeX expressions are mathematically equivalent.
+
+    See verify_equivalence_detailed() for the tiers that are tried.
+
+    Args:
+        input_latex: Original expression in LaTeX
+        output_latex: Result expression in LaTeX
+
+    Returns:
+        True if expressions are mathematically equivalent, False otherwise.
+        Returns False on any parsing/computation error (never crashes).
+    """
+    return verify_equivalence_detailed(input_latex, output_latex)[0]
+
+
+def available_parser_backends() -> List[str]:
+    """Parser backends usable in this installation (lark is optional)."""
+    return [b for b in PARSER_BACKENDS if b != "lark" or importlib.util.find_spec("lark") is not None]
+
+
+def parser_backend() -> str:
+    """The LaTeX parser backend in effect: the per-request choice, else the setting."""
+    return _parser_backend.get() or settings.parser_backend
+
+
+@contextlib.contextmanager
+def use_parser(backend: Optional[str]) -> Iterator[None]:
+    """Parse with ``backend`` inside the block (None keeps the configured default)."""
+    token = _parser_backend.set(backend)
+    try:
+        yield
+    finally:
+        _parser_backend.reset(token)
 
-def parse_latex_safe(latex_str: str) -> Optional[sympy.Expr]:
-    """安全地解析 LaTeX 表达式，先进行规范化处理"""
+
+@functools.lru_cache(maxsize=None)
+def _latex_parser(backend: str) -> Callable[[str], sympy.Basic]:
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"未知的 LaTeX 解析器: {backend}（可选: {', '.join(PARSER_BACKENDS)}）")
+    if backend not in available_parser_backends():
+        raise ValueError(f"LaTeX 解析器 {backend} 不可用，请先安装 {backend}")
+    # Imported on first parse: with lark installed, importing the package
+    # already builds the Lark grammar, which would slow down every startup
+    from sympy.parsing.latex import parse_latex
+    return functools.partial(parse_latex, backend=backend)
+
+
+def parse_latex_safe(latex_str: Union[str, sympy.Basic]) -> Optional[sympy.Expr]:
+    """
+    安全地解析 LaTeX 表达式，先进行规范化处理（结果按解析器后端与规范记号序列缓存）
+
+    已解析的 SymPy 对象（来自 expression_id 句柄）原样返回。两种输入都按当前
+    运算的复杂度上限检查（见 complexity.py），超出时抛出 ExpressionTooComplexError。
+    """
+    if isinstance(latex_str, sympy.Basic):
+        check_complexity(latex_str)
+        return latex_str
+    backend = parser_backend()
+    parse = _latex_parser(backend)
     try:
-        normalized = normalize_latex(latex_str)
-        return parse_latex(normalized)
+        normalized, tokens = _scan_latex(latex_str)
+        expr = _parse_cache.get((backend, tokens))
+        if expr is None:
+            expr = parse(normalized)
+            if not isinstance(expr, sympy.Basic):
+                # Lark 后端遇到有歧义的输入时返回语法树而不是表达式
+                raise ValueError("表达式有歧义")
+            _parse_cache.set((backend, tokens), expr)
     except Exception as e:
         raise ValueError(f"无法解析 LaTeX: {str(e)}")
+    check_complexity(expr)
+    return expr
+
+
+def expression_digest(expr: sympy.Basic) -> str:
+    """Content address of a parsed expression (hash of its srepr)."""
+    return hashlib.sha256(sympy.srepr(expr).encode("utf-8")).hexdigest()[:32]
+
+
+def parse_expression(latex_str: str) -> dict:
+    """
+    Parse LaTeX for the expression store (POST /api/expressions).
+
+    Returns:
+        {"expression": parsed SymPy object, "id": content address,
+         "latex": canonical LaTeX of the parsed expression}
+
+    Raises:
+        ValueError: The LaTeX cannot be parsed
+    """
+    if not latex_str or not latex_str.strip():
+        raise ValueError("LaTeX 表达式不能为空")
+    expr = parse_latex_safe(latex_str)
+    return {"expression": expr, "id": expression_digest(expr), "latex": latex(expr)}
+
+
+def _canonical_arg(value, is_expression: bool):
+    """
+    Hashable cache-key form of one argument: the parser backend and token
+    stream of LaTeX, the srepr (in argument order) of a stored expression.
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(_canonical_arg(v, is_expression) for v in value)
+    if is_expression and isinstance(value, str):
+        # 不用解析结果的 srepr：它给参数排序，未求值的 x^2 \cdot 2 与 2*x^2 会共用一项，
+        # 而结果中回显的输入（求解步骤等）不同。记号相同的输入解析结果相同
+        return ("latex", parser_backend(), latex_tokens(value))
+    if is_expression and isinstance(value, sympy.Basic):
+        return sympy.srepr(value, order="none")
+    return value
+
+
+def cached_operation(
+    name: str,
+    expressions: Iterable[str] = ("latex_str",),
+    fast_key: Optional[Callable[[Any], Optional[Hashable]]] = None,
+) -> Callable:
+    """
+    Cache the results of a service function.
 
+    The key is the operation name, the normalized tokens of every LaTeX
+    argument listed in ``expressions`` (so spelling variants such as ``x^2``
+    and ``x^{2}`` share an entry, see latex_tokens()) and the remaining
+    parameters as given. Inputs the parser may keep apart, such as ``2*x^2``
+    and ``x^2 \\cdot 2``, get separate entries, since results may echo them.
 
+    Lookups go to the in-process LRU first, then to the persistent store when
+    MATHFLOW_CACHE_DB is configured.
+
+    Args:
+        name: Operation name, part of the cache key
+        expressions: Parameter names holding LaTeX (strings or lists of strings)
+        fast_key: Optional key for a LaTeX argument computed without parsing it
+            (e.g. its polynomial coefficients); None falls back to the tokens.
+            Only valid when the function's result depends on nothing else
+    """
+    expressions = frozenset(expressions)
+
+    def canonical(param, value):
+        if fast_key is not None and param in expressions:
+            key = fast_key(value)
+            if key is not None:
+                return key
+        return _canonical_arg(value, param in expressions)
+
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        def cache_key(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            try:
+                key = (name,) + tuple(
+                    (param, canonical(param, value))
+                    for param, value in bound.arguments.items()
+                )
+                hash(key)
+            except (ValueError, TypeError):
+                # Unparsable or unhashable input: not cacheable
+                return None
+            return key
+
+        def lookup(key):
+            cached = _result_cache.get(key, _MISSING)
+            if cached is not _MISSING:
+                return copy.deepcopy(cached)
+            if _persistent_store is not None:
+                cached = _persistent_store.get(key, _MISSING)
+                if cached is not _MISSING:
+                    _result_cache.set(key, copy.deepcopy(cached))
+            return cached
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = cache_key(args, kwargs)
+            if key is None:
+                # Let the function report the invalid input
+                return func(*args, **kwargs)
+
+            cached = lookup(key)
+            if cached is not _MISSING:
+                return cached
+
+            result = func(*args, **kwargs)
+            _result_cache.set(key, copy.deepcopy(result))
+            if _persistent_store is not None:
+                _persistent_store.set(key, result)
+            return result
+
+        def peek(*args, **kwargs) -> Tuple[bool, Any]:
+            """(True, result) when the result is already cached, else (False, None)."""
+            key = cache_key(args, kwargs)
+            cached = _MISSING if key is None else lookup(key)
+            return (False, None) if cached is _MISSING else (True, cached)
+
+        wrapper.peek = peek
+        return wrapper
+
+    return decorator
+
+
+@cached_operation("factor", fast_key=polynomial_key)
 def factor_expression(latex_str: str) -> str:
     """
     对表达式进行因式分解
 
+    多项式输入直接由系数构造 Poly（见 polynomial.py），不经过 LaTeX 解析器。
+
     Args:
         latex_str: LaTeX 格式的表达式
 
     Returns:
         因式分解后的 LaTeX 表达式
     """
+    poly = parse_polynomial(latex_str)
+    if poly is not None:
+        return latex(sympy.factor(poly.as_expr()))
     expr = parse_latex_safe(latex_str)
     factored = sympy.factor(expr)
     return latex(factored)
 
 
+@cached_operation("factor_verified", fast_key=polynomial_key)
+def factor_expression_verified(latex_str: str) -> dict:
+    """
+    因式分解并在同一次调用中验证结果
+
+    先用重新展开比较（因式分解最便宜的检查），不成立时再走通用验证层级。
+
+    Args:
+        latex_str: LaTeX 格式的表达式
+
+    Returns:
+        {"result": 因式分解后的 LaTeX, "verified": 是否与输入等价}
+    """
+    poly = parse_polynomial(latex_str)
+    if poly is not None:
+        factored = sympy.factor(poly.as_expr())
+        # 多项式输入：把各因子重新乘开，与输入的系数逐项比较
+        return {"result": latex(factored), "verified": sympy.Poly(factored, *poly.gens) == poly}
+    expr = parse_latex_safe(latex_str)
+    factored = sympy.factor(expr)
+    try:
+        verified = sympy.expand(factored) == sympy.expand(expr) or _verify_exprs(expr, factored)[0]
+    except Exception:
+        verified = False
+    return {"result": latex(factored), "verified": verified}
+
+
+@cached_operation("expand", fast_key=polynomial_key)
 def expand_expression(latex_str: str) -> str:
     """
     展开表达式
 
+    多项式输入直接由系数构造（见 polynomial.py），结果即按次数排列的各项之和。
+
     Args:
         latex_str: LaTeX 格式的表达式
 
     Returns:
         展开后的 LaTeX 表达式
     """
+    poly = parse_polynomial(latex_str)
+    if poly is not None:
+        return latex(poly.as_expr())
     expr = parse_latex_safe(latex_str)
     expanded = sympy.expand(expr)
     return latex(expanded)
 
 
+@cached_operation("expand_verified", fast_key=polynomial_key)
+def expand_expression_verified(latex_str: str) -> dict:
+    """
+    展开表达式并在同一次调用中验证结果
+
+    Args:
+        latex_str: LaTeX 格式的表达式
+
+    Returns:
+        {"result": 展开后的 LaTeX, "verified": 是否与输入等价}
+    """
+    poly = parse_polynomial(latex_str)
+    if poly is not None:
+        # 展开结果就是输入多项式的系数本身，不需要另行验证
+        return {"result": latex(poly.as_expr()), "verified": True}
+    expr = parse_latex_safe(latex_str)
+    expanded = sympy.expand(expr)
+    try:
+        verified = _verify_exprs(expr, expanded)[0]
+    except Exception:
+        verified = False
+    return {"result": latex(expanded), "verified": verified}
+
+
+@cached_operation("simplify")
 def simplify_expression(latex_str: str) -> str:
     """
     化简表达式
@@ -147,6 +962,26 @@ def simplify_expression(latex_str: str) -> str:
     return latex(simplified)
 
 
+@cached_operation("simplify_verified")
+def simplify_expression_verified(latex_str: str) -> dict:
+    """
+    化简表达式并在同一次调用中验证结果
+
+    Args:
+        latex_str: LaTeX 格式的表达式
+
+    Returns:
+        {"result": 化简后的 LaTeX, "verified": 是否与输入等价}
+    """
+    expr = parse_latex_safe(latex_str)
+    simplified = sympy.simplify(expr)
+    try:
+        verified = _verify_exprs(expr, simplified)[0]
+    except Exception:
+        verified = False
+    return {"result": latex(simplified), "verified": verified}
+
+
 def differentiate(latex_str: str, variable: str = "x") -> str:
     """
     对表达式求导
@@ -183,6 +1018,7 @@ def integrate(latex_str: str, variable: str = "x") -> str:
 
 # ==================== 微积分函数 ====================
 
+@cached_operation("differentiate")
 def differentiate_expr(latex_str: str, variable: str = "x") -> str:
     """
     对表达式求导
@@ -200,6 +1036,7 @@ def differentiate_expr(latex_str: str, variable: str = "x") -> str:
     return latex(derivative)
 
 
+@cached_operation("partial")
 def partial_derivative(latex_str: str, variable: str = "x") -> str:
     """
     对表达式求偏导数
@@ -217,6 +1054,7 @@ def partial_derivative(latex_str: str, variable: str = "x") -> str:
     return latex(derivative)
 
 
+@cached_operation("integrate")
 def integrate_indefinite(latex_str: str, variable: str = "x") -> str:
     """
     对表达式求不定积分
@@ -234,6 +1072,7 @@ def integrate_indefinite(latex_str: str, variable: str = "x") -> str:
     return latex(integral)
 
 
+@cached_operation("definite_integral", expressions=("latex_str", "lower", "upper"))
 def integrate_definite(latex_str: str, variable: str, lower: str, upper: str) -> str:
     """
     对表达式求定积分
@@ -258,6 +1097,17 @@ def integrate_definite(latex_str: str, variable: str, lower: str, upper: str) ->
     return latex(integral)
 
 
+def _limit_point(point: str):
+    """解析极限的趋近值"""
+    # Handle infinity special case: parse_latex("oo") = o*o, not infinity
+    if point in ("oo", "\\infty", "infinity", "+oo"):
+        return sympy.oo
+    if point in ("-oo", "-\\infty", "-infinity"):
+        return -sympy.oo
+    return parse_latex_safe(point)
+
+
+@cached_operation("limit")
 def compute_limit(latex_str: str, variable: str, point: str) -> str:
     """
     计算表达式极限
@@ -273,18 +1123,13 @@ def compute_limit(latex_str: str, variable: str, point: str) -> str:
     expr = parse_latex_safe(latex_str)
     var = Symbol(variable)
 
-    # Handle infinity special case: parse_latex("oo") = o*o, not infinity
-    if point in ("oo", "\\infty", "infinity", "+oo"):
-        x0 = sympy.oo
-    elif point in ("-oo", "-\\infty", "-infinity"):
-        x0 = -sympy.oo
-    else:
-        x0 = parse_latex_safe(point)
+    x0 = _limit_point(point)
 
     result = sympy.limit(expr, var, x0)
     return latex(result)
 
 
+@cached_operation("limit_infinity")
 def limit_at_infinity(latex_str: str, variable: str = "x") -> str:
     """
     计算表达式在无穷处的极限
@@ -302,6 +1147,7 @@ def limit_at_infinity(latex_str: str, variable: str = "x") -> str:
     return latex(result)
 
 
+@cached_operation("sum", expressions=("latex_str", "start", "end"))
 def compute_summation(latex_str: str, variable: str, start: str, end: str) -> str:
     """
     计算求和
@@ -320,11 +1166,13 @@ def compute_summation(latex_str: str, variable: str, start: str, end: str) -> st
 
     a = parse_latex_safe(start)
     b = parse_latex_safe(end)
+    check_parameters(bounds=(a, b))
 
     result = sympy.summation(expr, (var, a, b))
     return latex(result)
 
 
+@cached_operation("product", expressions=("latex_str", "start", "end"))
 def compute_product(latex_str: str, variable: str, start: str, end: str) -> str:
     """
     计算求积
@@ -343,11 +1191,13 @@ def compute_product(latex_str: str, variable: str, start: str, end: str) -> str:
 
     a = parse_latex_safe(start)
     b = parse_latex_safe(end)
+    check_parameters(bounds=(a, b))
 
     result = sympy.product(expr, (var, a, b))
     return latex(result)
 
 
+@cached_operation("taylor")
 def taylor_series(latex_str: str, variable: str = "x", point: str = "0", order: int = 10) -> str:
     """
     计算 Taylor 级数展开
@@ -361,6 +1211,7 @@ def taylor_series(latex_str: str, variable: str = "x", point: str = "0", order:
     Returns:
         Taylor 级数的 LaTeX 表达式
     """
+    check_parameters(order=order)
     expr = parse_latex_safe(latex_str)
     var = Symbol(variable)
 
@@ -373,6 +1224,7 @@ def taylor_series(latex_str: str, variable: str = "x", point: str = "0", order:
     return latex(result)
 
 
+@cached_operation("double_integral", expressions=("latex_str", "limits"))
 def compute_double_integral(latex_str: str, variables: list, limits: list) -> str:
     """
     计算二重积分
@@ -400,6 +1252,7 @@ def compute_double_integral(latex_str: str, variables: list, limits: list) -> st
     return latex(result)
 
 
+@cached_operation("triple_integral", expressions=("latex_str", "limits"))
 def compute_triple_integral(latex_str: str, variables: list, limits: list) -> str:
     """
     计算三重积分
@@ -425,3 +1278,163 @@ def compute_triple_integral(latex_str: str, variables: list, limits: list) -> st
 
     result = sympy.integrate(expr, *integration_vars)
     return latex(result)
+
+
+# ==================== 运算流水线 ====================
+
+# 流水线步骤名 -> (表达式, 变量) -> 表达式
+PIPELINE_STEPS = {
+    "expand": lambda expr, var: sympy.expand(expr),
+    "factor": lambda expr, var: sympy.factor(expr),
+    "simplify": lambda expr, var: sympy.simplify(expr),
+    "cancel": lambda expr, var: sympy.cancel(expr),
+    "together": lambda expr, var: sympy.together(expr),
+    "apart": lambda expr, var: sympy.apart(expr, var),
+    "collect": lambda expr, var: sympy.collect(sympy.expand(expr), var),
+    "differentiate": lambda expr, var: sympy.diff(expr, var),
+    "integrate": lambda expr, var: sympy.integrate(expr, var),
+}
+
+
+@cached_operation("pipeline")
+def run_pipeline(latex_str: str, steps: list) -> dict:
+    """
+    在同一次调用中对表达式依次执行多个运算
+
+    中间结果以 SymPy 对象在各步骤间传递，只有最终结果与标记了 output 的步骤
+    才输出为 LaTeX，省去每一步的 latex() 打印与重新解析。
+
+    Args:
+        latex_str: LaTeX 格式的表达式
+        steps: 步骤列表，每项为 (步骤名, 变量, 是否输出中间结果)，步骤名见 PIPELINE_STEPS
+
+    Returns:
+        {"result": 最终结果的 LaTeX,
+         "steps": [{"index": 步骤序号, "op": 步骤名, "result": 该步结果的 LaTeX}, ...]}
+    """
+    expr = parse_latex_safe(latex_str)
+    outputs = []
+    for index, (op, variable, output) in enumerate(steps):
+        if op not in PIPELINE_STEPS:
+            raise ValueError(f"未知的流水线步骤: {op}")
+        try:
+            expr = PIPELINE_STEPS[op](expr, Symbol(variable))
+        except (sympy.PolynomialError, NotImplementedError) as e:
+            raise ValueError(f"第 {index + 1} 步 {op} 无法执行: {str(e)}")
+        if output:
+            outputs.append({"index": index, "op": op, "result": latex(expr)})
+    return {"result": latex(expr), "steps": outputs}
+
+
+# ==================== 渐进式结果 ====================
+# 以下生成器依次产出 {"stage": 阶段名, "result": LaTeX, "final": 是否为最终结果}：
+# 先给出廉价的临时结果（数值、部分化简、最便宜的积分策略），最后一项为与对应
+# REST 端点相同的最终结果（共享结果缓存，已缓存时直接作为唯一一项返回）。
+
+def _stage(stage: str, result, final: bool = False) -> dict:
+    return {"stage": stage, "result": result if isinstance(result, str) else latex(result), "final": final}
+
+
+def _numeric_value(value) -> Optional[sympy.Float]:
+    """A finite real or complex number rounded for display, else None."""
+    if not isinstance(value, sympy.Expr) or not value.is_number or value.has(sympy.Integral):
+        return None
+    value = sympy.N(value, 10)
+    if not value.is_finite or value.has(sympy.nan, sympy.zoo):
+        return None
+    return value
+
+
+def _manual_integral(expr, *limits):
+    """Result of the cheap manual integration strategy, None if it gives up."""
+    try:
+        result = sympy.integrate(expr, *limits, manual=True)
+    except Exception:
+        return None
+    return None if result.has(sympy.Integral) else result
+
+
+def integrate_progressive(latex_str: str, variable: str = "x") -> Iterator[dict]:
+    """不定积分：先给出手工积分策略的结果，再给出完整 integrate() 的结果"""
+    found, cached = integrate_indefinite.peek(latex_str, variable)
+    if found:
+        yield _stage("cached", cached, final=True)
+        return
+    expr = parse_latex_safe(latex_str)
+    manual = _manual_integral(expr, Symbol(variable))
+    if manual is not None:
+        yield _stage("manual", manual)
+    yield _stage("integrate", integrate_indefinite(latex_str, variable), final=True)
+
+
+def integrate_definite_progressive(latex_str: str, variable: str, lower: str, upper: str) -> Iterator[dict]:
+    """定积分：先给出数值积分，再给出手工积分策略与完整 integrate() 的精确结果"""
+    found, cached = integrate_definite.peek(latex_str, variable, lower, upper)
+    if found:
+        yield _stage("cached", cached, final=True)
+        return
+    expr = parse_latex_safe(latex_str)
+    limits = (Symbol(variable), parse_latex_safe(lower), parse_latex_safe(upper))
+    try:
+        numeric = _numeric_value(sympy.Integral(expr, limits).evalf(15))
+    except Exception:
+        numeric = None
+    if numeric is not None:
+        yield _stage("numeric", numeric)
+    manual = _manual_integral(expr, limits)
+    if manual is not None:
+        yield _stage("manual", manual)
+    yield _stage("integrate", integrate_definite(latex_str, variable, lower, upper), final=True)
+
+
+# 数值估计极限时的取样偏移（有限点两侧）与取样点（无穷远），以及两侧取值的一致性容差
+_LIMIT_OFFSET = sympy.Float("1e-8", 30)
+_LIMIT_FAR = (sympy.Float("1e6", 30), sympy.Float("1e8", 30))
+_LIMIT_RTOL = 1e-4
+
+
+def _numeric_limit(expr, var, x0) -> Optional[sympy.Float]:
+    """Estimate a limit from nearby samples; None unless the samples agree."""
+    if expr.free_symbols - {var} or not x0.is_number:
+        return None
+    if x0.is_infinite:
+        samples = [sign * far for far in _LIMIT_FAR for sign in ([1] if x0 > 0 else [-1])]
+    else:
+        samples = [x0 - _LIMIT_OFFSET, x0 + _LIMIT_OFFSET]
+    try:
+        values = [sympy.N(expr.subs(var, sample), 30) for sample in samples]
+    except Exception:
+        return None
+    if not all(v.is_number and v.is_finite for v in values):
+        return None
+    a, b = (complex(v) for v in values)
+    if abs(a - b) > _LIMIT_RTOL * (1 + abs(a) + abs(b)):
+        return None
+    return _numeric_value((values[0] + values[1]) / 2)
+
+
+def limit_progressive(latex_str: str, variable: str, point: str) -> Iterator[dict]:
+    """极限：先给出趋近点附近取样的数值估计，再给出 limit() 的精确结果"""
+    found, cached = compute_limit.peek(latex_str, variable, point)
+    if found:
+        yield _stage("cached", cached, final=True)
+        return
+    expr = parse_latex_safe(latex_str)
+    estimate = _numeric_limit(expr, Symbol(variable), _limit_point(point))
+    if estimate is not None:
+        yield _stage("numeric", estimate)
+    yield _stage("limit", compute_limit(latex_str, variable, point), final=True)
+
+
+def simplify_progressive(latex_str: str) -> Iterator[dict]:
+    """化简：先给出有理式约分（together + cancel）的部分化简，再给出 simplify() 的结果"""
+    found, cached = simplify_expression.peek(latex_str)
+    if found:
+        yield _stage("cached", cached, final=True)
+        return
+    expr = parse_latex_safe(latex_str)
+    try:
+        yield _stage("cancel", sympy.cancel(sympy.together(expr)))
+    except Exception:
+        pass
+    yield _stage("simplify", simplify_expression(latex_str), final=True)
@@ -1,21 +1,18 @@
 """
 向量微积分模块
 
-使用 SymPy 的向量模块实现梯度、散度、旋度和拉普拉斯算子
+梯度、散度、旋度和拉普拉斯算子按分量逐个求偏导实现；
+sympy.vector 只在需要坐标系对象时才导入，不拖慢模块加载
 """
 import sympy
-from sympy.parsing.latex import parse_latex
 from sympy import latex, Symbol
-from sympy.vector import CoordSys3D, gradient, divergence, curl, laplacian
-from typing import Optional, List
+from typing import TYPE_CHECKING, List
 
+if TYPE_CHECKING:
+    from sympy.vector import CoordSys3D
 
-def parse_latex_safe(latex_str: str) -> Optional[sympy.Expr]:
-    """安全地解析 LaTeX 表达式"""
-    try:
-        return parse_latex(latex_str)
-    except Exception as e:
-        raise ValueError(f"无法解析 LaTeX: {str(e)}")
+# 与其他服务模块共用规范化与解析缓存
+from .sympy_service import cached_operation, parse_latex_safe
 
 
 def _create_coordinate_system(variables: List[str] = None):
@@ -28,6 +25,8 @@ def _create_coordinate_system(variables: List[str] = None):
     Returns:
         CoordSys3D 坐标系对象
     """
+    from sympy.vector import CoordSys3D
+
     if variables is None:
         variables = ["x", "y", "z"]
 
@@ -37,7 +36,7 @@ def _create_coordinate_system(variables: List[str] = None):
     return coord_sys, variables
 
 
-def _expr_to_vector_field(expr_str: str, variables: List[str], coord_sys: CoordSys3D):
+def _expr_to_vector_field(expr_str: str, variables: List[str], coord_sys: "CoordSys3D"):
     """
     将表达式字符串转换为 SymPy 向量场
 
@@ -62,6 +61,7 @@ def _expr_to_vector_field(expr_str: str, variables: List[str], coord_sys: CoordS
     return expr_str, var_map
 
 
+@cached_operation("gradient")
 def compute_gradient(latex_str: str, variables: List[str] = None) -> str:
     """
     计算标量场的梯度
@@ -93,6 +93,7 @@ def compute_gradient(latex_str: str, variables: List[str] = None) -> str:
     return result
 
 
+@cached_operation("divergence", expressions=("components",))
 def compute_divergence(components: List[str], variables: List[str] = None) -> str:
     """
     计算向量场的散度
@@ -121,6 +122,7 @@ def compute_divergence(components: List[str], variables: List[str] = None) -> st
     return latex(result)
 
 
+@cached_operation("curl", expressions=("components",))
 def compute_curl(components: List[str], variables: List[str] = None) -> str:
     """
     计算向量场的旋度
@@ -157,6 +159,7 @@ def compute_curl(components: List[str], variables: List[str] = None) -> str:
     return result
 
 
+@cached_operation("laplacian")
 def compute_laplacian(latex_str: str, variables: List[str] = None) -> str:
     """
     计算标量场的拉普拉斯算子
@@ -0,0 +1,203 @@
+"""
+NDJSON streaming of operation jobs.
+
+A job is one JSON object: ``op`` names a registered operation, ``id`` is an
+optional client tag and the remaining fields are the arguments of the
+matching endpoint. execute_job() runs one job; the WebSocket channel uses
+it too.
+
+Jobs are read line by line from the request body while results are already
+being written, one JSON object per line. At most ``window`` jobs are in
+flight: the next line is only read once a slot is free, so a body with
+100k+ jobs is never held in memory and a slow server pushes back on the
+client through the transport.
+"""
+import asyncio
+import json
+from collections import deque
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, Optional, Tuple, Union
+
+from pydantic import ValidationError
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+from .executor import OperationTimeoutError, run_operation
+from .expressions import prefetch_expressions
+from .models import BatchItemResult, StreamItemResult
+from .operations import prepare_call
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Streaming response that leaves ``receive`` to the handler.
+
+    StreamingResponse normally listens for a disconnect on ``receive`` while
+    streaming, which would swallow the request body chunks the job reader is
+    still consuming. A disconnect is seen by that reader instead and simply
+    ends the response.
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        except ClientDisconnect:
+            return
+        if self.background is not None:
+            await self.background()
+
+
+async def ndjson_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Optional[bytes]]:
+    """
+    Split a byte stream into non-empty lines.
+
+    A line longer than ``max_line_bytes`` is skipped and yields None in its
+    place, so the caller can report it without buffering it.
+    """
+    buffer = b""
+    skipping = False
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if skipping:
+                # Tail of an oversized line
+                skipping = False
+                yield None
+            elif len(line) > max_line_bytes:
+                # Oversized line that started and ended inside one chunk
+                yield None
+            elif line.strip():
+                yield line
+        if len(buffer) > max_line_bytes:
+            buffer = b""
+            skipping = True
+    if skipping:
+        yield None
+    elif buffer.strip():
+        yield buffer
+
+
+async def execute_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate and run one decoded job ({"op": ..., **arguments}).
+
+    Returns:
+        The BatchItemResult fields as a dict; failures are reported with the
+        status code the matching REST route would return
+    """
+    await prefetch_expressions(job)
+    try:
+        operation, func, args = prepare_call(str(job.pop("op", "")), job)
+    except ValidationError as e:
+        return BatchItemResult(ok=False, status=422, error=str(e)).model_dump()
+    except ValueError as e:
+        return BatchItemResult(ok=False, status=400, error=str(e)).model_dump()
+
+    try:
+        result = await run_operation(operation.name, func, *args)
+        item = BatchItemResult(ok=True, status=200, result=operation.respond(result))
+    except OperationTimeoutError as e:
+        item = BatchItemResult(ok=False, status=504, error=str(e))
+    except ValueError as e:
+        item = BatchItemResult(ok=False, status=400, error=str(e))
+    except Exception as e:
+        item = BatchItemResult(ok=False, status=500, error=f"{type(e).__name__}: {e}")
+    return item.model_dump()
+
+
+def decode_job(line: Union[str, bytes]) -> Dict[str, Any]:
+    """
+    Decode one JSON job.
+
+    Raises:
+        ValueError: Not JSON, or not a JSON object
+    """
+    job = json.loads(line)
+    if not isinstance(job, dict):
+        raise ValueError("任务必须是 JSON 对象")
+    return job
+
+
+async def _run_job(index: int, line: Optional[bytes], max_line_bytes: int) -> Dict[str, Any]:
+    try:
+        if line is None:
+            raise ValueError(f"任务行超过 {max_line_bytes} 字节")
+        job = decode_job(line)
+    except ValueError as e:
+        return StreamItemResult(index=index, ok=False, status=400, error=str(e)).model_dump()
+    job_id = job.pop("id", None)
+    return StreamItemResult(index=index, id=job_id, **await execute_job(job)).model_dump()
+
+
+def _encode(item: Dict[str, Any]) -> bytes:
+    return json.dumps(item, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+async def run_jobs(jobs: AsyncIterator[Tuple[int, Optional[bytes]]], ordered: bool, window: int,
+                   max_line_bytes: int) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run numbered NDJSON job lines with at most ``window`` of them in flight.
+
+    Args:
+        jobs: (index, line) pairs; a None line stands for an oversized one
+        ordered: Emit results in input order (otherwise as soon as each finishes)
+        window: Maximum number of jobs in flight
+        max_line_bytes: Longest accepted job line (for the error message)
+
+    Yields:
+        One StreamItemResult dict per job
+    """
+    in_flight: "deque[asyncio.Task]" = deque()
+
+    async def next_done() -> Dict[str, Any]:
+        if ordered:
+            item = await in_flight[0]
+            in_flight.popleft()
+            return item
+        done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+        task = next(iter(done))
+        in_flight.remove(task)
+        return task.result()
+
+    try:
+        async for index, line in jobs:
+            while len(in_flight) >= window:
+                yield await next_done()
+            in_flight.append(asyncio.create_task(_run_job(index, line, max_line_bytes)))
+        while in_flight:
+            yield await next_done()
+    finally:
+        # Consumer gone or input aborted: drop the jobs nobody will read
+        for task in in_flight:
+            task.cancel()
+
+
+async def _numbered(lines: AsyncIterator[Optional[bytes]]) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    index = 0
+    async for line in lines:
+        yield index, line
+        index += 1
+
+
+async def stream_jobs(chunks: AsyncIterator[bytes], ordered: bool, window: int,
+                      max_line_bytes: int) -> AsyncIterator[bytes]:
+    """
+    Run the NDJSON jobs of ``chunks`` and yield one NDJSON result per job.
+
+    Args:
+        chunks: Request body stream
+        ordered: Emit results in job order (otherwise as soon as each finishes)
+        window: Maximum number of jobs in flight
+        max_line_bytes: Longest accepted job line
+
+    Yields:
+        Encoded result lines carrying the job's ``index`` (0-based line number
+        among non-empty lines) and its ``id`` when one was given
+    """
+    jobs = _numbered(ndjson_lines(chunks, max_line_bytes))
+    async with aclosing(run_jobs(jobs, ordered, window, max_line_bytes)) as results:
+        async for item in results:
+            yield _encode(item)
@@ -0,0 +1,113 @@
+"""
+Cost and cache-key quality of LaTeX normalization.
+
+    cd backend && python -m benchmarks.normalize [--repeat N]
+
+The corpus is the parser benchmark's expressions written the ways clients
+send them (\\cdot or * or \\times, x^{2} or x^2, \\left( or (, with and without
+spaces). Reported per input:
+
+- the time of the former multi-pass normalize_latex (kept below as
+  ``legacy_normalize``) and of the single scan producing both the
+  normalized string and the canonical tokens;
+- how many distinct parse-cache keys the corpus produces with the
+  normalized string as key and with the token stream as key, and the
+  ANTLR time to fill a cold parse cache for the corpus either way (one
+  parse per key).
+"""
+import argparse
+import itertools
+import re
+import time
+from typing import Callable, List
+
+from app.services.sympy_service import _latex_parser, _scan_latex
+
+from .parser_backends import CORPUS
+
+# 客户端常见的等价写法（按顺序依次替换）
+SPELLINGS = [
+    [("*", "*"), ("*", r" \cdot "), ("*", r" \times ")],
+    [("^2", "^2"), ("^2", "^{2}")],
+    [("(", "("), ("(", r"\left(")],
+    [(")", ")"), (")", r"\right)")],
+    [(" ", " "), (" ", ""), (" ", "  ")],
+]
+
+BASES = CORPUS + [
+    "2 * (x + 1)^2",
+    "3x^2 * y - x * y^2",
+    r"\sin(x)^2 * \cos(x)",
+    "(x^2 + 1) * (x - 1)",
+    r"\frac{(x + 1)^2}{x * (x - 1)}",
+]
+
+
+def legacy_normalize(latex_str: str) -> str:
+    """normalize_latex before the single-pass scanner (reference for timing)."""
+    if not latex_str:
+        return latex_str
+    normalized = latex_str
+    normalized = normalized.replace(r'\times', '*')
+    normalized = normalized.replace(r'\cdot', '*')
+    normalized = normalized.replace(r'\left(', '(')
+    normalized = normalized.replace(r'\right)', ')')
+    normalized = normalized.replace(r'\left[', '[')
+    normalized = normalized.replace(r'\right]', ']')
+    normalized = normalized.replace(r'\left\{', '{')
+    normalized = normalized.replace(r'\right\}', '}')
+    normalized = normalized.replace(r'\div', '/')
+    normalized = re.sub(r'\s*\*\s*', '*', normalized)
+    normalized = re.sub(r'\s*/\s*', '/', normalized)
+    return normalized
+
+
+def variants(base: str) -> List[str]:
+    """Equivalent spellings of ``base``."""
+    result = set()
+    for choice in itertools.product(*SPELLINGS):
+        text = base
+        for old, new in choice:
+            text = text.replace(old, new)
+        result.add(text)
+    return sorted(result)
+
+
+def per_call_us(func: Callable[[str], object], inputs: List[str], repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for s in inputs:
+            func(s)
+    return (time.perf_counter() - started) / (repeat * len(inputs)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50, help="passes over the corpus")
+    args = parser.parse_args()
+
+    inputs = [v for base in BASES for v in variants(base)]
+    scan = _scan_latex.__wrapped__
+    print(f"{len(BASES)} expressions, {len(inputs)} spellings x {args.repeat} passes")
+
+    print(f"{'':<26} {'per input (us)':>15}")
+    print(f"{'legacy normalize':<26} {per_call_us(legacy_normalize, inputs, args.repeat):>15.2f}")
+    print(f"{'scan (string + tokens)':<26} {per_call_us(scan, inputs, args.repeat):>15.2f}")
+    print(f"{'scan, memoized':<26} {per_call_us(_scan_latex, inputs, args.repeat):>15.2f}")
+
+    by_string = {scan(s)[0]: s for s in inputs}
+    by_tokens = {scan(s)[1]: s for s in inputs}
+    parse = _latex_parser("antlr")
+    print(f"{'parse-cache key':<26} {'keys':>6} {'cold fill (s)':>14}")
+    for label, keys in (("normalized string", by_string), ("tokens", by_tokens)):
+        started = time.perf_counter()
+        for s in keys.values():
+            try:
+                parse(scan(s)[0])
+            except Exception:
+                pass
+        print(f"{label:<26} {len(keys):>6} {time.perf_counter() - started:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Throughput of the LaTeX parser backends.
+
+    cd backend && python -m benchmarks.parser_backends [--repeat N]
+
+Each available backend parses the same corpus of normalized expressions,
+bypassing the parse cache. The first parse (grammar loading) is reported
+separately from the steady-state rate; expressions a backend cannot parse
+are counted as errors and left out of its timing.
+"""
+import argparse
+import time
+from typing import Dict, List
+
+from app.services.sympy_service import _latex_parser, available_parser_backends, normalize_latex
+
+CORPUS = [
+    "x^2 + 2x + 1",
+    "x^2 - 4",
+    "3x + 6",
+    r"\frac{x^2 - 1}{x + 1}",
+    r"\frac{1}{x} + \frac{1}{x + 1}",
+    r"\sqrt{x^2 + 1}",
+    r"\sin(x) \cdot \cos(x)",
+    r"\sin^{2}(x) + \cos^{2}(x)",
+    r"e^{2x} \ln(x)",
+    r"\frac{\sin(x)}{x}",
+    "(x + 1)^3 (x - 2)^2",
+    "2x + 3 = 7",
+    "x^2 - 5x + 6 = 0",
+    r"x^5 - 3x^4 + 2x^3 - x^2 + 7x - 11",
+    r"\frac{x^3 + 2x^2 - x + 4}{x^2 - 3x + 2} + \sqrt{\frac{x + 1}{x - 1}}",
+    r"\int x^2 dx",
+    r"a_1 x + a_2 y + a_3 z",
+    r"|x - 1| + |x + 1|",
+]
+
+
+def benchmark(backend: str, corpus: List[str], repeat: int) -> Dict[str, float]:
+    parse = _latex_parser(backend)
+    inputs = [normalize_latex(s) for s in corpus]
+
+    started = time.perf_counter()
+    parse(inputs[0])
+    first = time.perf_counter() - started
+
+    parsable = []
+    for s in inputs:
+        try:
+            parse(s)
+            parsable.append(s)
+        except Exception:
+            continue
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for s in parsable:
+            parse(s)
+    elapsed = time.perf_counter() - started
+    count = repeat * len(parsable)
+    return {
+        "first_ms": first * 1000,
+        "per_parse_ms": elapsed / count * 1000 if count else float("nan"),
+        "parses_per_s": count / elapsed if elapsed else float("nan"),
+        "errors": len(inputs) - len(parsable),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the corpus per backend")
+    args = parser.parse_args()
+
+    print(f"{len(CORPUS)} expressions x {args.repeat} passes")
+    print(f"{'backend':<8} {'first (ms)':>11} {'per parse (ms)':>15} {'parses/s':>10} {'errors':>7}")
+    for backend in available_parser_backends():
+        r = benchmark(backend, CORPUS, args.repeat)
+        print(f"{backend:<8} {r['first_ms']:>11.1f} {r['per_parse_ms']:>15.2f} "
+              f"{r['parses_per_s']:>10.1f} {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,10 @@
+import os
+
 import pytest
+
+# Keep the computation pool small and deterministic under test
+os.environ.setdefault("MATHFLOW_WORKERS", "2")
+
 from fastapi.testclient import TestClient
 from app.main import app
 
@@ -0,0 +1,127 @@
+"""
+Tests for the heterogeneous batch endpoint (POST /api/batch).
+"""
+
+import asyncio
+import time
+
+from app.config import OPERATIONS as CONFIGURED_OPERATIONS, settings
+from app.executor import run_grouped
+from app.operations import OPERATIONS, run_calls
+from app.services import sympy_service
+from app.services.sympy_service import differentiate_expr, factor_expression, verify_equivalence
+
+
+def _slow_factor(latex, seconds):
+    time.sleep(seconds)
+    return factor_expression(latex)
+
+
+class TestBatchEndpoint:
+    """Results come back in order with a separate status per item."""
+
+    def test_mixed_operations_in_order(self, client):
+        response = client.post("/api/batch", json={"operations": [
+            {"op": "factor", "latex": "x^2 - 4"},
+            {"op": "differentiate", "latex": "x^3", "variable": "x"},
+            {"op": "sum", "latex": "i", "variable": "i", "start": "1", "end": "10"},
+            {"op": "solve_equation", "latex": "2x + 3 = 7"},
+            {"op": "verify", "input_latex": "(x+1)^2", "output_latex": "x^2 + 2x + 1"},
+        ]})
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["ok"] for r in results] == [True] * 5
+        assert verify_equivalence(results[0]["result"]["result"], "(x-2)(x+2)")
+        assert verify_equivalence(results[1]["result"]["result"], "3x^2")
+        assert results[2]["result"]["result"] == "55"
+        assert "steps" in results[3]["result"]
+        assert results[4]["result"]["is_equivalent"] is True
+
+    def test_errors_are_per_item(self, client):
+        response = client.post("/api/batch", json={"operations": [
+            {"op": "factor", "latex": "\\frac{"},
+            {"op": "no_such_op", "latex": "x"},
+            {"op": "limit", "latex": "x"},
+            {"op": "expand", "latex": "(x+1)^2"},
+        ]})
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["status"] for r in results] == [400, 400, 422, 200]
+        assert results[1]["error"]
+        assert results[3]["ok"] is True
+
+    def test_parameter_errors_are_per_item(self, client, monkeypatch):
+        items = [
+            {"op": "sum", "latex": "i", "variable": "i", "start": "1", "end": "10^{999}"},
+            {"op": "product", "latex": "i", "variable": "i", "start": "1", "end": "5"},
+            {"op": "factor", "latex": "x^2 - 4"},
+        ]
+        response = client.post("/api/batch", json={"operations": items})
+        assert response.status_code == 200
+        assert [r["status"] for r in response.json()["results"]] == [400, 200, 200]
+
+        def check_call(operation, args):
+            if operation == "product":
+                raise OverflowError("int too large to convert to float")
+
+        monkeypatch.setattr("app.executor.check_call", check_call)
+        response = client.post("/api/batch", json={"operations": items[1:]})
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["status"] for r in results] == [500, 200]
+        assert "OverflowError" in results[0]["error"]
+
+    def test_item_limit(self, client, monkeypatch):
+        monkeypatch.setattr(settings, "batch_max_items", 2)
+        response = client.post("/api/batch", json={"operations": [
+            {"op": "factor", "latex": "x"},
+        ] * 3})
+        assert response.status_code == 400
+
+    def test_empty_batch(self, client):
+        response = client.post("/api/batch", json={"operations": []})
+        assert response.status_code == 200
+        assert response.json()["results"] == []
+
+
+class TestGroupedExecution:
+    """Repeated expressions are grouped into one chunk and parsed once."""
+
+    def test_run_calls_shares_parse(self):
+        latex = "x^5 + 11x^4 - 3x + 97"
+        before = sympy_service._parse_cache.misses
+        outcomes = run_calls([
+            ("factor", factor_expression, (latex,)),
+            ("differentiate", differentiate_expr, (latex, "x")),
+        ])
+        assert [status for status, _ in outcomes] == ["ok", "ok"]
+        assert sympy_service._parse_cache.misses - before == 1
+
+    def test_repeated_expressions_in_same_chunk(self):
+        calls = [
+            ("factor", factor_expression, ("x^2 + 9x + 14",)),
+            ("differentiate", differentiate_expr, ("x^{2} + 9x + 14", "x")),
+            ("factor", factor_expression, ("x^2 - 16",)),
+        ]
+        outcomes = asyncio.run(run_grouped(calls))
+        assert [status for status, _ in outcomes] == ["ok", "ok", "ok"]
+        assert outcomes[0][1] == factor_expression("x^2 + 9x + 14")
+
+    def test_registry_covers_configured_operations(self):
+        assert set(OPERATIONS) == set(CONFIGURED_OPERATIONS)
+
+    def test_budget_is_per_item(self, monkeypatch):
+        monkeypatch.setitem(settings.timeouts, "sleep", 0.5)
+        latex = "x^2 + 9x + 14"
+        calls = [
+            ("factor", factor_expression, (latex,)),
+            ("sleep", _slow_factor, (latex, 30)),
+            ("differentiate", differentiate_expr, (latex, "x")),
+        ]
+        started = time.monotonic()
+        outcomes = asyncio.run(run_grouped(calls))
+        assert time.monotonic() - started < 10
+        # 超时只影响该项，之前与之后的结果都保留
+        assert [status for status, _ in outcomes] == ["ok", "timeout", "ok"]
+        assert "sleep" in outcomes[1][1]
+        assert outcomes[0][1] == factor_expression(latex)
@@ -0,0 +1,86 @@
+"""
+Tests for the offline batch runner (python -m app.batch).
+"""
+
+import asyncio
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from app.batch import completed_indices, main, run_batch
+from app.services.sympy_service import verify_equivalence
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _write_jobs(path, jobs):
+    path.write_text("".join(json.dumps(job) + "\n" for job in jobs))
+
+
+def _read_results(path):
+    return {item["index"]: item for item in map(json.loads, path.read_text().splitlines())}
+
+
+JOBS = [
+    {"id": "f", "op": "factor", "latex": "x^2 - 4"},
+    {"id": "d", "op": "differentiate", "latex": "x^3", "variable": "x"},
+    {"id": "bad", "op": "no_such_op"},
+    {"id": "s", "op": "solve_equation", "latex": "2x + 3 = 7"},
+]
+
+
+class TestRunBatch:
+
+    def test_writes_one_result_per_job(self, tmp_path):
+        jobs, out = tmp_path / "jobs.jsonl", tmp_path / "out.jsonl"
+        _write_jobs(jobs, JOBS)
+        counts = asyncio.run(run_batch(str(jobs), str(out)))
+        assert counts == {"skipped": 0, "ok": 3, "failed": 1}
+        results = _read_results(out)
+        assert sorted(results) == [0, 1, 2, 3]
+        assert [results[i]["id"] for i in range(4)] == ["f", "d", "bad", "s"]
+        assert verify_equivalence(results[0]["result"]["result"], "(x-2)(x+2)")
+        assert results[2]["status"] == 400
+
+    def test_resumes_from_checkpoint(self, tmp_path):
+        jobs, out = tmp_path / "jobs.jsonl", tmp_path / "out.jsonl"
+        _write_jobs(jobs, JOBS)
+        # An earlier run finished job 1 and was killed while writing job 3
+        out.write_text(json.dumps({"index": 1, "id": "d", "ok": True}) + "\n" + '{"index": 3, "i')
+        assert completed_indices(str(out)) == {1}
+        assert out.read_text().endswith("\n")
+
+        counts = asyncio.run(run_batch(str(jobs), str(out), ordered=True))
+        assert counts == {"skipped": 1, "ok": 2, "failed": 1}
+        lines = [json.loads(line) for line in out.read_text().splitlines()]
+        assert [item["index"] for item in lines] == [1, 0, 2, 3]
+
+        # Nothing left to do on a third run
+        counts = asyncio.run(run_batch(str(jobs), str(out)))
+        assert counts == {"skipped": 4, "ok": 0, "failed": 0}
+
+    def test_blank_lines_do_not_shift_indices(self, tmp_path):
+        jobs, out = tmp_path / "jobs.jsonl", tmp_path / "out.jsonl"
+        jobs.write_text('\n{"op": "expand", "latex": "(x+1)^2"}\n\n{"op": "expand", "latex": "(x+2)^2"}\n')
+        asyncio.run(run_batch(str(jobs), str(out)))
+        assert sorted(_read_results(out)) == [0, 1]
+
+
+class TestCommandLine:
+
+    def test_main_in_process(self, tmp_path):
+        jobs, out = tmp_path / "jobs.jsonl", tmp_path / "out.jsonl"
+        _write_jobs(jobs, JOBS[:2])
+        assert main([str(jobs), str(out), "--ordered"]) == 0
+        assert sorted(_read_results(out)) == [0, 1]
+
+    def test_module_entry_point(self, tmp_path):
+        jobs, out = tmp_path / "jobs.jsonl", tmp_path / "out.jsonl"
+        _write_jobs(jobs, JOBS[:1])
+        completed = subprocess.run(
+            [sys.executable, "-m", "app.batch", str(jobs), str(out), "--workers", "1"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, timeout=120,
+        )
+        assert completed.returncode == 0, completed.stderr
+        assert _read_results(out)[0]["ok"] is True
@@ -0,0 +1,237 @@
+"""
+Tests for the in-process caches (app/services/cache.py) and their use by
+the service modules.
+"""
+
+import pytest
+
+from app.services.cache import LRUCache, SQLiteStore, cache_stats
+from app.services import sympy_service, vector_calculus
+from app.services.sympy_service import (
+    compute_summation,
+    differentiate_expr,
+    parse_latex_safe,
+    simplify_expression,
+)
+from app.services.solve_service import solve_equation_with_steps
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache:
+    """Tests for LRUCache eviction, expiry and counters."""
+
+    def test_hit_and_miss_counters(self):
+        cache = LRUCache("test-counters", max_size=4)
+        assert cache.get("a") is None
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache("test-lru", max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_entries_expire_after_ttl(self):
+        clock = FakeClock()
+        cache = LRUCache("test-ttl", max_size=2, ttl=10, clock=clock)
+        cache.set("a", 1)
+        clock.now = 9
+        assert cache.get("a") == 1
+        clock.now = 11
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_byte_budget_evicts_oldest(self):
+        cache = LRUCache("test-bytes", max_size=100, max_bytes=10,
+                         sizeof=lambda key, value: len(value))
+        cache.set("a", "xxxx")
+        cache.set("b", "yyyy")
+        cache.set("c", "zzzz")
+        assert cache.get("a") is None
+        assert cache.get("b") == "yyyy"
+        assert cache.stats()["bytes"] == 8
+
+    def test_oversized_entry_not_stored(self):
+        cache = LRUCache("test-oversized", max_size=100, max_bytes=3,
+                         sizeof=lambda key, value: len(value))
+        cache.set("a", "xxxx")
+        assert len(cache) == 0
+
+    def test_zero_size_disables_cache(self):
+        cache = LRUCache("test-disabled", max_size=0)
+        cache.set("a", 1)
+        assert cache.get("a") is None
+
+    def test_registered_in_stats(self):
+        LRUCache("test-registry", max_size=1)
+        assert "test-registry" in cache_stats()
+
+
+class TestSQLiteStore:
+    """Tests for the persistent result store."""
+
+    def test_round_trip(self, tmp_path):
+        store = SQLiteStore("test-sqlite", str(tmp_path / "cache.db"), "v1")
+        assert store.get(("factor", "x")) is None
+        store.set(("factor", "x"), {"result": "x", "steps": [1, 2]})
+        assert store.get(("factor", "x")) == {"result": "x", "steps": [1, 2]}
+        assert store.stats()["hits"] == 1
+
+    def test_shared_between_instances(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        SQLiteStore("test-sqlite-a", path, "v1").set("key", "value")
+        assert SQLiteStore("test-sqlite-b", path, "v1").get("key") == "value"
+
+    def test_other_version_never_served(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        SQLiteStore("test-sqlite-old", path, "sympy-1.12/app-1.0").set("key", "stale")
+        assert SQLiteStore("test-sqlite-new", path, "sympy-1.13/app-2.0").get("key") is None
+
+    def test_uses_wal_mode(self, tmp_path):
+        store = SQLiteStore("test-sqlite-wal", str(tmp_path / "cache.db"), "v1")
+        store.set("key", 1)
+        assert store._connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_unwritable_path_is_ignored(self, tmp_path):
+        store = SQLiteStore("test-sqlite-bad", str(tmp_path / "missing" / "cache.db"), "v1")
+        store.set("key", 1)
+        assert store.get("key") is None
+        assert store.stats()["errors"] == 2
+
+    def test_row_limit_keeps_newest(self, tmp_path):
+        now = [0.0]
+        path = str(tmp_path / "cache.db")
+        store = SQLiteStore("test-sqlite-rows", path, "v1", max_rows=3, clock=lambda: now[0])
+        for i in range(10):
+            now[0] = float(i)
+            store.set(("key", i), i)
+        rows = store._connection().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        assert rows == 3
+        assert [store.get(("key", i)) for i in range(10)] == [None] * 7 + [7, 8, 9]
+        assert store.stats()["evictions"] == 7
+
+    def test_limit_covers_every_store_in_the_file(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        results = SQLiteStore("test-sqlite-results", path, "v1", max_rows=4)
+        handles = SQLiteStore("test-sqlite-handles", path, "v1", max_rows=4)
+        for i in range(5):
+            results.set(("result", i), i)
+            handles.set(("handle", i), i)
+        assert results._connection().execute("SELECT COUNT(*) FROM results").fetchone()[0] == 4
+
+    def test_expired_rows_are_not_served_and_pruned(self, tmp_path):
+        now = [0.0]
+        store = SQLiteStore("test-sqlite-ttl", str(tmp_path / "cache.db"), "v1",
+                            max_rows=1000, ttl=60, clock=lambda: now[0])
+        store.set("old", 1)
+        now[0] = 30.0
+        assert store.get("old") == 1
+        now[0] = 61.0
+        assert store.get("old") is None
+        for i in range(10):
+            store.set(("new", i), i)
+        assert store._connection().execute("SELECT COUNT(*) FROM results").fetchone()[0] == 10
+        assert store.get(("new", 9)) == 9
+
+
+class TestParseCache:
+    """parse_latex_safe caches by normalized LaTeX."""
+
+    def test_repeated_parse_hits_cache(self):
+        before = sympy_service._parse_cache.hits
+        first = parse_latex_safe("x^2 + 7x + 13")
+        second = parse_latex_safe("x^2 + 7x + 13")
+        assert first is second
+        assert sympy_service._parse_cache.hits == before + 1
+
+    def test_normalized_variants_share_entry(self):
+        first = parse_latex_safe(r"3 \cdot y + 11")
+        second = parse_latex_safe(r"3 * y + 11")
+        assert first is second
+
+    def test_vector_calculus_uses_shared_parser(self):
+        assert vector_calculus.parse_latex_safe is parse_latex_safe
+
+    def test_parse_errors_not_cached(self):
+        with pytest.raises(ValueError):
+            parse_latex_safe("\\frac{")
+        with pytest.raises(ValueError):
+            parse_latex_safe("\\frac{")
+
+
+class TestResultCache:
+    """Service functions cache results by operation, canonical input and parameters."""
+
+    def test_spelling_variants_share_result(self):
+        before = sympy_service._result_cache.hits
+        first = simplify_expression("x^2 + 2x + x + 17")
+        second = simplify_expression("x^{2} + 2 x + x + 17")
+        assert first == second
+        assert sympy_service._result_cache.hits == before + 1
+
+    def test_echoed_input_follows_the_request(self):
+        # 解析后 srepr 相同，但求解步骤回显的原方程不同
+        first = solve_equation_with_steps("2*x^2")
+        second = solve_equation_with_steps("x^2 \\cdot 2")
+        assert first["steps"][0] != second["steps"][0]
+        assert second == solve_equation_with_steps.__wrapped__("x^2 \\cdot 2")
+
+    def test_parameters_are_part_of_key(self):
+        assert differentiate_expr("x y^2", "x") != differentiate_expr("x y^2", "y")
+
+    def test_bounds_are_part_of_key(self):
+        assert compute_summation("i", "i", "1", "10") == "55"
+        assert compute_summation("i", "i", "1", "4") == "10"
+
+    def test_dict_results_are_copied(self):
+        first = solve_equation_with_steps("5x + 1 = 11")
+        first["steps"].clear()
+        second = solve_equation_with_steps("5x + 1 = 11")
+        assert second["steps"]
+
+    def test_persistent_store_survives_memory_cache(self, tmp_path, monkeypatch):
+        store = SQLiteStore("test-sqlite-service", str(tmp_path / "cache.db"), "v1")
+        monkeypatch.setattr(sympy_service, "_persistent_store", store)
+        result = simplify_expression("x^2 + 5x + x - 23")
+        assert store.stats()["writes"] == 1
+
+        sympy_service._result_cache.clear()
+        assert simplify_expression("x^2 + 5x + x - 23") == result
+        assert store.stats()["hits"] == 1
+
+    def test_invalid_input_still_raises(self):
+        with pytest.raises(ValueError):
+            simplify_expression("\\frac{")
+
+
+class TestStatsEndpoint:
+    """GET /api/stats reports cache counters from the workers."""
+
+    def test_stats_include_parse_cache(self, client):
+        workers = client.get("/api/stats").json()["workers"]
+        # One more request than workers guarantees a repeat on some worker
+        for _ in range(workers + 1):
+            client.post("/api/factor", json={"latex": "x^2 - 9"})
+        response = client.get("/api/stats")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["workers"] >= 1
+        parse = data["caches"]["parse"]
+        assert parse["hits"] + parse["misses"] >= 2
+        assert 0.0 <= parse["hit_rate"] <= 1.0
+        assert data["caches"]["result"]["hits"] >= 1
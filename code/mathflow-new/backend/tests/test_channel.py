@@ -0,0 +1,84 @@
+"""
+Tests for the multiplexed WebSocket channel (/ws).
+"""
+
+import time
+
+import pytest
+from pydantic import BaseModel
+
+from app import operations
+from app.config import settings
+from app.services.sympy_service import verify_equivalence
+
+
+class SleepRequest(BaseModel):
+    seconds: float
+
+
+@pytest.fixture
+def sleep_operation(monkeypatch):
+    """A registered operation whose duration the test controls."""
+    monkeypatch.setitem(operations.OPERATIONS, "sleep", operations.Operation(
+        "sleep", SleepRequest, lambda r: (time.sleep, (r.seconds,)), lambda _: {"slept": True},
+    ))
+
+
+class TestChannel:
+
+    def test_tagged_requests(self, client):
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"id": "f", "op": "factor", "latex": "x^2 - 4"})
+            ws.send_json({"id": 7, "op": "verify", "input_latex": "(x+1)^2", "output_latex": "x^2+2x+1"})
+            replies = {reply["id"]: reply for reply in (ws.receive_json(), ws.receive_json())}
+        assert replies["f"]["index"] == 0 and replies[7]["index"] == 1
+        assert verify_equivalence(replies["f"]["result"]["result"], "(x-2)(x+2)")
+        assert replies[7]["result"]["is_equivalent"] is True
+
+    def test_responses_in_completion_order(self, client, sleep_operation):
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"id": "slow", "op": "sleep", "seconds": 0.8})
+            ws.send_json({"id": "fast", "op": "expand", "latex": "(x+1)^2"})
+            assert ws.receive_json()["id"] == "fast"
+            slow = ws.receive_json()
+        assert slow["id"] == "slow" and slow["result"] == {"slept": True}
+
+    def test_cancel_by_tag(self, client, sleep_operation):
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"id": "long", "op": "sleep", "seconds": 2})
+            ws.send_json({"op": "cancel", "id": "long"})
+            cancelled = ws.receive_json()
+            assert (cancelled["id"], cancelled["index"], cancelled["status"]) == ("long", 0, 499)
+            # The tag is free again and the channel keeps working
+            ws.send_json({"id": "long", "op": "expand", "latex": "(x+2)^2"})
+            reply = ws.receive_json()
+        assert reply["id"] == "long" and reply["ok"] is True
+
+    def test_cancel_unknown_tag(self, client):
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"op": "cancel", "id": "nothing"})
+            assert ws.receive_json()["status"] == 404
+
+    def test_duplicate_tag_in_flight(self, client, sleep_operation):
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"id": "x", "op": "sleep", "seconds": 0.5})
+            ws.send_json({"id": "x", "op": "expand", "latex": "x"})
+            first = ws.receive_json()
+            assert (first["index"], first["status"]) == (1, 409)
+            assert ws.receive_json()["status"] == 200
+
+    def test_in_flight_limit(self, client, sleep_operation, monkeypatch):
+        monkeypatch.setattr(settings, "stream_window", 1)
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"id": 1, "op": "sleep", "seconds": 0.5})
+            ws.send_json({"id": 2, "op": "expand", "latex": "x"})
+            assert ws.receive_json()["status"] == 429
+            assert ws.receive_json()["id"] == 1
+
+    def test_invalid_messages(self, client):
+        with client.websocket_connect("/ws") as ws:
+            ws.send_text("not json")
+            ws.send_json({"id": "u", "op": "no_such_op"})
+            ws.send_json({"id": "v", "op": "factor"})
+            statuses = sorted(ws.receive_json()["status"] for _ in range(3))
+        assert statuses == [400, 400, 422]
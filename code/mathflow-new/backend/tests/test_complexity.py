@@ -0,0 +1,253 @@
+"""
+Tests for the static complexity guard (app/services/complexity.py): the
+measures, per-operation limits, and rejection by every kind of endpoint.
+"""
+
+import pickle
+
+import pytest
+import sympy
+
+from app.config import Settings, _env_limits, settings
+from app.operations import check_call
+from app.services.complexity import (
+    ExpressionTooComplexError,
+    check_complexity,
+    check_parameters,
+    current_operation,
+    measure,
+    range_size,
+    use_operation,
+)
+from app.services.polynomial import parse_polynomial, parse_polynomial_equation
+from app.services.sympy_service import expand_expression, parse_latex_safe
+
+x, y, z = sympy.symbols("x y z")
+
+
+class TestMeasure:
+    """Tests for measure()."""
+
+    def test_small_expression(self):
+        m = measure(x ** 2 + 1)
+        assert (m.nodes, m.depth, m.exponent, m.terms, m.digits) == (5, 3, 2, 2, 1)
+
+    def test_expanded_terms_of_a_power(self):
+        m = measure(sympy.Pow(x + 1, 100000, evaluate=False))
+        assert m.exponent == 100000
+        assert round(m.terms) == 100001
+        # 二项式系数 C(100000, 50000) 约有 30100 位
+        assert 30000 < m.digits < 30200
+
+    def test_multinomial_terms(self):
+        assert round(measure((x + y + z) ** 60).terms) == 1891
+
+    def test_products_multiply_terms(self):
+        assert measure(sympy.Mul(x + 1, y + 1, z + 1, evaluate=False)).terms == 8
+
+    def test_function_arguments_are_measured(self):
+        assert round(measure(sympy.sin((x + 1) ** 5000)).terms) == 5001
+
+    def test_numeric_literals(self):
+        assert measure(sympy.Integer(10) ** 40).digits == 41
+        assert measure(sympy.Pow(2, 100000, evaluate=False)).digits == 30103
+
+    def test_numeric_exponent_is_bounded_by_its_value(self):
+        nested = sympy.Pow(2, sympy.Pow(2, 20, evaluate=False), evaluate=False)
+        assert measure(nested).exponent >= 2 ** 20
+
+    def test_symbolic_exponent_is_not_a_power(self):
+        assert measure(x ** y).exponent == 0
+
+    def test_deep_tree_without_recursion(self):
+        expr = x
+        for i in range(5000):
+            expr = sympy.Add(expr, sympy.Symbol(f"a{i}"), evaluate=False)
+        assert measure(expr).depth == 5001
+
+
+class TestLimits:
+    """Tests for check_complexity() and the per-operation settings."""
+
+    def test_within_limits(self):
+        assert check_complexity(x ** 2 + 1).nodes == 5
+
+    def test_rejects_with_clear_message(self):
+        with pytest.raises(ExpressionTooComplexError, match="幂次约为 100000，超过 expand 运算的上限 1000"):
+            check_complexity(sympy.Pow(x + 1, 100000, evaluate=False), "expand")
+        with pytest.raises(ExpressionTooComplexError, match="展开后的项数约为 5151"):
+            check_complexity((x + y + 1) ** 100)
+
+    def test_is_a_picklable_value_error(self):
+        error = pickle.loads(pickle.dumps(ExpressionTooComplexError("表达式过于复杂")))
+        assert isinstance(error, ValueError)
+        assert str(error) == "表达式过于复杂"
+
+    def test_operation_override(self, monkeypatch):
+        monkeypatch.setitem(settings.operation_limits, "expand", {"exponent": 10})
+        expr = (x + 1) ** 20
+        with pytest.raises(ExpressionTooComplexError, match="expand"):
+            check_complexity(expr, "expand")
+        check_complexity(expr, "factor")
+
+    def test_solving_has_a_lower_exponent_limit(self):
+        with pytest.raises(ExpressionTooComplexError):
+            check_complexity(x ** 30 - 1, "solve_equation")
+        check_complexity(x ** 30 - 1, "factor")
+
+    def test_current_operation(self, monkeypatch):
+        monkeypatch.setitem(settings.operation_limits, "expand", {"nodes": 3})
+        assert current_operation() is None
+        with use_operation("expand"):
+            assert current_operation() == "expand"
+            with pytest.raises(ExpressionTooComplexError):
+                parse_latex_safe("x^2 + y")
+        assert current_operation() is None
+        assert parse_latex_safe("x^2 + y").free_symbols == {x, y}
+
+    def test_parsed_handles_are_checked(self):
+        with pytest.raises(ExpressionTooComplexError):
+            parse_latex_safe(sympy.Pow(x + 1, 100000, evaluate=False))
+
+    def test_env_overrides(self, monkeypatch):
+        monkeypatch.setenv("MATHFLOW_LIMITS", "nodes=100, digits=50")
+        monkeypatch.setenv("MATHFLOW_LIMITS_EXPAND", "terms=10")
+        configured = Settings.from_env()
+        assert configured.limits_for(None)["nodes"] == 100
+        assert configured.limits_for("expand")["terms"] == 10
+        assert configured.limits_for("expand")["digits"] == 50
+        assert configured.limits_for("solve_equation")["exponent"] == 20
+
+    def test_env_rejects_unknown_limit(self, monkeypatch):
+        monkeypatch.setenv("MATHFLOW_LIMITS", "size=10")
+        with pytest.raises(ValueError, match="size"):
+            _env_limits("MATHFLOW_LIMITS")
+
+
+class TestParameters:
+    """Tests for check_parameters(): the parameters that scale the work."""
+
+    def test_taylor_order(self):
+        check_parameters("taylor", order=100)
+        with pytest.raises(ExpressionTooComplexError, match="展开阶数为 100000，超过 taylor 运算的上限 100"):
+            check_parameters("taylor", order=100000)
+
+    @pytest.mark.parametrize("order", [0, -3])
+    def test_order_must_be_positive(self, order):
+        with pytest.raises(ValueError, match="正整数"):
+            check_parameters("taylor", order=order)
+
+    def test_range_size(self):
+        assert range_size(sympy.Integer(1), sympy.Integer(100)) == 100
+        assert range_size(sympy.Integer(5), sympy.Integer(1)) == 0
+        assert range_size(sympy.Integer(1), sympy.oo) is None
+        assert range_size(sympy.Integer(1), sympy.Symbol("n")) is None
+
+    def test_range(self, monkeypatch):
+        check_parameters("sum", bounds=(sympy.Integer(1), sympy.Integer(1000)))
+        check_parameters("sum", bounds=(sympy.Integer(1), sympy.oo))
+        with pytest.raises(ExpressionTooComplexError, match="项数为 100000，超过 product 运算的上限 1000"):
+            check_parameters("product", bounds=(sympy.Integer(1), sympy.Integer(100000)))
+        with pytest.raises(ExpressionTooComplexError, match="项数为 1e\\+999，"):
+            check_parameters("sum", bounds=(sympy.Integer(1), sympy.Integer(10) ** 999))
+        monkeypatch.setitem(settings.operation_limits, "sum", {"range": 10})
+        with pytest.raises(ExpressionTooComplexError):
+            check_parameters("sum", bounds=(sympy.Integer(1), sympy.Integer(11)))
+
+    def test_env_overrides(self, monkeypatch):
+        monkeypatch.setenv("MATHFLOW_LIMITS_TAYLOR", "order=500")
+        assert Settings.from_env().limits_for("taylor")["order"] == 500
+
+
+class TestFastPath:
+    """The polynomial fast path leaves inputs over the limits to the full parser."""
+
+    def test_polynomial_over_limit_falls_back(self, monkeypatch):
+        assert parse_polynomial("(x+1)^{30}") is not None
+        monkeypatch.setitem(settings.operation_limits, "expand", {"exponent": 10})
+        with use_operation("expand"):
+            assert parse_polynomial("(x+1)^{30}") is None
+
+    def test_equation_over_limit_falls_back(self):
+        assert parse_polynomial_equation("x^{10} - 1 = 0") is not None
+        with use_operation("solve_equation"):
+            assert parse_polynomial_equation("x^{30} - 1 = 0") is None
+
+    def test_service_reports_the_limit(self, monkeypatch):
+        monkeypatch.setitem(settings.operation_limits, "expand", {"terms": 10})
+        with use_operation("expand"):
+            with pytest.raises(ExpressionTooComplexError):
+                expand_expression.__wrapped__("(x+1)^{30}")
+
+
+class TestEndpoints:
+    """Every endpoint answers 400 instead of computing an oversized input."""
+
+    def test_expand_rejects_large_power(self, client):
+        response = client.post("/api/expand", json={"latex": "(x+1)^{100000}"})
+        assert response.status_code == 400
+        assert "过于复杂" in response.json()["detail"]
+
+    def test_simple_input_still_works(self, client):
+        response = client.post("/api/expand", json={"latex": "(x+1)^2"})
+        assert response.status_code == 200
+
+    @pytest.mark.parametrize("path,payload", [
+        ("/api/factor", {"latex": "(x+y+z)^{200}"}),
+        ("/api/simplify", {"latex": "2^{2^{20}}"}),
+        ("/api/verify", {"input_latex": "(x+1)^{100000}", "output_latex": "x"}),
+        ("/api/calculus/differentiate", {"latex": "x^{1000000}", "variable": "x"}),
+        ("/api/expressions", {"latex": "(x+1)^{100000}"}),
+    ])
+    def test_other_endpoints(self, client, path, payload):
+        assert client.post(path, json=payload).status_code == 400
+
+    def test_limits_follow_the_operation(self, client):
+        # 同一输入：因式分解在默认上限内，求解超过求解运算的幂次上限
+        assert client.post("/api/factor", json={"latex": "x^{30} - 1"}).status_code == 200
+        response = client.post("/api/solve/equation", json={"latex": "x^{30} - 1 = 0"})
+        assert response.status_code == 400
+        assert "solve_equation" in response.json()["detail"]
+
+    @pytest.mark.parametrize("path,payload,message", [
+        ("/api/calculus/taylor", {"latex": "\\sin(x)", "order": 100000}, "展开阶数"),
+        ("/api/calculus/taylor", {"latex": "\\sin(x)", "order": -3}, "正整数"),
+        ("/api/calculus/product", {"latex": "i", "start": "1", "end": "100000"}, "项数"),
+        ("/api/calculus/sum", {"latex": "\\frac{1}{i^3+1}", "start": "1", "end": "10^{6}"}, "项数"),
+        ("/api/calculus/sum", {"latex": "i", "start": "1", "end": "10^{999}"}, "项数"),
+        ("/api/calculus/product", {"latex": "i", "start": "0", "end": "10^{999}"}, "项数"),
+    ])
+    def test_parameters_are_checked_before_dispatch(self, client, monkeypatch, path, payload, message):
+        # 检查在 API 进程中进行，不占用计算进程
+        monkeypatch.setattr("app.executor.get_pool", lambda: pytest.fail("dispatched"))
+        response = client.post(path, json=payload)
+        assert response.status_code == 400
+        assert message in response.json()["detail"]
+
+    def test_bounds_are_checked_without_the_parser(self, monkeypatch):
+        # 预检在事件循环上运行，不能调用 LaTeX 解析器
+        monkeypatch.setattr("app.services.sympy_service._latex_parser", lambda backend: pytest.fail("parsed"))
+        with pytest.raises(ExpressionTooComplexError, match="项数"):
+            check_call("sum", ("i", "i", "-5", "10^{6}"))
+        check_call("sum", ("i", "i", "1", "\\infty"))
+        check_call("product", ("i", "i", "1", "n"))
+        check_call("sum", ("i", "i", "1", "2^{10} - 1"))
+
+    def test_other_bounds_are_checked_by_the_service(self, client):
+        response = client.post("/api/calculus/sum", json={"latex": "i", "start": "1", "end": "\\frac{10^{6}}{1}"})
+        assert response.status_code == 400
+        assert "项数" in response.json()["detail"]
+
+    def test_parameters_within_limits(self, client):
+        assert client.post("/api/calculus/taylor", json={"latex": "\\sin(x)", "order": 5}).status_code == 200
+        response = client.post("/api/calculus/sum", json={"latex": "\\frac{1}{i^2}", "start": "1", "end": "\\infty"})
+        assert response.status_code == 200
+
+    def test_batch_items_use_their_own_operation(self, client):
+        response = client.post("/api/batch", json={"operations": [
+            {"op": "factor", "latex": "x^{30} - 1"},
+            {"op": "solve_equation", "latex": "x^{30} - 1 = 0"},
+            {"op": "expand", "latex": "(x+1)^{100000}"},
+            {"op": "taylor", "latex": "\\sin(x)", "order": 100000},
+        ]})
+        assert [r["status"] for r in response.json()["results"]] == [200, 400, 400, 400]
@@ -0,0 +1,160 @@
+"""
+Tests for the online cost model (app/cost_model.py), its training by the
+worker pool and the prediction endpoint (POST /api/predict).
+"""
+
+import math
+
+import pytest
+
+from app import cost_model as cost_module
+from app.config import settings
+from app.cost_model import FEATURES, CostModel, call_features
+from app.services.complexity import ExpressionTooComplexError
+
+
+def _features(operation, *args):
+    return dict(zip(FEATURES, call_features(operation, args)))
+
+
+class TestFeatures:
+    """Tests for call_features()."""
+
+    def test_function_kinds(self):
+        features = _features("integrate", "e^{x} \\sin(x) + \\ln(x)", "x")
+        assert features["trig"] == features["exp"] == features["log"] == 1.0
+        assert _features("integrate", "x^2", "x")["trig"] == 0.0
+
+    def test_degree_and_size_grow(self):
+        small = _features("factor", "x^2 - 1")
+        large = _features("factor", "x^{12} - 3x^7 + x - 1")
+        assert large["degree"] > small["degree"]
+        assert large["nodes"] > small["nodes"]
+
+    def test_nested_radicals(self):
+        assert _features("simplify", "\\sqrt{1 + \\sqrt{x}}")["nested_radicals"] > 0
+        assert _features("simplify", "\\sqrt{x} + \\sqrt{y}")["nested_radicals"] == 0
+
+    def test_taylor_order(self):
+        low = _features("taylor", "\\sin(x)", "x", "0", 4)
+        high = _features("taylor", "\\sin(x)", "x", "0", 40)
+        assert high["parameter"] == pytest.approx(math.log1p(40))
+        assert low["parameter"] < high["parameter"]
+
+    def test_sum_bounds(self):
+        assert _features("sum", "i^2", "i", "1", "100")["parameter"] == pytest.approx(math.log1p(100))
+        infinite = _features("sum", "\\frac{1}{i^2}", "i", "1", "\\infty")
+        assert infinite["unbounded"] == 1.0
+
+    def test_all_expressions_of_the_call(self):
+        single = _features("verify", "x", "x")
+        both = _features("verify", "x", "\\sin(y)")
+        assert both["trig"] == 1.0
+        assert both["symbols"] > single["symbols"]
+        assert _features("solve_system", ["x + y = 1", "x - y = 0"], ["x", "y"])["symbols"] == pytest.approx(math.log1p(2))
+
+    def test_too_complex_input_is_rejected(self):
+        with pytest.raises(ExpressionTooComplexError):
+            call_features("solve_equation", ("x^{30} - 1 = 0",))
+
+
+class TestCostModel:
+    """Tests for the per-operation online regression."""
+
+    @staticmethod
+    def _vector(nodes, trig=0.0):
+        values = dict.fromkeys(FEATURES, 0.0)
+        values.update(bias=1.0, nodes=nodes, trig=trig)
+        return [values[name] for name in FEATURES]
+
+    def test_no_prediction_before_observations(self):
+        model = CostModel()
+        assert model.predict("integrate", self._vector(1.0)) is None
+        assert model.samples("integrate") == 0
+
+    def test_first_observation_predicts_its_time(self):
+        model = CostModel()
+        model.observe("integrate", self._vector(1.0), 0.5)
+        assert model.predict("integrate", self._vector(1.0)) == pytest.approx(0.5, rel=0.1)
+
+    def test_learns_feature_effects(self):
+        model = CostModel()
+        # 耗时随规模指数增长，含三角函数时再慢 10 倍
+        for _ in range(20):
+            for nodes in (1.0, 2.0, 3.0, 4.0):
+                for trig in (0.0, 1.0):
+                    model.observe("integrate", self._vector(nodes, trig), 0.01 * math.exp(nodes) * (10 if trig else 1))
+        plain = model.predict("integrate", self._vector(3.0))
+        assert plain == pytest.approx(0.01 * math.exp(3.0), rel=0.1)
+        assert model.predict("integrate", self._vector(3.0, 1.0)) / plain == pytest.approx(10, rel=0.2)
+
+    def test_operations_are_separate(self):
+        model = CostModel()
+        model.observe("integrate", self._vector(1.0), 2.0)
+        model.observe("differentiate", self._vector(1.0), 0.01)
+        assert model.predict("integrate", self._vector(1.0)) > 50 * model.predict("differentiate", self._vector(1.0))
+
+    def test_records_prediction_with_actual_time(self):
+        model = CostModel(recent=2)
+        model.observe("limit", self._vector(1.0), 1.0)
+        model.observe("limit", self._vector(1.0), 2.0, predicted=1.0)
+        model.observe("limit", self._vector(1.0), 10.0, predicted=1.5, timed_out=True)
+        stats = model.stats()
+        assert stats["operations"]["limit"]["samples"] == 3
+        assert stats["operations"]["limit"]["error_factor"] > 1
+        assert stats["recent"] == [
+            {"operation": "limit", "predicted": 1.0, "actual": 2.0, "timed_out": False},
+            {"operation": "limit", "predicted": 1.5, "actual": 10.0, "timed_out": True},
+        ]
+
+
+class TestPredictEndpoint:
+    """Tests for POST /api/predict and the training by run_operation()."""
+
+    @pytest.fixture
+    def model(self, monkeypatch):
+        fresh = CostModel()
+        monkeypatch.setattr(cost_module, "cost_model", fresh)
+        monkeypatch.setattr("app.executor.cost_model", fresh)
+        monkeypatch.setattr("app.main.cost_model", fresh)
+        return fresh
+
+    def test_untrained_operation(self, client, model):
+        response = client.post("/api/predict", json={"op": "taylor", "latex": "\\sin(x)", "order": 8})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["predicted_seconds"] is None
+        assert data["samples"] == 0
+        assert data["timeout"] > 0
+        assert data["features"]["trig"] == 1.0
+
+    def test_requests_train_the_model(self, client, model):
+        for n in range(2, 5):
+            response = client.post("/api/calculus/differentiate", json={"latex": f"x^{n} \\cos(x)", "variable": "x"})
+            assert response.status_code == 200
+        assert model.samples("differentiate") == 3
+
+        data = client.post("/api/predict", json={"op": "differentiate", "latex": "x^5 \\cos(x)", "variable": "x"}).json()
+        assert data["samples"] == 3
+        assert 0 < data["predicted_seconds"] < 10
+
+        recent = client.get("/api/stats").json()["cost_model"]["recent"]
+        assert [r["operation"] for r in recent] == ["differentiate"] * 3
+        assert recent[0]["predicted"] is None
+        assert all(r["predicted"] is not None and r["actual"] > 0 for r in recent[1:])
+
+    def test_timed_out_request_trains_on_its_budget(self, client, model, monkeypatch):
+        monkeypatch.setattr("app.executor.settings.coalesce_requests", True)
+        monkeypatch.setitem(settings.timeouts, "integrate", 1.0)
+        response = client.post("/api/calculus/integrate", json={"latex": "\\frac{\\sin(x)}{x^5+x+1}", "variable": "x"})
+        assert response.status_code == 504
+        recent = model.stats()["recent"]
+        assert [(r["operation"], r["timed_out"]) for r in recent] == [("integrate", True)]
+        assert recent[0]["actual"] >= 0.5
+
+    def test_invalid_requests(self, client, model):
+        assert client.post("/api/predict", json={"op": "no_such_op"}).status_code == 400
+        assert client.post("/api/predict", json={"op": "limit", "latex": "x"}).status_code == 422
+        response = client.post("/api/predict", json={"op": "expand", "latex": "(x+1)^{100000}"})
+        assert response.status_code == 400
+        assert "过于复杂" in response.json()["detail"]
@@ -0,0 +1,117 @@
+"""
+Tests for cancelling requests whose client disconnected (app/disconnect.py).
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.disconnect import CancelOnDisconnectMiddleware, disconnect_stats
+from app.executor import WorkerPool
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(1)
+    yield pool
+    pool.shutdown()
+
+
+def _scope():
+    return {"type": "http", "method": "POST", "path": "/", "headers": []}
+
+
+def _client(gone):
+    """ASGI receive: one body chunk, then a disconnect once ``gone()`` returns."""
+    messages = [{"type": "http.request", "body": b"x", "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await gone()
+        return {"type": "http.disconnect"}
+
+    return receive
+
+
+def _app(work):
+    async def app(scope, receive, send):
+        await receive()
+        await work()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"done"})
+    return app
+
+
+class TestCancelOnDisconnect:
+
+    def test_disconnect_cancels_handler_and_worker(self, pool):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        async def run():
+            app = CancelOnDisconnectMiddleware(_app(lambda: pool.run(time.sleep, 30)))
+            await app(_scope(), _client(lambda: asyncio.sleep(0.3)), send)
+
+        before = disconnect_stats()["requests_cancelled"]
+        start = time.monotonic()
+        asyncio.run(run())
+        assert time.monotonic() - start < 5
+        assert sent == []
+        assert disconnect_stats()["requests_cancelled"] == before + 1
+        # The killed worker was respawned
+        assert asyncio.run(pool.run(sum, [1, 2])) == 3
+        assert pool.stats()["calls"]["workers_killed"] == 1
+
+    def test_completed_response_is_not_cancelled(self):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        async def run():
+            finished = asyncio.Event()
+
+            async def app(scope, receive, send):
+                await _app(lambda: asyncio.sleep(0.1))(scope, receive, send)
+                # Still running when the server reports the closed connection
+                finished.set()
+                await asyncio.sleep(0.1)
+                sent.append("after response")
+
+            await CancelOnDisconnectMiddleware(app)(_scope(), _client(finished.wait), send)
+
+        before = disconnect_stats()["requests_cancelled"]
+        asyncio.run(run())
+        assert sent[-2]["body"] == b"done"
+        assert sent[-1] == "after response"
+        assert disconnect_stats()["requests_cancelled"] == before
+
+    def test_late_receive_sees_disconnect(self):
+        seen = []
+
+        async def app(scope, receive, send):
+            await receive()
+            await _app(lambda: asyncio.sleep(0))(scope, lambda: asyncio.sleep(0), send)
+            # The middleware owns the connection now; the app still gets the disconnect
+            seen.append(await receive())
+
+        async def send(message):
+            pass
+
+        async def run():
+            await CancelOnDisconnectMiddleware(app)(_scope(), _client(lambda: asyncio.sleep(0.1)), send)
+
+        asyncio.run(run())
+        assert seen == [{"type": "http.disconnect"}]
+
+
+class TestStats:
+
+    def test_stats_endpoint_reports_cancellations(self, client):
+        data = client.get("/api/stats").json()
+        assert "requests_cancelled" in data["disconnects"]
+        assert {"timeouts", "cancelled", "workers_killed"} <= set(data["calls"])
@@ -0,0 +1,223 @@
+"""
+Tests for the process pool execution layer (app/executor.py).
+"""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+from app.config import settings
+from app.executor import (
+    OperationTimeoutError,
+    WorkerCrashedError,
+    WorkerPool,
+    dispatch_stats,
+    get_pool,
+    run_operation,
+)
+from app.services.sympy_service import factor_expression
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(2)
+    yield pool
+    pool.shutdown()
+
+
+class TestWorkerPool:
+    """Tests for WorkerPool dispatch."""
+
+    def test_runs_service_in_worker(self, pool):
+        result = asyncio.run(pool.run(factor_expression, "x^2 - 4"))
+        assert result == factor_expression("x^2 - 4")
+
+    def test_runs_outside_parent_process(self, pool):
+        assert asyncio.run(pool.run(os.getpid)) != os.getpid()
+
+    def test_value_error_propagates(self, pool):
+        with pytest.raises(ValueError):
+            asyncio.run(pool.run(factor_expression, "\\frac{"))
+
+    def test_calls_run_concurrently(self, pool):
+        async def run_two():
+            await asyncio.gather(pool.run(time.sleep, 0.5), pool.run(time.sleep, 0.5))
+
+        start = time.monotonic()
+        asyncio.run(run_two())
+        assert time.monotonic() - start < 0.9
+
+    def test_crashed_worker_is_replaced(self, pool):
+        with pytest.raises(WorkerCrashedError):
+            asyncio.run(pool.run(os._exit, 1))
+
+        # The pool keeps its size and remains usable
+        async def run_two():
+            return await asyncio.gather(pool.run(os.getpid), pool.run(os.getpid))
+
+        assert len(asyncio.run(run_two())) == 2
+
+
+
+class TestTimeouts:
+    """Per-call wall-clock budgets with hard cancellation."""
+
+    def test_timeout_kills_worker(self, pool):
+        async def run():
+            pid = await pool.run(os.getpid)
+            with pytest.raises(OperationTimeoutError):
+                await pool.run(time.sleep, 30, timeout=0.3, operation="sleep")
+            return pid
+
+        start = time.monotonic()
+        asyncio.run(run())
+        assert time.monotonic() - start < 5
+
+        # Both slots are usable again (the killed worker was respawned)
+        async def run_two():
+            return await asyncio.gather(
+                pool.run(time.sleep, 0.2, timeout=5), pool.run(time.sleep, 0.2, timeout=5)
+            )
+
+        asyncio.run(run_two())
+
+    def test_timeout_error_names_operation(self, pool):
+        with pytest.raises(OperationTimeoutError, match="integrate"):
+            asyncio.run(pool.run(time.sleep, 30, timeout=0.2, operation="integrate"))
+
+    def test_endpoint_returns_504(self, client, monkeypatch):
+        monkeypatch.setitem(settings.timeouts, "integrate", 0.3)
+        response = client.post("/api/calculus/integrate", json={
+            "latex": "e^{x^2}\\sin(x^3)", "variable": "x"
+        })
+        assert response.status_code == 504
+        # The service keeps answering after the worker was recycled
+        response = client.post("/api/calculus/integrate", json={"latex": "x", "variable": "x"})
+        assert response.status_code == 200
+
+
+class TestCancellation:
+    """A cancelled call kills the busy worker instead of letting it finish."""
+
+    def test_cancel_kills_worker(self, pool):
+        async def run():
+            task = asyncio.ensure_future(pool.run(time.sleep, 30))
+            await asyncio.sleep(0.3)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            # Both slots are free again, one of them in a fresh process
+            await asyncio.wait_for(
+                asyncio.gather(pool.run(time.sleep, 0.2), pool.run(time.sleep, 0.2)), 5
+            )
+
+        asyncio.run(run())
+        calls = pool.stats()["calls"]
+        assert calls["cancelled"] == 1
+        assert calls["workers_killed"] == 1
+
+    def test_timeouts_are_counted(self, pool):
+        with pytest.raises(OperationTimeoutError):
+            asyncio.run(pool.run(time.sleep, 30, timeout=0.2))
+        assert pool.stats()["calls"]["timeouts"] == 1
+        assert pool.stats()["calls"]["cancelled"] == 0
+
+    def test_cancelled_operation_reaches_worker(self, pool, monkeypatch):
+        monkeypatch.setattr("app.executor.get_pool", lambda: pool)
+
+        async def run():
+            task = asyncio.ensure_future(run_operation("sleep", time.sleep, 30))
+            await asyncio.sleep(0.3)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            # Let the shared computation process its own cancellation
+            await asyncio.sleep(0.1)
+
+        asyncio.run(run())
+        assert pool.stats()["calls"]["workers_killed"] == 1
+
+
+class TestEndpointsUsePool:
+    """Endpoints dispatch through the pool and keep their error mapping."""
+
+    def test_factor_endpoint(self, client):
+        response = client.post("/api/factor", json={"latex": "x^2 - 4"})
+        assert response.status_code == 200
+        assert response.json()["result"] == factor_expression("x^2 - 4")
+
+    def test_invalid_latex_is_400(self, client):
+        response = client.post("/api/factor", json={"latex": "\\frac{"})
+        assert response.status_code == 400
+
+
+class TestCoalescing:
+    """Identical in-flight operations share one computation."""
+
+    def test_identical_calls_share_computation(self):
+        async def run_three():
+            return await asyncio.gather(*[
+                run_operation("sleep", time.sleep, 0.5) for _ in range(3)
+            ])
+
+        before = dispatch_stats()
+        start = time.monotonic()
+        asyncio.run(run_three())
+        elapsed = time.monotonic() - start
+        after = dispatch_stats()
+        assert after["dispatched"] - before["dispatched"] == 1
+        assert after["coalesced"] - before["coalesced"] == 2
+        # Three calls on two workers would need two rounds without coalescing
+        assert elapsed < 0.9
+
+    def test_normalized_spellings_coalesce(self):
+        async def run_two():
+            return await asyncio.gather(
+                run_operation("factor", factor_expression, "2 \\cdot x + 2"),
+                run_operation("factor", factor_expression, "2 * x + 2"),
+            )
+
+        before = dispatch_stats()["coalesced"]
+        first, second = asyncio.run(run_two())
+        assert first == second
+        assert dispatch_stats()["coalesced"] == before + 1
+
+    def test_waiter_cancellation_does_not_cancel_others(self):
+        async def run():
+            first = asyncio.ensure_future(run_operation("sleep", time.sleep, 0.4))
+            second = asyncio.ensure_future(run_operation("sleep", time.sleep, 0.4))
+            await asyncio.sleep(0.1)
+            first.cancel()
+            await second
+            return first.cancelled()
+
+        assert asyncio.run(run()) is True
+
+    def test_shared_computation_times_out(self, monkeypatch):
+        monkeypatch.setitem(settings.timeouts, "sleep", 0.3)
+        with pytest.raises(OperationTimeoutError):
+            asyncio.run(run_operation("sleep", time.sleep, 5))
+
+    def test_timeout_is_counted_as_timeout(self, monkeypatch):
+        monkeypatch.setattr(settings, "coalesce_requests", True)
+        monkeypatch.setitem(settings.timeouts, "sleep", 0.3)
+
+        async def run_two():
+            return await asyncio.gather(
+                run_operation("sleep", time.sleep, 6),
+                run_operation("sleep", time.sleep, 6),
+                return_exceptions=True,
+            )
+
+        before = get_pool().stats()["calls"]
+        results = asyncio.run(run_two())
+        assert all(isinstance(r, OperationTimeoutError) for r in results)
+        after = get_pool().stats()["calls"]
+        # The shared computation owns the budget: a timeout, not a cancellation
+        assert after["timeouts"] - before["timeouts"] == 1
+        assert after["cancelled"] == before["cancelled"]
+
+    def test_stats_endpoint_reports_dispatch(self, client):
+        data = client.get("/api/stats").json()
+        assert {"dispatched", "coalesced", "in_flight"} <= set(data["dispatch"])
@@ -0,0 +1,256 @@
+"""
+Tests for expression handles (POST /api/expressions and expression_id).
+"""
+
+import asyncio
+import json
+
+import pytest
+import sympy
+
+from app import expressions
+from app.expressions import expression_from_srepr
+from app.services.cache import LRUCache, SQLiteStore
+from app.services.sympy_service import parse_expression, verify_equivalence
+
+
+@pytest.fixture
+def handle(client):
+    def create(latex):
+        response = client.post("/api/expressions", json={"latex": latex})
+        assert response.status_code == 200
+        return response.json()["id"]
+    return create
+
+
+class TestCreateExpression:
+
+    def test_returns_content_addressed_id(self, client):
+        first = client.post("/api/expressions", json={"latex": r"x^2 \cdot y"}).json()
+        second = client.post("/api/expressions", json={"latex": "x^{2} * y"}).json()
+        assert first["id"] == second["id"]
+        assert first["latex"] == "x^{2} y"
+        assert first["expires_in"] > 0
+
+    def test_different_expressions_get_different_ids(self):
+        assert parse_expression("x^2")["id"] != parse_expression("x^3")["id"]
+
+    def test_invalid_latex(self, client):
+        response = client.post("/api/expressions", json={"latex": "\\frac{"})
+        assert response.status_code == 400
+
+    def test_empty_latex(self, client):
+        response = client.post("/api/expressions", json={"latex": "  "})
+        assert response.status_code == 400
+
+
+class TestOperateOnHandle:
+
+    def test_chain_of_operations(self, client, handle):
+        expression_id = handle("x^3 - x")
+        derivative = client.post("/api/calculus/differentiate", json={"expression_id": expression_id})
+        assert derivative.status_code == 200
+        assert verify_equivalence(derivative.json()["result"], "3x^2 - 1")
+
+        factored = client.post("/api/factor", json={"expression_id": expression_id, "verify": True})
+        assert factored.status_code == 200
+        assert factored.json()["verified"] is True
+
+        integral = client.post("/api/calculus/definite-integral", json={
+            "expression_id": expression_id, "variable": "x", "lower_limit": "0", "upper_limit": "2",
+        })
+        assert integral.status_code == 200
+        assert integral.json()["result"] == "2"
+
+    def test_same_result_as_latex(self, client, handle):
+        expression_id = handle(r"\sin(x) e^{x}")
+        by_id = client.post("/api/calculus/integrate", json={"expression_id": expression_id})
+        by_latex = client.post("/api/calculus/integrate", json={"latex": r"\sin(x) e^{x}"})
+        assert by_id.json() == by_latex.json()
+
+    def test_solve_stored_equation(self, client, handle):
+        response = client.post("/api/solve/equation", json={"expression_id": handle("2x + 3 = 7")})
+        assert response.status_code == 200
+        assert response.json()["result"] == "x = 2"
+
+    def test_inequality_requires_a_relation(self, client, handle):
+        response = client.post("/api/solve/inequality", json={"expression_id": handle("x^2 + 1")})
+        assert response.status_code == 400
+        assert "不等式" in response.json()["detail"]
+
+    def test_verify_handles(self, client, handle):
+        response = client.post("/api/verify", json={
+            "input_expression_id": handle("(x+1)^2"), "output_latex": "x^2 + 2x + 1",
+        })
+        assert response.json()["is_equivalent"] is True
+        response = client.post("/api/verify", json={
+            "input_expression_id": handle("x - x"), "output_expression_id": handle("0"),
+        })
+        assert response.json()["is_equivalent"] is True
+
+    def test_vector_field_handles(self, client, handle):
+        ids = [handle("-y"), handle("x"), handle("0")]
+        curl = client.post("/api/vector/curl", json={"expression_ids": ids})
+        by_latex = client.post("/api/vector/curl", json={"components": ["-y", "x", "0"]})
+        assert curl.status_code == 200
+        assert curl.json() == by_latex.json()
+        divergence = client.post("/api/vector/divergence", json={"expression_ids": [handle("x^2"), handle("y"), handle("z")]})
+        assert verify_equivalence(divergence.json()["result"], "2x + 2")
+
+    def test_system_handles(self, client, handle):
+        response = client.post("/api/solve/system", json={
+            "expression_ids": [handle("x + y = 3"), handle("x - y = 1")], "variables": ["x", "y"],
+        })
+        assert response.status_code == 200
+        assert response.json()["result"] == "x = 2, y = 1"
+        assert response.json()["steps"][0]["latex"] == "x + y = 3"
+
+    @pytest.mark.parametrize("path,payload", [
+        ("/api/verify", {"input_latex": "x", "input_expression_id": "0" * 32, "output_latex": "x"}),
+        ("/api/verify", {"output_latex": "x"}),
+        ("/api/vector/curl", {"components": ["x", "y", "z"], "expression_ids": ["0" * 32] * 3}),
+        ("/api/solve/system", {"variables": ["x"]}),
+        ("/api/solve/system", {"expression_ids": ["0" * 32], "variables": ["x"]}),
+    ])
+    def test_multi_expression_validation(self, client, path, payload):
+        assert client.post(path, json=payload).status_code == 422
+
+    def test_batch_accepts_handles(self, client, handle):
+        response = client.post("/api/batch", json={"operations": [
+            {"op": "expand", "expression_id": handle("(x+1)^2")},
+            {"op": "gradient", "expression_id": handle("x y"), "variables": ["x", "y"]},
+        ]})
+        assert [r["ok"] for r in response.json()["results"]] == [True, True]
+
+
+class TestHandleValidation:
+
+    def test_unknown_id(self, client):
+        response = client.post("/api/factor", json={"expression_id": "0" * 32})
+        assert response.status_code == 422
+        assert "表达式不存在或已过期" in response.text
+
+    def test_latex_and_id_are_exclusive(self, client, handle):
+        response = client.post("/api/expand", json={"latex": "x", "expression_id": handle("x")})
+        assert response.status_code == 422
+
+    def test_one_of_latex_or_id_required(self, client):
+        response = client.post("/api/expand", json={})
+        assert response.status_code == 422
+
+    def test_expired_id(self, client, monkeypatch):
+        now = [0.0]
+        monkeypatch.setattr(expressions, "_store", LRUCache("expressions", 10, ttl=60, clock=lambda: now[0]))
+        expression_id = client.post("/api/expressions", json={"latex": "x^2"}).json()["id"]
+        assert client.post("/api/expand", json={"expression_id": expression_id}).status_code == 200
+        now[0] = 61.0
+        assert client.post("/api/expand", json={"expression_id": expression_id}).status_code == 422
+
+
+class TestSharedStore:
+    """Handles shared between API processes through the SQLite file."""
+
+    @pytest.fixture
+    def shared(self, tmp_path, monkeypatch):
+        store = SQLiteStore("expressions_shared_test", str(tmp_path / "cache.db"), "test")
+        monkeypatch.setattr(expressions, "_shared_store", store)
+        return store
+
+    @staticmethod
+    def _other_process(monkeypatch):
+        # 另一个服务进程：本地 LRU 中没有这个句柄
+        monkeypatch.setattr(expressions, "_store", LRUCache("expressions", 10, ttl=3600))
+
+    def test_handle_from_another_process(self, client, shared, monkeypatch):
+        expression_id = client.post("/api/expressions", json={"latex": "x^3"}).json()["id"]
+        self._other_process(monkeypatch)
+        response = client.post("/api/calculus/differentiate", json={"expression_id": expression_id})
+        assert response.status_code == 200
+        assert response.json()["result"] == "3 x^{2}"
+
+    def test_shared_handle_expires(self, client, shared, monkeypatch):
+        expression_id = client.post("/api/expressions", json={"latex": "x^3"}).json()["id"]
+        self._other_process(monkeypatch)
+        monkeypatch.setattr(expressions.settings, "expression_ttl", -1.0)
+        assert client.post("/api/expand", json={"expression_id": expression_id}).status_code == 422
+
+    def test_store_is_read_off_the_event_loop(self, client, shared, monkeypatch):
+        expression_id = client.post("/api/expressions", json={"latex": "x^3"}).json()["id"]
+        self._other_process(monkeypatch)
+        loops = []
+        get = shared.get
+
+        def recording_get(key, default=None):
+            loops.append(asyncio._get_running_loop())
+            return get(key, default)
+
+        monkeypatch.setattr(shared, "get", recording_get)
+        assert client.post("/api/expand", json={"expression_id": expression_id}).status_code == 200
+        assert loops == [None]
+
+    def test_handle_lists_from_another_process(self, client, shared, monkeypatch):
+        ids = [client.post("/api/expressions", json={"latex": latex}).json()["id"] for latex in ("x + y = 3", "x - y = 1")]
+        self._other_process(monkeypatch)
+        response = client.post("/api/solve/system", json={"expression_ids": ids, "variables": ["x", "y"]})
+        assert response.json()["result"] == "x = 2, y = 1"
+
+    def test_batch_and_stream_items(self, client, shared, monkeypatch):
+        expression_id = client.post("/api/expressions", json={"latex": "x^3"}).json()["id"]
+        self._other_process(monkeypatch)
+        response = client.post("/api/batch", json={"operations": [
+            {"op": "differentiate", "expression_id": expression_id, "variable": "x"},
+        ]})
+        assert response.json()["results"][0]["result"]["result"] == "3 x^{2}"
+
+        self._other_process(monkeypatch)
+        job = json.dumps({"op": "differentiate", "expression_id": expression_id, "variable": "x"})
+        lines = client.post("/api/stream", content=job + "\n").text.splitlines()
+        assert json.loads(lines[0])["result"]["result"] == "3 x^{2}"
+
+    def test_rows_hold_srepr(self, client, shared):
+        expression_id = client.post("/api/expressions", json={"latex": "x^3"}).json()["id"]
+        entry = shared.get(("expression", expression_id))
+        assert entry["srepr"] == "Pow(Symbol('x'), Integer(3))"
+        assert "pickle" not in entry
+
+    def test_tampered_row_is_not_executed(self, client, shared, monkeypatch):
+        expression_id = client.post("/api/expressions", json={"latex": "x^3"}).json()["id"]
+        shared.set(("expression", expression_id), {
+            "srepr": "__import__('os').system('exit 3')", "stored": 1e12,
+        })
+        self._other_process(monkeypatch)
+        assert client.post("/api/expand", json={"expression_id": expression_id}).status_code == 422
+
+
+class TestSrepr:
+    """Tests for expression_from_srepr()."""
+
+    x = sympy.Symbol("x")
+    f = sympy.Function("f")
+
+    @pytest.mark.parametrize("expr", [
+        x ** 3 - sympy.Rational(1, 2) * x + sympy.pi,
+        sympy.sin(x) * sympy.exp(-x) + sympy.Float("1.25"),
+        sympy.Integral(f(x), (x, 0, sympy.oo)),
+        sympy.Derivative(f(x), x, 2),
+        sympy.Piecewise((x, x > 0), (-x, True)),
+        sympy.Eq(sympy.Symbol("y", positive=True), sympy.I * x),
+        sympy.Matrix([[x, 1], [0, x]]).as_immutable(),
+    ])
+    def test_round_trip(self, expr):
+        rebuilt = expression_from_srepr(sympy.srepr(expr))
+        assert rebuilt == expr
+        assert sympy.srepr(rebuilt) == sympy.srepr(expr)
+
+    @pytest.mark.parametrize("text", [
+        "__import__('os').system('exit 3')",
+        "Symbol('x').__class__",
+        "open('/etc/passwd')",
+        "sympify('x')",
+        "lambda: 1",
+        "Symbol(",
+        "1 + 2",
+    ])
+    def test_rejects_anything_else(self, text):
+        with pytest.raises(ValueError):
+            expression_from_srepr(text)
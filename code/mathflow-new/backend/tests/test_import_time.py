@@ -0,0 +1,64 @@
+"""
+Import-time budget of the backend.
+
+Every API process imports app.main at startup and every spawned worker
+imports the service layer, so the time both take is measured in a fresh
+interpreter and kept under a budget. Rarely used subsystems must not be
+loaded by these imports at all.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 导入耗时预算（秒）；开发容器中实测 app.main 约 0.8 秒，服务层约 0.3 秒
+IMPORT_BUDGETS = {
+    "app.main": 2.0,
+    "app.services.sympy_service": 1.0,
+}
+
+# 仅在首次使用时才导入的子系统
+LAZY_MODULES = ("numpy", "sympy.vector")
+
+_RUNS = 3
+
+
+def _import(module: str) -> dict:
+    """Import ``module`` in a fresh interpreter: elapsed seconds and loaded modules."""
+    script = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - started\n"
+        "print(json.dumps({'seconds': elapsed, 'modules': sorted(sys.modules)}))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script], cwd=BACKEND_DIR, check=True,
+        capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+@pytest.mark.parametrize("module", sorted(IMPORT_BUDGETS))
+def test_import_within_budget(module):
+    # Best of a few runs, so that a busy machine does not fail the budget
+    seconds = min(_import(module)["seconds"] for _ in range(_RUNS))
+    assert seconds < IMPORT_BUDGETS[module], f"import {module} took {seconds:.2f}s"
+
+
+@pytest.mark.parametrize("module", sorted(IMPORT_BUDGETS))
+def test_rare_subsystems_load_lazily(module):
+    loaded = set(_import(module)["modules"])
+    assert not loaded & set(LAZY_MODULES)
+
+
+def test_lazy_subsystems_still_work(client):
+    response = client.post("/api/verify", json={"input_latex": "\\sin(x)^2 + \\cos(x)^2", "output_latex": "1"})
+    assert response.status_code == 200
+    response = client.post("/api/vector/gradient", json={"latex": "x^2 y", "variables": ["x", "y"]})
+    assert response.status_code == 200
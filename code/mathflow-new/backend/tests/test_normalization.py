@@ -1,5 +1,11 @@
 import pytest
-from app.services.sympy_service import normalize_latex, verify_equivalence
+from app.services.sympy_service import (
+    _latex_parser,
+    latex_tokens,
+    normalize_latex,
+    parser_backend,
+    verify_equivalence,
+)
 
 
 class TestNormalization:
@@ -94,6 +100,58 @@ class TestNormalization:
         result = normalize_latex(r"a \div b")
         assert result == "a/b"
 
+    def test_normalize_preserves_other_spacing(self):
+        """Test that spacing away from * and / is left for the parser."""
+        assert normalize_latex(r"\left(x + 1\right) \cdot \pi x") == r"(x + 1)*\pi x"
+
+
+class TestLatexTokens:
+    """Tests for the canonical token stream used as parse-cache key."""
+
+    @pytest.mark.parametrize("a,b", [
+        (r"x^{2} \cdot y", "x^2*y"),
+        (r"3 \times y", "3*y"),
+        (r"a \div b", "a / b"),
+        (r"\left(x + 1\right)^2", "(x+1)^{2}"),
+        (r"\frac{1}{x}  +  \sin(x)", r"\frac{1}{x}+\sin(x)"),
+        ("x_{1} + y", "x_1+y"),
+    ])
+    def test_spellings_share_tokens(self, a, b):
+        """Test that equivalent spellings give the same tokens."""
+        assert latex_tokens(a) == latex_tokens(b)
+
+    @pytest.mark.parametrize("a,b", [
+        ("x^{2}3", "x^2 3"),        # 3x^2 与 x^23
+        ("x^{a}b", "x^a b"),
+        (r"\pi x", r"\pix"),
+        ("a b", "ab"),
+        ("d x", "dx"),
+        ("1.5", "1 .5"),
+        ("x_1", "x _1"),            # Lark 的下标不允许空白
+        (r"\left|x\right|", r"\left |x\right |"),
+    ])
+    def test_distinct_readings_keep_distinct_tokens(self, a, b):
+        """Test that spellings the parser may read differently do not share tokens."""
+        assert latex_tokens(a) != latex_tokens(b)
+
+    @pytest.mark.parametrize("a,b", [
+        (r"x^{2} \cdot y", "x^2*y"),
+        (r"\left(x + 1\right)^{3}", "(x+1)^3"),
+        (r"\frac{1}{2} x", r"\frac{1}{2}x"),
+        ("e^{x} + 1", "e^x+1"),
+        (r"\sqrt{x}  \sin x", r"\sqrt{x}\sin x"),
+    ])
+    def test_shared_tokens_parse_alike(self, a, b):
+        """Test that inputs sharing tokens parse to the same expression."""
+        assert latex_tokens(a) == latex_tokens(b)
+        # 直接调用解析器：经过 parse_latex_safe 时第二次会命中同一个缓存项
+        parse = _latex_parser(parser_backend())
+        assert parse(normalize_latex(a)) == parse(normalize_latex(b))
+
+    def test_empty(self):
+        """Test the token stream of an empty string."""
+        assert latex_tokens("") == ()
+
 
 class TestVerification:
     """Tests for verify_equivalence function."""
@@ -0,0 +1,103 @@
+"""
+Parser backend compatibility.
+
+The expression and normalization suites are re-run with the Lark backend
+selected, and the per-request switch is checked end to end.
+"""
+
+import pytest
+
+from app.config import settings
+from app.services.sympy_service import available_parser_backends, parse_latex_safe, parser_backend, use_parser
+from tests import test_expressions, test_normalization
+
+lark_only = pytest.mark.skipif("lark" not in available_parser_backends(), reason="lark is not installed")
+
+# 已知的 Lark 后端差异（SymPy 1.13 的实验性 Lark 语法）：不支持 \sin^{2}(x) 这类函数幂，
+# 函数调用、隐式乘法与除法在无括号时有歧义。SymPy 修复后这些用例会直接通过
+KNOWN_LARK_GAPS = {
+    "test_simplify_trig_identity",
+    "test_verify_trig_identity",
+    "test_limit_correctness",
+    "test_limit_exponential_over_polynomial",
+    "test_taylor_sin_is_equivalent_approximation",
+    "test_taylor_cosine_order_6",
+    "test_trig_simplification",
+    "test_derivative_of_tangent",
+    "test_verify_double_angle_cos",
+    "test_verify_cos_double_angle_alt",
+    "test_taylor_sin",
+    "test_taylor_cos",
+    "test_limit_sinc",
+    "test_limit_trig_sin_over_x_squared",
+    "test_derivative_chain_rule_power",
+}
+
+
+@pytest.fixture
+def lark_parser(request):
+    if request.node.originalname in KNOWN_LARK_GAPS:
+        request.applymarker(pytest.mark.xfail(reason="known Lark grammar gap", strict=False))
+    with use_parser("lark"):
+        yield
+
+
+def _compat_classes(module):
+    for name, cls in vars(module).items():
+        if name.startswith("Test") and isinstance(cls, type):
+            compat = type(f"{name}Lark", (cls,), {})
+            yield compat.__name__, lark_only(pytest.mark.usefixtures("lark_parser")(compat))
+
+
+for _module in (test_expressions, test_normalization):
+    globals().update(_compat_classes(_module))
+
+
+class TestBackendSelection:
+
+    def test_default_from_settings(self, monkeypatch):
+        assert parser_backend() == settings.parser_backend
+        monkeypatch.setattr(settings, "parser_backend", "lark")
+        assert parser_backend() == "lark"
+
+    def test_use_parser_overrides_and_restores(self):
+        with use_parser("lark"):
+            assert parser_backend() == "lark"
+            with use_parser(None):
+                assert parser_backend() == settings.parser_backend
+        assert parser_backend() == settings.parser_backend
+
+    def test_unknown_backend(self):
+        with use_parser("nope"), pytest.raises(ValueError, match="未知的 LaTeX 解析器"):
+            parse_latex_safe("x")
+
+    def test_invalid_header_is_400(self, client):
+        response = client.post("/api/expand", json={"latex": "x"}, headers={"X-Parser-Backend": "nope"})
+        assert response.status_code == 400
+        assert "nope" in response.json()["detail"]
+
+    def test_root_lists_backends(self, client):
+        parsers = client.get("/").json()["parsers"]
+        assert parsers["default"] == settings.parser_backend
+        assert "antlr" in parsers["available"]
+
+
+@lark_only
+class TestLarkPerRequest:
+
+    def test_header_selects_backend_in_worker(self, client):
+        # \pi parses with ANTLR but not with SymPy 1.13's Lark grammar
+        assert client.post("/api/expand", json={"latex": "\\pi x"}).status_code == 200
+        response = client.post("/api/expand", json={"latex": "\\pi x"}, headers={"X-Parser-Backend": "lark"})
+        assert response.status_code == 400
+
+    def test_backends_cached_separately(self):
+        with use_parser("lark"):
+            lark_expr = parse_latex_safe("x^2 + 2x + 1")
+        antlr_expr = parse_latex_safe("x^2 + 2x + 1")
+        assert lark_expr == antlr_expr.doit()
+        assert lark_expr is not antlr_expr
+
+    def test_ambiguous_input_is_value_error(self):
+        with use_parser("lark"), pytest.raises(ValueError):
+            parse_latex_safe("\\sin(x)*\\cos(x)")
@@ -0,0 +1,82 @@
+"""
+Tests for server-side operation pipelines (POST /api/pipeline).
+"""
+
+import typing
+
+from app.models import PipelineStep
+from app.services.sympy_service import PIPELINE_STEPS, run_pipeline, verify_equivalence
+
+
+class TestRunPipeline:
+
+    def test_steps_applied_in_order(self):
+        data = run_pipeline("(x+1)^2 (x-1)", [
+            ("expand", "x", False),
+            ("differentiate", "x", False),
+            ("factor", "x", False),
+        ])
+        assert verify_equivalence(data["result"], "(x+1)(3x-1)")
+        assert data["steps"] == []
+
+    def test_only_requested_intermediate_results(self):
+        data = run_pipeline("(x+1)^2", [
+            ("expand", "x", True),
+            ("differentiate", "x", False),
+            ("integrate", "x", True),
+        ])
+        assert [(s["index"], s["op"]) for s in data["steps"]] == [(0, "expand"), (2, "integrate")]
+        assert verify_equivalence(data["steps"][0]["result"], "x^2 + 2x + 1")
+        assert verify_equivalence(data["result"], "x^2 + 2x")
+
+    def test_collect_and_apart_use_variable(self):
+        collected = run_pipeline("x^2 y + 3 x y + x^2", [("collect", "x", False)])
+        assert verify_equivalence(collected["result"], "x^2 (y + 1) + 3 x y")
+        partial = run_pipeline(r"\frac{1}{t^2 - 1}", [("apart", "t", False)])
+        assert verify_equivalence(partial["result"], r"\frac{1}{2(t-1)} - \frac{1}{2(t+1)}")
+
+    def test_model_accepts_exactly_the_registered_steps(self):
+        allowed = typing.get_args(PipelineStep.model_fields["op"].annotation)
+        assert set(allowed) == set(PIPELINE_STEPS)
+
+
+class TestPipelineEndpoint:
+
+    def test_pipeline(self, client):
+        response = client.post("/api/pipeline", json={
+            "latex": r"\sin(x)^2 + \cos(x)^2 + x^2",
+            "steps": [{"op": "simplify"}, {"op": "differentiate", "output": True}],
+        })
+        assert response.status_code == 200
+        data = response.json()
+        assert verify_equivalence(data["result"], "2x")
+        assert data["steps"] == [{"index": 1, "op": "differentiate", "result": data["result"]}]
+
+    def test_pipeline_on_expression_handle(self, client):
+        expression_id = client.post("/api/expressions", json={"latex": "x^3 - x"}).json()["id"]
+        response = client.post("/api/pipeline", json={
+            "expression_id": expression_id,
+            "steps": [{"op": "factor"}],
+        })
+        assert response.status_code == 200
+        assert verify_equivalence(response.json()["result"], "x(x-1)(x+1)")
+
+    def test_pipeline_in_batch(self, client):
+        response = client.post("/api/batch", json={"operations": [
+            {"op": "pipeline", "latex": "(x+2)^2", "steps": [{"op": "expand"}]},
+        ]})
+        result = response.json()["results"][0]
+        assert result["ok"] is True
+        assert verify_equivalence(result["result"]["result"], "x^2 + 4x + 4")
+
+    def test_unknown_step(self, client):
+        response = client.post("/api/pipeline", json={"latex": "x", "steps": [{"op": "transmogrify"}]})
+        assert response.status_code == 422
+
+    def test_empty_steps(self, client):
+        response = client.post("/api/pipeline", json={"latex": "x", "steps": []})
+        assert response.status_code == 422
+
+    def test_invalid_latex(self, client):
+        response = client.post("/api/pipeline", json={"latex": "\\frac{", "steps": [{"op": "expand"}]})
+        assert response.status_code == 400
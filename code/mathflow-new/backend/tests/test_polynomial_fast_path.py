@@ -0,0 +1,232 @@
+"""
+Tests for the polynomial fast path (app/services/polynomial.py) and its use
+by factor, expand and solve: recognized inputs must give the same results
+as the full LaTeX parser, everything else must fall back.
+"""
+
+import pytest
+import sympy
+
+from app.services import polynomial, solve_service, sympy_service
+from app.services.polynomial import (
+    equation_key,
+    parse_polynomial,
+    parse_polynomial_equation,
+    polynomial_key,
+)
+from app.services.sympy_service import (
+    expand_expression_verified,
+    factor_expression,
+    factor_expression_verified,
+    parse_latex_safe,
+)
+
+x, y = sympy.symbols("x y")
+
+POLYNOMIALS = [
+    "x^2 + 2x + 1",
+    "x^3 - 6x^2 + 11x - 6",
+    "-x^2+1",
+    "2-2x",
+    "6x^2+12x+6",
+    "(x+1)(x-1)",
+    "(x+1)^3",
+    "(2x-1)(x+3)",
+    "\\frac{1}{2}x^2 - \\frac{1}{2}",
+    "\\frac{x^2}{2} - x",
+    "x/2 + 1",
+    "x*2/3 - x/2/3",
+    "x/2*x",
+    "2x*3 - x \\cdot y",
+    "\\left(x+1\\right)^2 - x^{10}",
+    "x^2y + xy^2",
+    "x^6 - y^6",
+    "4x^4-17x^2+4",
+    "x--1",
+]
+
+# parse_latex 对这些写法有特殊解释（或它们根本不是多项式），必须交给完整解析器
+NOT_RECOGNIZED = [
+    "x^2 3",        # 数字拼接成 x^23
+    "2 3x",         # 23x
+    "x^-1",
+    "007x",
+    "dx",
+    "x(x+1)",       # 函数调用
+    "x_1 + 1",
+    "x'",
+    "e^x",
+    "\\pi x",
+    "\\sin(x)",
+    "1.5x",
+    "x/y",
+    "{x}^2",
+    "5",
+    "x^{2000}",
+    "(x+y+z+w)^{100}",
+]
+
+# 隐式乘法比 / 结合得更紧：1/2x 是 1/(2x)，不是多项式
+IMPLICIT_DIVISORS = [
+    "1/2x",
+    "2/3x",
+    "x^2/2x",
+    "1/2x^2+x",
+    "x/2 y",
+    "x/2(x+1)",
+    "x/2\\frac{1}{3}",
+]
+
+EQUATIONS = [
+    "x^2 - 5x + 6 = 0",
+    "3x^2-5x+2=0",
+    "x^2 = 4",
+    "2x + 3 = 7",
+    "5 = 2x + 1",
+    "x^2 + 1 = 0",
+    "x^2 - 2x + 1 = 0",
+    "\\frac{1}{2}x^2 - 2 = 0",
+    "x^3 - 6x^2 + 11x - 6 = 0",
+    "x^4 - 5x^2 + 4 = 0",
+    "y^2 - 9 = 0",
+    "x^2 - 4",
+    "-x = 3",
+]
+
+
+def _generic(call, *args):
+    """Run a service function with the fast path disabled."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(sympy_service, "parse_polynomial", lambda latex_str: None)
+        mp.setattr(solve_service, "parse_polynomial_equation", lambda latex_str: None)
+        return call.__wrapped__(*args)
+
+
+class TestRecognizer:
+    """Tests for parse_polynomial() against the full parser."""
+
+    @pytest.mark.parametrize("latex_str", POLYNOMIALS)
+    def test_same_polynomial_as_parser(self, latex_str):
+        poly = parse_polynomial(latex_str)
+        assert poly is not None
+        expr = parse_latex_safe(latex_str)
+        assert sympy.expand(expr - poly.as_expr()) == 0
+        assert set(poly.gens) == expr.free_symbols
+
+    @pytest.mark.parametrize("latex_str", NOT_RECOGNIZED)
+    def test_falls_back(self, latex_str):
+        assert parse_polynomial(latex_str) is None
+
+    @pytest.mark.parametrize("latex_str", IMPLICIT_DIVISORS)
+    def test_divisor_followed_by_a_factor_falls_back(self, latex_str):
+        assert parse_polynomial(latex_str) is None
+        assert parse_polynomial_equation(f"{latex_str} = 1") is None
+
+    def test_equation_is_not_a_polynomial(self):
+        assert parse_polynomial("x^2 = 4") is None
+
+    def test_coefficient_domain(self):
+        assert parse_polynomial("2x + 4").get_domain() == sympy.ZZ
+        assert parse_polynomial("\\frac{1}{2}x + 4").get_domain() == sympy.QQ
+
+    def test_not_a_string(self):
+        assert parse_polynomial(x ** 2) is None
+
+
+class TestEquationRecognizer:
+    """Tests for parse_polynomial_equation()."""
+
+    def test_sides(self):
+        lhs, rhs = parse_polynomial_equation("2x + 3 = 7")
+        assert lhs == sympy.Poly(2 * x + 3, x)
+        assert rhs == sympy.Poly(7, x)
+
+    def test_bare_polynomial_means_equal_to_zero(self):
+        lhs, rhs = parse_polynomial_equation("x^2 - 4")
+        assert rhs.is_zero
+
+    @pytest.mark.parametrize("latex_str", [
+        "(x+1)(x-1) = 0",       # 原方程要按输入的写法回显
+        "x*2 = 4",
+        "x^2 + x + 1 - 1 = 0",  # 合并同类项
+        "x^2 + 0 = 4",
+        "x + y = 1",            # 多个变量
+        "x = x",                # parse_latex 把它求值为 True
+        "x + 1 = x",
+    ])
+    def test_non_flat_equations_fall_back(self, latex_str):
+        assert parse_polynomial_equation(latex_str) is None
+
+
+class TestServiceResults:
+    """The fast path must not change what the services return."""
+
+    @pytest.mark.parametrize("latex_str", POLYNOMIALS)
+    def test_factor_matches_generic(self, latex_str):
+        assert factor_expression.__wrapped__(latex_str) == _generic(factor_expression, latex_str)
+
+    @pytest.mark.parametrize("latex_str", IMPLICIT_DIVISORS)
+    def test_division_matches_parser(self, latex_str):
+        result = parse_latex_safe(factor_expression.__wrapped__(latex_str))
+        assert sympy.simplify(result - parse_latex_safe(latex_str)) == 0
+        assert factor_expression.__wrapped__(latex_str) == _generic(factor_expression, latex_str)
+
+    @pytest.mark.parametrize("latex_str", POLYNOMIALS)
+    def test_factor_verified(self, latex_str):
+        assert factor_expression_verified.__wrapped__(latex_str) == _generic(factor_expression_verified, latex_str)
+
+    @pytest.mark.parametrize("latex_str", POLYNOMIALS)
+    def test_expand_is_expanded_input(self, latex_str):
+        result = expand_expression_verified.__wrapped__(latex_str)
+        assert result["verified"]
+        expanded = parse_latex_safe(result["result"])
+        assert sympy.expand(expanded - parse_latex_safe(latex_str)) == 0
+
+    def test_expand_prints_flat_sum(self):
+        # 完整解析器产生未求值的嵌套加法，expand 会原样打印出括号
+        assert expand_expression_verified.__wrapped__("x^2+x+1")["result"] == "x^{2} + x + 1"
+
+    @pytest.mark.parametrize("latex_str", EQUATIONS)
+    def test_solve_matches_generic(self, latex_str):
+        fast = solve_service.solve_equation_with_steps.__wrapped__(latex_str)
+        generic = _generic(solve_service.solve_equation_with_steps, latex_str)
+        assert fast["result"] == generic["result"]
+        # 第一步回显原方程：快速通道按规范顺序打印，其余步骤完全相同
+        assert fast["steps"][1:] == generic["steps"][1:]
+        fast_eq = parse_latex_safe(fast["steps"][0]["latex"])
+        generic_eq = parse_latex_safe(generic["steps"][0]["latex"])
+        assert sympy.expand(fast_eq.lhs - generic_eq.lhs) == 0
+        assert sympy.expand(fast_eq.rhs - generic_eq.rhs) == 0
+
+    def test_solve_echoes_equation(self):
+        result = solve_service.solve_equation_with_steps.__wrapped__("3x^2-5x+2=0")
+        assert result["steps"][0]["latex"] == "3 x^{2} - 5 x + 2 = 0"
+        assert result["result"] == "x = 0.666666666666667, x = 1.0"
+
+
+class TestCacheKeys:
+    """Recognized inputs are keyed by their coefficients, without parsing."""
+
+    def test_spellings_share_a_key(self):
+        assert polynomial_key("(x+1)^2") == polynomial_key("x^{2} + 2 x + 1")
+        assert equation_key("2x + 3 = 7") == equation_key("3 + 2x = 7")
+
+    def test_unrecognized_has_no_key(self):
+        assert polynomial_key("\\sin(x)") is None
+        assert equation_key("(x+1)(x-1) = 0") is None
+
+    def test_factor_cache_skips_parser(self, monkeypatch):
+        factor_expression("x^2 - 49")
+
+        def fail(*args, **kwargs):
+            raise AssertionError("parse_latex_safe called")
+
+        monkeypatch.setattr(sympy_service, "parse_latex_safe", fail)
+        assert factor_expression("(x-7)(x+7)") == "\\left(x - 7\\right) \\left(x + 7\\right)"
+        assert factor_expression.peek("x^{2}-49") == (True, "\\left(x - 7\\right) \\left(x + 7\\right)")
+
+    def test_recognizer_is_cached(self):
+        polynomial.recognize.cache_clear()
+        parse_polynomial("x^2 - 1")
+        parse_polynomial("x^2 - 1")
+        assert polynomial.recognize.cache_info().hits == 1
@@ -0,0 +1,181 @@
+"""
+Tests for progressive results: WorkerPool.stream() and the SSE endpoints.
+"""
+
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from app.executor import OperationTimeoutError, WorkerPool
+from app.services.sympy_service import (
+    integrate_definite,
+    integrate_definite_progressive,
+    limit_progressive,
+    simplify_expression,
+    simplify_progressive,
+    verify_equivalence,
+)
+
+
+def _countdown(n, pause=0.0):
+    for i in range(n, 0, -1):
+        yield i
+        time.sleep(pause)
+    yield os.getpid()
+
+
+def _yield_then_hang():
+    yield "first"
+    time.sleep(30)
+    yield "never"
+
+
+def _sse(response):
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(1)
+    yield pool
+    pool.shutdown()
+
+
+class TestPoolStream:
+
+    def test_items_arrive_in_order(self, pool):
+        async def collect():
+            return [item async for item in pool.stream(_countdown, 3)]
+
+        *counts, pid = asyncio.run(collect())
+        assert counts == [3, 2, 1]
+        assert pid != os.getpid()
+
+    def test_items_arrive_before_generator_ends(self, pool):
+        async def first_item_latency():
+            started = time.monotonic()
+            async for _ in pool.stream(_countdown, 2, 0.5):
+                return time.monotonic() - started
+
+        assert asyncio.run(first_item_latency()) < 0.4
+
+    def test_item_timeouts(self, pool):
+        async def collect(stream):
+            return [item async for item in stream]
+
+        *counts, _ = asyncio.run(collect(pool.stream(_countdown, 3, 0.2, item_timeouts=[1.0] * 4)))
+        assert counts == [3, 2, 1]
+
+        received = []
+
+        async def run():
+            async for item in pool.stream(_yield_then_hang, operation="integrate", item_timeouts=[5.0, 0.3]):
+                received.append(item)
+
+        started = time.monotonic()
+        with pytest.raises(OperationTimeoutError, match="0.3"):
+            asyncio.run(run())
+        assert time.monotonic() - started < 3
+        assert received == ["first"]
+
+    def test_timeout_keeps_items_already_sent(self, pool):
+        received = []
+
+        async def collect():
+            async for item in pool.stream(_yield_then_hang, timeout=0.5, operation="integrate"):
+                received.append(item)
+
+        with pytest.raises(OperationTimeoutError):
+            asyncio.run(collect())
+        assert received == ["first"]
+        # The hung worker was replaced
+        assert asyncio.run(pool.run(os.getpid, timeout=5))
+
+    def test_closing_early_kills_the_worker(self, pool):
+        async def take_first():
+            stream = pool.stream(_yield_then_hang)
+            first = await stream.__anext__()
+            await stream.aclose()
+            return first
+
+        (worker,) = pool._workers
+        assert asyncio.run(take_first()) == "first"
+        worker.process.join(timeout=5)
+        assert not worker.process.is_alive()
+        assert asyncio.run(pool.run(os.getpid, timeout=5))
+
+    def test_errors_propagate(self, pool):
+        async def collect():
+            return [item async for item in pool.stream(simplify_progressive, "\\frac{")]
+
+        with pytest.raises(ValueError):
+            asyncio.run(collect())
+
+
+class TestProgressiveServices:
+
+    def test_definite_integral_numeric_first(self):
+        stages = list(integrate_definite_progressive("\\frac{\\sin(x)}{x}", "x", "1", "2"))
+        assert stages[0]["stage"] == "numeric" and not stages[0]["final"]
+        assert stages[-1]["final"] and sum(s["final"] for s in stages) == 1
+        assert stages[-1]["result"] == integrate_definite("\\frac{\\sin(x)}{x}", "x", "1", "2")
+        assert abs(float(stages[0]["result"]) - 0.6593299064) < 1e-8
+
+    def test_limit_estimate(self):
+        stages = list(limit_progressive("(1 + \\frac{1}{x})^x", "x", "oo"))
+        assert [s["stage"] for s in stages] == ["numeric", "limit"]
+        assert abs(float(stages[0]["result"]) - 2.718281828) < 1e-4
+        assert stages[1]["result"] == "e"
+
+    def test_limit_without_estimate_when_sides_disagree(self):
+        stages = list(limit_progressive("\\frac{1}{x}", "x", "0"))
+        assert [s["stage"] for s in stages] == ["limit"]
+
+    def test_cached_result_is_final_immediately(self):
+        latex_str = "\\frac{x^2 - 9}{x - 3} + \\sin^2(x) + \\cos^2(x)"
+        simplify_expression(latex_str)
+        assert list(simplify_progressive(latex_str)) == [
+            {"stage": "cached", "result": simplify_expression(latex_str), "final": True}
+        ]
+
+
+class TestSSEEndpoints:
+
+    def test_definite_integral_stream(self, client):
+        response = client.post("/api/calculus/definite-integral/stream", json={
+            "latex": "x^2", "variable": "x", "lower_limit": "0", "upper_limit": "3",
+        })
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _sse(response)
+        assert events[0][0] == "provisional" and events[0][1]["stage"] == "numeric"
+        assert events[-1][0] == "final" and events[-1][1]["result"] == "9"
+        assert all("elapsed" in data for _, data in events)
+
+    def test_simplify_stream(self, client):
+        response = client.post("/api/simplify/stream", json={"latex": "\\frac{x^2 - 1}{x - 1} + \\sin^2(t) + \\cos^2(t)"})
+        events = _sse(response)
+        assert [name for name, _ in events] == ["provisional", "final"]
+        assert verify_equivalence(events[-1][1]["result"], "x + 2")
+
+    def test_integrate_and_limit_streams(self, client):
+        integral = _sse(client.post("/api/calculus/integrate/stream", json={"latex": "x \\cos(x)"}))
+        assert integral[-1][0] == "final"
+        assert verify_equivalence(integral[-1][1]["result"], "x \\sin(x) + \\cos(x)")
+        limit = _sse(client.post("/api/calculus/limit/stream", json={
+            "latex": "\\frac{\\sin(x)}{x}", "variable": "x", "point": "0",
+        }))
+        assert limit[-1][1]["result"] == "1"
+
+    def test_invalid_input_error_event(self, client):
+        events = _sse(client.post("/api/calculus/limit/stream", json={
+            "latex": "\\frac{", "variable": "x", "point": "0",
+        }))
+        assert events == [("error", events[0][1])] and events[0][1]["status"] == 400
@@ -0,0 +1,93 @@
+"""
+Tests for the prefork launcher (python -m app.server).
+"""
+
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pytest
+
+from app.server import warm_up
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get(url: str):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def test_warm_up_runs_every_call():
+    timings = warm_up()
+    assert {"parse", "factor", "integrate", "solve"} <= set(timings)
+    assert all(seconds >= 0 for seconds in timings.values())
+
+
+def _post(url: str, payload: dict):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.status, json.loads(response.read())
+
+
+def test_several_processes_require_shared_store():
+    result = subprocess.run(
+        [sys.executable, "-m", "app.server", "--processes", "2"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, timeout=60,
+        env={k: v for k, v in os.environ.items() if k != "MATHFLOW_CACHE_DB"},
+    )
+    assert result.returncode == 2
+    assert "MATHFLOW_CACHE_DB" in result.stderr
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+def test_prefork_server_serves_and_stops(tmp_path):
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--host", "127.0.0.1", "--port", str(port),
+         "--processes", "2", "--log-level", "warning"],
+        cwd=BACKEND_DIR, stderr=subprocess.PIPE, text=True,
+        env={**os.environ, "MATHFLOW_CACHE_DB": str(tmp_path / "cache.db")},
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                _get(f"{base}/health")
+                break
+            except OSError:
+                assert process.poll() is None, process.stderr.read()
+                assert time.monotonic() < deadline
+                time.sleep(0.2)
+
+        assert _post(f"{base}/api/factor", {"latex": "x^2 - 4"})[0] == 200
+
+        # 句柄由某一个服务进程创建，每个进程都能使用
+        _, handle = _post(f"{base}/api/expressions", {"latex": "x^3"})
+        for _ in range(10):
+            status, data = _post(f"{base}/api/calculus/differentiate",
+                                 {"expression_id": handle["id"], "variable": "x"})
+            assert (status, data["result"]) == (200, "3 x^{2}")
+
+        startup = _get(f"{base}/api/stats")["startup"]
+        assert startup["processes"] == 2
+        assert startup["warmup_seconds"] >= 0
+        assert "integrate" in startup["warmup_calls"]
+    finally:
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=30) == 0
+    assert "预热" in process.stderr.read()
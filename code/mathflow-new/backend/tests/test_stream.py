@@ -0,0 +1,114 @@
+"""
+Tests for the NDJSON streaming endpoint (POST /api/stream).
+"""
+
+import asyncio
+import json
+
+from app.streaming import ndjson_lines, stream_jobs
+from app.services.sympy_service import verify_equivalence
+
+
+def _ndjson(*jobs) -> bytes:
+    return b"".join(json.dumps(job).encode("utf-8") + b"\n" for job in jobs)
+
+
+def _results(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+async def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+class TestNdjsonLines:
+
+    def test_lines_split_across_chunks(self):
+        async def collect():
+            return [line async for line in ndjson_lines(_chunks(b'{"a": 1}\n\n{"b": 2}\n{"c"', 3), 100)]
+
+        assert asyncio.run(collect()) == [b'{"a": 1}', b'{"b": 2}', b'{"c"']
+
+    def test_oversized_line_reported_in_place(self):
+        data = b"short\n" + b"x" * 50 + b"\nafter\n"
+
+        async def collect():
+            return [line async for line in ndjson_lines(_chunks(data, 7), 20)]
+
+        assert asyncio.run(collect()) == [b"short", None, b"after"]
+
+    def test_oversized_line_inside_one_chunk(self):
+        data = b"short\n" + b"x" * 50 + b"\nafter\n" + b"y" * 50
+
+        async def collect():
+            return [line async for line in ndjson_lines(_chunks(data, len(data)), 20)]
+
+        assert asyncio.run(collect()) == [b"short", None, b"after", None]
+
+
+class TestStreamEndpoint:
+
+    def test_results_in_job_order(self, client):
+        response = client.post("/api/stream", content=_ndjson(
+            {"id": "a", "op": "factor", "latex": "x^2 - 4"},
+            {"id": "b", "op": "differentiate", "latex": "x^3", "variable": "x"},
+            {"op": "verify", "input_latex": "(x+1)^2", "output_latex": "x^2 + 2x + 1"},
+        ))
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        results = _results(response)
+        assert [(r["index"], r["id"], r["ok"]) for r in results] == [(0, "a", True), (1, "b", True), (2, None, True)]
+        assert verify_equivalence(results[0]["result"]["result"], "(x-2)(x+2)")
+        assert verify_equivalence(results[1]["result"]["result"], "3x^2")
+        assert results[2]["result"]["is_equivalent"] is True
+
+    def test_unordered_returns_every_job(self, client):
+        jobs = [{"id": i, "op": "expand", "latex": f"(x+{i})^2"} for i in range(6)]
+        response = client.post("/api/stream?ordered=false", content=_ndjson(*jobs))
+        assert response.status_code == 200
+        results = _results(response)
+        assert sorted(r["id"] for r in results) == list(range(6))
+        assert all(r["ok"] for r in results)
+        assert all(r["index"] == r["id"] for r in results)
+
+    def test_per_job_errors(self, client):
+        response = client.post("/api/stream", content=b"\n".join([
+            b"not json",
+            b'{"op": "no_such_op"}',
+            b'{"op": "factor"}',
+            b'{"op": "factor", "latex": "\\\\frac{"}',
+            b"[1, 2]",
+            b'{"op": "expand", "latex": "(x+1)^2"}',
+        ]))
+        assert response.status_code == 200
+        assert [r["status"] for r in _results(response)] == [400, 400, 422, 400, 400, 200]
+
+    def test_empty_body(self, client):
+        response = client.post("/api/stream", content=b"")
+        assert response.status_code == 200
+        assert response.text == ""
+
+
+class TestBackpressure:
+
+    def test_reader_waits_for_free_slot(self):
+        lines_read = []
+
+        async def body():
+            for i in range(6):
+                lines_read.append(i)
+                yield json.dumps({"id": i, "op": "no_such_op"}).encode("utf-8") + b"\n"
+
+        async def first_result():
+            stream = stream_jobs(body(), ordered=True, window=2, max_line_bytes=1024)
+            try:
+                first = json.loads(await stream.__anext__())
+                return first, len(lines_read)
+            finally:
+                await stream.aclose()
+
+        first, read = asyncio.run(first_result())
+        assert first["index"] == 0
+        # Two jobs in flight plus the line that waited for a free slot
+        assert read == 3
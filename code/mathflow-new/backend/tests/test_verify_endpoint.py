@@ -1,5 +1,14 @@
 import pytest
-from app.services.sympy_service import verify_equivalence
+from app.config import settings
+from app.services import sympy_service
+from app.services.sympy_service import (
+    verify_candidates,
+    fingerprint_expressions,
+    group_fingerprints,
+    cluster_buckets,
+    verify_equivalence,
+    verify_equivalence_detailed,
+)
 
 
 class TestVerifyEndpoint:
@@ -66,6 +75,211 @@ class TestVerifyEndpoint:
         assert data["is_equivalent"] is True
 
 
+class TestVerificationTiers:
+    """The cheapest conclusive check decides and is reported."""
+
+    @pytest.mark.parametrize("input_latex,output_latex,expected,method", [
+        ("x^2 - 4", "x^{2} - 4", True, "structural"),
+        ("(x+1)^2", "x^2 + 2x + 1", True, "polynomial"),
+        ("(x-2)(x+2)", "x^2 + 4", False, "polynomial"),
+        ("x y + y", "(x + 1) y", True, "polynomial"),
+        (r"\sin(x)", r"\cos(x)", False, "numeric"),
+        (r"\frac{1}{x+1}", r"\frac{1}{x-1}", False, "numeric"),
+        (r"\sin^{2}(x) + \cos^{2}(x)", "1", True, "equals"),
+        ("!!!", "x", False, "error"),
+    ])
+    def test_deciding_tier(self, input_latex, output_latex, expected, method):
+        assert verify_equivalence_detailed(input_latex, output_latex) == (expected, method)
+
+    def test_numeric_tier_never_accepts(self):
+        """Agreeing numeric probes still require symbolic confirmation."""
+        is_equiv, method = verify_equivalence_detailed(r"\frac{x^2-1}{x-1}", "x + 1")
+        assert is_equiv is True
+        assert method in ("equals", "simplify")
+
+    def test_endpoint_reports_method(self, client):
+        response = client.post("/api/verify", json={
+            "input_latex": r"e^{x}",
+            "output_latex": r"e^{2x}"
+        })
+        assert response.status_code == 200
+        assert response.json() == {"is_equivalent": False, "method": "numeric"}
+
+
+class TestComputeAndVerify:
+    """verify=true on factor/expand/simplify returns a verification flag in one call."""
+
+    @pytest.mark.parametrize("endpoint,latex", [
+        ("/api/factor", "x^2 - 5x + 6"),
+        ("/api/factor", r"\frac{x^2 - 1}{x + 1}"),
+        ("/api/expand", "(x+1)^3"),
+        ("/api/simplify", r"\sin^{2}(x) + \cos^{2}(x)"),
+    ])
+    def test_verified_in_same_request(self, client, endpoint, latex):
+        response = client.post(endpoint, json={"latex": latex, "verify": True})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["verified"] is True
+        assert verify_equivalence(latex, data["result"])
+
+    def test_result_matches_unverified_call(self, client):
+        plain = client.post("/api/factor", json={"latex": "x^3 - 8"}).json()
+        checked = client.post("/api/factor", json={"latex": "x^3 - 8", "verify": True}).json()
+        assert checked["result"] == plain["result"]
+        assert plain["verified"] is None
+
+    def test_invalid_latex_still_400(self, client):
+        response = client.post("/api/simplify", json={"latex": "\\frac{", "verify": True})
+        assert response.status_code == 400
+
+
+class TestBulkVerify:
+    """One reference answer graded against many candidates."""
+
+    CANDIDATES = [
+        "x^2 + 2x + 1",
+        "(1 + x)^{2}",
+        "x^2 + 1",
+        r"\frac{(x+1)^3}{x+1}",
+        "!!!",
+        r"\sin(x)",
+    ]
+
+    def test_verdicts_match_single_verification(self):
+        results = verify_candidates("(x+1)^2", self.CANDIDATES)
+        assert [r[0] for r in results] == [
+            verify_equivalence("(x+1)^2", c) for c in self.CANDIDATES
+        ]
+        assert results[2] == (False, "polynomial")
+        assert results[4] == (False, "error")
+        assert results[5] == (False, "numeric")
+
+    def test_reference_preprocessed_once(self):
+        before = sympy_service._reference_cache.misses
+        verify_candidates("x^3 - 7x", ["x(x^2 - 7)"])
+        verify_candidates("x^{3} - 7x", ["x^3 - 7x", "x^3"])
+        assert sympy_service._reference_cache.misses - before == 1
+
+    def test_bulk_endpoint(self, client):
+        response = client.post("/api/verify/bulk", json={
+            "reference": "(x+1)^2",
+            "candidates": self.CANDIDATES,
+        })
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["is_equivalent"] for r in results] == [True, True, False, True, False, False]
+
+    def test_too_complex_candidate_is_reported(self, client):
+        assert verify_candidates("x", ["(x+1)^{100000}", "\\frac{", "x"]) == [
+            (False, "too_complex"), (False, "error"), (True, "structural"),
+        ]
+        response = client.post("/api/verify/bulk", json={
+            "reference": "x",
+            "candidates": ["(x+1)^{100000}", "x"],
+        })
+        assert response.status_code == 200
+        assert [r["method"] for r in response.json()["results"]] == ["too_complex", "structural"]
+
+    def test_bulk_endpoint_invalid_reference(self, client):
+        response = client.post("/api/verify/bulk", json={
+            "reference": "\\frac{",
+            "candidates": ["x"],
+        })
+        assert response.status_code == 400
+
+    def test_bulk_endpoint_empty(self, client):
+        response = client.post("/api/verify/bulk", json={"reference": "x", "candidates": []})
+        assert response.status_code == 200
+        assert response.json()["results"] == []
+
+
+class TestCluster:
+    """Grouping many answers into equivalence classes."""
+
+    EXPRESSIONS = [
+        "(x+1)^2",
+        "x^2 + 1",
+        "x^2 + 2x + 1",
+        "!!!",
+        r"\sin^2(x) + \cos^2(x)",
+        "1",
+        "(1 + x)^{2}",
+        r"\frac{x+1}{x^2-1}",
+        r"\frac{1}{x-1}",
+    ]
+
+    def test_fingerprints_agree_for_equivalent_expressions(self):
+        fingerprints = fingerprint_expressions(self.EXPRESSIONS)
+        assert fingerprints[3] is None
+        assert group_fingerprints(fingerprints) == [[0, 2, 6], [1], [4, 5], [7, 8]]
+
+    def test_values_straddling_a_rounding_boundary_share_a_bucket(self):
+        # 按 6 位有效数字取整时分别是 1.23457 与 1.23456
+        above = ((1.2345650000001, 0.0),) * 6
+        below = ((1.2345649999999, 0.0),) * 6
+        other = ((1.2346, 0.0),) * 6
+        assert group_fingerprints([above, other, None, below]) == [[0, 3], [1]]
+
+    def test_non_finite_points_must_match(self):
+        finite = ((1.0, 0.0),) * 6
+        partial = ((1.0, 0.0),) * 5 + (None,)
+        assert group_fingerprints([finite, partial, ("opaque",), ("opaque",)]) == [[0], [1], [2, 3]]
+
+    def test_labels_must_match(self):
+        values = ((1.0, 0.0),) * 6
+        assert group_fingerprints([values, ("==",) + values, (999,) + values, ("==",) + values]) == [[0], [1, 3], [2]]
+
+    def test_evalf_fallback(self):
+        # NumPy 无法求值的表达式不应全部落入同一个 ("opaque",) 桶
+        expressions = [
+            "x!", "10^{999}x", r"x \cdot 10^{999}", r"\binom{x}{2}",
+            r"\int_0^x t^2 dt", r"\frac{x^3}{3}", "x = 1", "1 = x", "x = 2", "x < 1", "1 > x",
+        ]
+        fingerprints = fingerprint_expressions(expressions)
+        assert ("opaque",) not in fingerprints
+        assert fingerprints[1][0] == 999
+        assert group_fingerprints(fingerprints) == [[0], [1, 2], [3], [4, 5], [6, 7], [8], [9, 10]]
+
+    def test_bucket_budget_grows_with_its_members(self, client, monkeypatch):
+        timeouts = []
+
+        class Pool:
+            size = 2
+
+            async def run(self, func, *args, timeout=None, **kwargs):
+                timeouts.append(timeout)
+                return func(*args)
+
+        monkeypatch.setattr("app.executor.get_pool", lambda: Pool())
+        monkeypatch.setitem(settings.timeouts, "verify", 1.0)
+        expressions = ["(x+1)^2"] * 5 + ["x^2 + 2x + 1"] * 5
+        response = client.post("/api/verify/cluster", json={"expressions": expressions})
+        assert response.json()["classes"] == [{"representative": "(x+1)^2", "members": list(range(10))}]
+        # 指纹：两块各 5 个表达式；验证：一个 10 个成员的桶
+        assert timeouts == [5.0, 5.0, 10.0]
+
+    def test_bucket_split_by_symbolic_check(self):
+        # Pretend the fingerprints collided: the symbolic check still separates them
+        assert cluster_buckets([["x^2", "x \\cdot x", "x^3", "x^2"]]) == [[[0, 1, 3], [2]]]
+
+    def test_cluster_endpoint(self, client):
+        response = client.post("/api/verify/cluster", json={"expressions": self.EXPRESSIONS})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["invalid"] == [3]
+        assert data["classes"] == [
+            {"representative": "(x+1)^2", "members": [0, 2, 6]},
+            {"representative": "x^2 + 1", "members": [1]},
+            {"representative": r"\sin^2(x) + \cos^2(x)", "members": [4, 5]},
+            {"representative": r"\frac{x+1}{x^2-1}", "members": [7, 8]},
+        ]
+
+    def test_cluster_endpoint_empty(self, client):
+        response = client.post("/api/verify/cluster", json={"expressions": []})
+        assert response.status_code == 200
+        assert response.json() == {"classes": [], "invalid": []}
+
+
 class TestExistingEndpointsStillWork:
     """Regression tests: existing endpoints must still work after normalization changes."""
 